@@ -0,0 +1,120 @@
+"""
+SmartPark frame annotation
+Draws space rectangles and count labels on demand from the detection results.
+The drawn overlay is cached and only the spaces whose status or count bucket
+changed are redrawn, so frames nobody looks at are never annotated. Labels show
+the count rounded down to its bucket, so pixel-count jitter draws nothing.
+"""
+
+import threading
+
+import cv2
+import cvzone
+import numpy as np
+
+from detection import SPACE_WIDTH, SPACE_HEIGHT
+
+# Drawing style for each space status: (BGR color, rectangle thickness)
+SPACE_STYLES = {
+    'reserved': ((255, 165, 0), 3),   # Orange for reserved
+    'available': ((0, 255, 0), 5),    # Green for available
+    'occupied': ((0, 0, 255), 2),     # Red for occupied
+    'unknown': ((128, 128, 128), 1)
+}
+
+LABEL_FONT = cv2.FONT_HERSHEY_PLAIN
+DRAW_MARGIN = 8   # Pixels a rectangle outline or label can reach past the space
+
+
+def draw_space(img, pos, status, count, width=SPACE_WIDTH, height=SPACE_HEIGHT):
+    """Draw one space rectangle and its count label"""
+    x, y = pos
+    color, thickness = SPACE_STYLES[status]
+    cv2.rectangle(img, (x, y), (x + width, y + height), color, thickness)
+    cvzone.putTextRect(img, str(count), (x, y + height - 3), scale=1,
+                       thickness=2, offset=0, colorR=color, font=LABEL_FONT)
+
+
+def draw_summary(img, free, total):
+    """Draw the 'Free: n/total' banner"""
+    cvzone.putTextRect(img, f'Free: {free}/{total}', (100, 50), scale=3,
+                       thickness=5, offset=20, colorR=(0, 200, 0))
+
+
+class OverlayRenderer:
+    """Keep a drawn overlay of every space and composite it onto frames on request"""
+
+    def __init__(self, positions, width=SPACE_WIDTH, height=SPACE_HEIGHT, bucket_size=1):
+        self.positions = [tuple(pos) for pos in positions]
+        self.width = width
+        self.height = height
+        self.bucket_size = bucket_size
+        self.rebuilds = 0          # Number of overlay updates that redrew something
+        self._overlay = None       # BGR layer with every rectangle and label drawn
+        self._mask = None          # Pixels of the overlay that were drawn on
+        self._drawn = None         # (status, labelled count) of each space in the overlay
+        self._lock = threading.Lock()
+
+    def _extent(self, i, count):
+        """Bounding box (x1, y1, x2, y2) of everything drawn for one space"""
+        x, y = self.positions[i]
+        (label_width, _), _ = cv2.getTextSize(str(count), LABEL_FONT, 1, 2)
+        return (x - DRAW_MARGIN, y - DRAW_MARGIN,
+                x + max(self.width, label_width) + DRAW_MARGIN, y + self.height + DRAW_MARGIN)
+
+    def _redraw(self, region, states):
+        """Redraw every space that touches `region` into the overlay"""
+        rows, cols = self._overlay.shape[:2]
+        x1, y1 = max(region[0], 0), max(region[1], 0)
+        x2, y2 = min(region[2], cols), min(region[3], rows)
+        if x2 <= x1 or y2 <= y1:
+            return
+
+        # Draw onto a canvas clipped to the region so neighbours outside it stay untouched
+        canvas = np.zeros((y2 - y1, x2 - x1, 3), np.uint8)
+        for i, (status, count) in enumerate(states):
+            ex1, ey1, ex2, ey2 = self._extent(i, count)
+            if ex2 <= x1 or ex1 >= x2 or ey2 <= y1 or ey1 >= y2:
+                continue
+            x, y = self.positions[i]
+            draw_space(canvas, (x - x1, y - y1), status, count, self.width, self.height)
+
+        self._overlay[y1:y2, x1:x2] = canvas
+        self._mask[y1:y2, x1:x2] = np.any(canvas, axis=2).astype(np.uint8) * 255
+
+    def update(self, frame_shape, statuses, counts):
+        """Bring the overlay up to date with the latest statuses and counts"""
+        bucket = self.bucket_size
+        states = [(status, count // bucket * bucket) for status, count in zip(statuses, counts)]
+        if self._overlay is None or self._overlay.shape[:2] != frame_shape[:2] \
+                or len(states) != len(self._drawn):
+            self._overlay = np.zeros((frame_shape[0], frame_shape[1], 3), np.uint8)
+            self._mask = np.zeros(frame_shape[:2], np.uint8)
+            self._redraw((0, 0, frame_shape[1], frame_shape[0]), states)
+            self._drawn = states
+            self.rebuilds += 1
+            return
+
+        changed = [i for i, state in enumerate(states) if state != self._drawn[i]]
+        if not changed:
+            return
+
+        # One region covering the old and new drawing of every changed space
+        extents = [self._extent(i, count) for i in changed
+                   for count in (states[i][1], self._drawn[i][1])]
+        region = (min(e[0] for e in extents), min(e[1] for e in extents),
+                  max(e[2] for e in extents), max(e[3] for e in extents))
+        self._redraw(region, states)
+        self._drawn = states
+        self.rebuilds += 1
+
+    def render(self, frame, statuses, counts):
+        """Return an annotated copy of `frame`; the frame itself is not modified"""
+        with self._lock:
+            self.update(frame.shape, statuses, counts)
+            annotated = frame.copy()
+            cv2.copyTo(self._overlay, self._mask, annotated)
+
+        free = sum(1 for status in statuses if status == 'available')
+        draw_summary(annotated, free, len(statuses))
+        return annotated
@@ -1,33 +1,79 @@
-from flask import Flask, Response, jsonify, request
+from flask import Flask, Response, jsonify, request, g
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 import cv2
 import pickle
-import cvzone
 import numpy as np
 import threading
 import time
+import collections
 import base64
-from io import BytesIO
-from PIL import Image
-import smtplib
 import random
 import string
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
 import sqlite3
-import hashlib
 import os
+import atexit
+from detection import SpaceScorer, RoiPreprocessor, MotionGate, preprocess_frame, OCCUPIED_THRESHOLD
+from detection_supervisor import DetectionSupervisor
+from pipeline import FramePipeline, DROP_OLDEST
+from annotation import OverlayRenderer
+from metrics import REGISTRY, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from frame_stream import FrameBroadcaster, MJPEG_MIMETYPE
+from event_stream import EventStreamServer, EVENTS_PATH
+from status_snapshot import StatusSnapshot
+from space_state import SpaceState, STATUS_NAMES, STATUS_OCCUPIED
+from lru_cache import LRUCache
+from occupancy_history import OccupancyHistory, RESOLUTIONS as HISTORY_RESOLUTIONS
+from occupancy_store import OccupancyStore, ROLLUP_TABLES
+from db_pool import ConnectionPool
+from mail_outbox import MailOutbox, MailTemplate
+from state_store import create_state_store
+from frame_shm import SharedFrameBuffer, SharedFrame, frame_intact
+from password_hashing import PasswordHasher, HasherBusy
 
 app = Flask(__name__)
 CORS(app)
 
+# Behind a load balancer, set SMARTPARK_TRUSTED_PROXIES to the number of proxies in
+# front of the API so per-client limits see the client's address, not the proxy's
+TRUSTED_PROXIES = int(os.environ.get('SMARTPARK_TRUSTED_PROXIES', '0'))
+if TRUSTED_PROXIES:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES)
+
 # Database setup
-DATABASE_FILE = 'smartpark_users.db'
+DATABASE_FILE = os.environ.get('SMARTPARK_DB_FILE', 'smartpark_users.db')  # Tests and benchmarks point this elsewhere
+DB_POOL_SIZE = 8  # Long-lived connections shared by request threads
+db_pool = ConnectionPool(DATABASE_FILE, size=DB_POOL_SIZE)
+
+# Password hashing: salted scrypt on a bounded pool so login storms cannot starve the API.
+# Raising the cost upgrades each stored hash on that user's next login.
+PASSWORD_SCRYPT_N = 2 ** 14    # Cost; every doubling doubles hashing time and memory
+PASSWORD_HASH_WORKERS = 4      # Hashes computed in parallel
+password_hasher = PasswordHasher(n=PASSWORD_SCRYPT_N, workers=PASSWORD_HASH_WORKERS)
+
+# Where reservations, OTPs and the published parking status live.
+# 'memory' keeps them in this process (single server process, threaded=True).
+# 'sqlite' shares them through STATE_DB_FILE, so several API worker processes can
+# serve requests while detection runs in the one started with `python backend.py`.
+STATE_BACKEND = os.environ.get('SMARTPARK_STATE_BACKEND', 'memory')
+STATE_DB_FILE = 'smartpark_state.db'
+state_store = create_state_store(STATE_BACKEND, STATE_DB_FILE)
+
+# OTP storage
+OTP_TTL = 600            # Seconds a code stays valid
+OTP_STORE_SIZE = 10000   # Pending codes kept per store; new codes are refused beyond this
+OTP_EXPIRED_GRACE = 600  # Expired reset codes are kept this much longer to answer "OTP has expired"
+otp_storage = state_store.namespace('otp', OTP_TTL, OTP_STORE_SIZE)  # {email: {'otp': '123456', 'user_data': {...}, 'verified': bool}}
+password_reset_otp_storage = state_store.namespace(
+    'password_reset_otp', OTP_TTL + OTP_EXPIRED_GRACE, OTP_STORE_SIZE)  # {email: {'otp': '123456', 'expires_at': timestamp}}
 
-# OTP storage (in production, use Redis or database)
-otp_storage = {}  # {email: {'otp': '123456', 'expires_at': timestamp, 'user_data': {...}}}
-password_reset_otp_storage = {}  # {email: {'otp': '123456', 'expires_at': timestamp}}
+# Codes each client address may request per OTP_TTL. One client can then hold only a
+# few of the OTP_STORE_SIZE pending codes, so a flood of throwaway addresses from it
+# cannot fill the stores and lock everyone else out.
+OTP_REQUESTS_PER_CLIENT = 5
+OTP_RATE_LIMIT_CLIENTS = 10000   # Clients tracked at once; requests from new clients are refused beyond this
+otp_request_counts = state_store.namespace('otp_requests', OTP_TTL, OTP_RATE_LIMIT_CLIENTS)  # {client address: requests}
 
 # Email configuration
 # For Gmail: Use App Password (not regular password)
@@ -41,9 +87,53 @@ SMTP_PASSWORD = "wxdb fxrl hgpp bzbm"     # Replace with your app password
 # Set to True to enable real email sending, False for demo mode
 ENABLE_REAL_EMAIL = True
 
+# OTP email body, split around the code once at startup
+OTP_EMAIL = MailTemplate("SmartPark Email Verification", """
+<html>
+<body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
+    <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 30px; border-radius: 10px; text-align: center;">
+        <h1 style="margin: 0; font-size: 28px;">🏢 SmartPark</h1>
+        <p style="margin: 10px 0; opacity: 0.9;">Email Verification</p>
+    </div>
+    
+    <div style="background: white; padding: 30px; border-radius: 10px; margin-top: 20px; box-shadow: 0 4px 6px rgba(0,0,0,0.1);">
+        <h2 style="color: #333; margin-bottom: 20px;">Your Verification Code</h2>
+        
+        <div style="background: #f8f9fa; border: 2px dashed #667eea; border-radius: 8px; padding: 20px; text-align: center; margin: 20px 0;">
+            <span style="font-size: 32px; font-weight: bold; color: #667eea; letter-spacing: 8px;">{{otp}}</span>
+        </div>
+        
+        <p style="color: #666; line-height: 1.6;">
+            Please enter this 6-digit code to verify your email address. 
+            This code will expire in <strong>10 minutes</strong>.
+        </p>
+        
+        <div style="background: #fff3cd; border: 1px solid #ffeaa7; border-radius: 5px; padding: 15px; margin: 20px 0;">
+            <p style="margin: 0; color: #856404;">
+                <strong>Security Notice:</strong> If you didn't request this verification code, 
+                please ignore this email and contact support immediately.
+            </p>
+        </div>
+        
+        <p style="color: #999; font-size: 14px; margin-top: 30px;">
+            This is an automated message from SmartPark. Please do not reply to this email.
+        </p>
+    </div>
+</body>
+</html>
+""", '{{otp}}')
+
+# One background sender with a reused SMTP session; requests only queue messages
+mail_outbox = MailOutbox(SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD)
+
 def init_database():
     """Initialize the SQLite database with users table"""
-    conn = sqlite3.connect(DATABASE_FILE)
+    with db_pool.transaction() as conn:
+        _create_users_table(conn)
+    print(f"✅ Database initialized: {DATABASE_FILE}")
+
+def _create_users_table(conn):
+    """Create the users table and the demo accounts"""
     cursor = conn.cursor()
     
     # Create users table
@@ -69,7 +159,9 @@ def init_database():
     ]
     
     for username, email, password, full_name, phone, org in demo_users:
-        password_hash = hashlib.sha256(password.encode()).hexdigest()
+        if cursor.execute('SELECT 1 FROM users WHERE username = ?', (username,)).fetchone():
+            continue  # Hashing is slow; only do it for missing users
+        password_hash = password_hasher.hash(password)
         try:
             cursor.execute('''
                 INSERT OR IGNORE INTO users (username, email, password_hash, full_name, phone, organization)
@@ -77,60 +169,54 @@ def init_database():
             ''', (username, email, password_hash, full_name, phone, org))
         except sqlite3.IntegrityError:
             pass  # User already exists
-    
-    conn.commit()
-    conn.close()
-    print(f"✅ Database initialized: {DATABASE_FILE}")
-
-def get_db_connection():
-    """Get database connection"""
-    conn = sqlite3.connect(DATABASE_FILE)
-    conn.row_factory = sqlite3.Row
-    return conn
 
 def verify_user_credentials(username, password):
     """Verify user credentials against database"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    password_hash = hashlib.sha256(password.encode()).hexdigest()
-    
-    cursor.execute('''
-        SELECT * FROM users 
-        WHERE username = ? AND password_hash = ? AND is_verified = 1
-    ''', (username, password_hash))
-    
-    user = cursor.fetchone()
-    conn.close()
+    with db_pool.connection() as conn:
+        user = conn.execute('''
+            SELECT * FROM users 
+            WHERE username = ? AND is_verified = 1
+        ''', (username,)).fetchone()
+    if user is None:
+        password_hasher.verify_missing(password)  # Same scrypt work, so unknown usernames are not revealed
+        return None
     
+    matches, needs_rehash = password_hasher.verify(password, user['password_hash'])
+    if not matches:
+        return None
+    if needs_rehash:
+        # Upgrade a legacy SHA-256 (or lower-cost) hash now that the password is known
+        password_hash = password_hasher.hash(password)
+        with db_pool.transaction() as conn:
+            conn.execute('UPDATE users SET password_hash = ? WHERE id = ? AND password_hash = ?',
+                         (password_hash, user['id'], user['password_hash']))
+        print(f"🔐 Upgraded password hash for {username}")
     return user
 
+def find_user_by_email(email):
+    """Look up a user row by email"""
+    with db_pool.connection() as conn:
+        return conn.execute('SELECT * FROM users WHERE email = ?', (email,)).fetchone()
+
 def create_user(user_data):
     """Create a new user in the database"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    password_hash = hashlib.sha256(user_data['password'].encode()).hexdigest()
+    password_hash = password_hasher.hash(user_data['password'])
     
     try:
-        cursor.execute('''
-            INSERT INTO users (username, email, password_hash, full_name, phone, organization)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
-            user_data['username'],
-            user_data['email'],
-            password_hash,
-            user_data['full_name'],
-            user_data.get('phone', ''),
-            user_data.get('organization', '')
-        ))
-        
-        conn.commit()
-        user_id = cursor.lastrowid
-        conn.close()
-        return user_id
+        with db_pool.transaction() as conn:
+            cursor = conn.execute('''
+                INSERT INTO users (username, email, password_hash, full_name, phone, organization)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (
+                user_data['username'],
+                user_data['email'],
+                password_hash,
+                user_data['full_name'],
+                user_data.get('phone', ''),
+                user_data.get('organization', '')
+            ))
+        return cursor.lastrowid
     except sqlite3.IntegrityError as e:
-        conn.close()
         if 'UNIQUE constraint failed: users.username' in str(e):
             raise ValueError('Username already exists')
         elif 'UNIQUE constraint failed: users.email' in str(e):
@@ -138,7 +224,6 @@ def create_user(user_data):
         else:
             raise ValueError('Database error')
     except Exception as e:
-        conn.close()
         raise ValueError(f'Error creating user: {str(e)}')
 
 def generate_otp():
@@ -146,60 +231,13 @@ def generate_otp():
     return ''.join(random.choices(string.digits, k=6))
 
 def send_email_otp(email, otp):
-    """Send OTP via email"""
+    """Queue the OTP email; delivery happens on the outbox's background sender"""
     try:
         if ENABLE_REAL_EMAIL:
-            # Send real email
-            msg = MIMEMultipart()
-            msg['From'] = SMTP_USERNAME
-            msg['To'] = email
-            msg['Subject'] = "SmartPark Email Verification"
-            
-            body = f"""
-            <html>
-            <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
-                <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 30px; border-radius: 10px; text-align: center;">
-                    <h1 style="margin: 0; font-size: 28px;">🏢 SmartPark</h1>
-                    <p style="margin: 10px 0; opacity: 0.9;">Email Verification</p>
-                </div>
-                
-                <div style="background: white; padding: 30px; border-radius: 10px; margin-top: 20px; box-shadow: 0 4px 6px rgba(0,0,0,0.1);">
-                    <h2 style="color: #333; margin-bottom: 20px;">Your Verification Code</h2>
-                    
-                    <div style="background: #f8f9fa; border: 2px dashed #667eea; border-radius: 8px; padding: 20px; text-align: center; margin: 20px 0;">
-                        <span style="font-size: 32px; font-weight: bold; color: #667eea; letter-spacing: 8px;">{otp}</span>
-                    </div>
-                    
-                    <p style="color: #666; line-height: 1.6;">
-                        Please enter this 6-digit code to verify your email address. 
-                        This code will expire in <strong>10 minutes</strong>.
-                    </p>
-                    
-                    <div style="background: #fff3cd; border: 1px solid #ffeaa7; border-radius: 5px; padding: 15px; margin: 20px 0;">
-                        <p style="margin: 0; color: #856404;">
-                            <strong>Security Notice:</strong> If you didn't request this verification code, 
-                            please ignore this email and contact support immediately.
-                        </p>
-                    </div>
-                    
-                    <p style="color: #999; font-size: 14px; margin-top: 30px;">
-                        This is an automated message from SmartPark. Please do not reply to this email.
-                    </p>
-                </div>
-            </body>
-            </html>
-            """
-            
-            msg.attach(MIMEText(body, 'html'))
-            
-            server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-            server.starttls()
-            server.login(SMTP_USERNAME, SMTP_PASSWORD)
-            text = msg.as_string()
-            server.sendmail(SMTP_USERNAME, email, text)
-            server.quit()
-            
-            print(f"✅ Email sent successfully to {email}")
+            if not mail_outbox.send(email, OTP_EMAIL.subject, OTP_EMAIL.render(otp)):
+                print(f"❌ Mail outbox is full, OTP email to {email} not queued")
+                return False
+            print(f"📨 Email queued for {email}")
             return True
         else:
             # Demo mode - just print the OTP
@@ -212,19 +250,28 @@ def send_email_otp(email, otp):
         print(f"📧 Make sure your email credentials are correct in backend.py")
         return False
 
+def otp_rate_limited():
+    """Count a code request from this client; True once it is over OTP_REQUESTS_PER_CLIENT this window"""
+    count = otp_request_counts.increment(request.remote_addr)
+    if count is None or count > OTP_REQUESTS_PER_CLIENT:
+        OTP_RATE_LIMITED.inc()
+        return True
+    return False
+
 def store_otp(email, user_data=None):
-    """Store OTP with expiration time"""
+    """Store OTP with expiration time; None if too many codes are pending"""
     otp = generate_otp()
-    expires_at = time.time() + 600  # 10 minutes
     
     print(f"💾 Storing OTP for {email}: {otp}")
-    print(f"⏰ Expires at: {expires_at}")
     
-    otp_storage[email] = {
+    expires_at = otp_storage.set(email, {
         'otp': otp,
-        'expires_at': expires_at,
         'user_data': user_data
-    }
+    })
+    if expires_at is None:
+        print(f"❌ OTP store is full, no code stored for {email}")
+        return None
+    print(f"⏰ Expires at: {expires_at}")
     
     return otp
 
@@ -232,24 +279,14 @@ def verify_stored_otp(email, otp):
     """Verify OTP and return user data if valid"""
     print(f"🔍 Verifying OTP for {email}: {otp}")
     
-    if email not in otp_storage:
-        print(f"❌ No OTP found for {email}")
+    # Expired codes are never returned by the store
+    stored_data = otp_storage.get(email)
+    if stored_data is None:
+        print(f"❌ No OTP found or OTP expired for {email}")
         return None
     
-    stored_data = otp_storage[email]
     stored_otp = stored_data['otp']
-    expires_at = stored_data['expires_at']
-    current_time = time.time()
-    
     print(f"📧 Stored OTP: {stored_otp}")
-    print(f"⏰ Expires at: {expires_at}, Current time: {current_time}")
-    print(f"⏰ Time remaining: {expires_at - current_time:.1f} seconds")
-    
-    # Check if OTP is expired
-    if current_time > expires_at:
-        print(f"❌ OTP expired for {email}")
-        del otp_storage[email]
-        return None
     
     # Check if OTP matches
     if stored_otp == otp:
@@ -265,30 +302,29 @@ def verify_stored_otp(email, otp):
     return None
 
 def store_password_reset_otp(email):
-    """Store password reset OTP"""
+    """Store password reset OTP; None if too many codes are pending"""
     otp = generate_otp()
-    expires_at = time.time() + 600  # 10 minutes expiry
     
-    password_reset_otp_storage[email] = {
+    if password_reset_otp_storage.set(email, {
         'otp': otp,
-        'expires_at': expires_at
-    }
+        'expires_at': time.time() + OTP_TTL
+    }) is None:
+        print(f"❌ Password reset OTP store is full, no code stored for {email}")
+        return None
     
     return otp
 
 def verify_password_reset_otp(email, otp):
     """Verify password reset OTP"""
-    if email not in password_reset_otp_storage:
+    stored_data = password_reset_otp_storage.get(email)
+    if stored_data is None:
         return False, "OTP not found or expired"
     
-    stored_data = password_reset_otp_storage[email]
     stored_otp = stored_data['otp']
-    expires_at = stored_data['expires_at']
-    current_time = time.time()
     
-    # Check if OTP has expired
-    if current_time > expires_at:
-        del password_reset_otp_storage[email]  # Clean up expired OTP
+    # Check if OTP has expired (the store keeps it a little longer so we can say so)
+    if time.time() > stored_data.get('expires_at', float('inf')):  # Codes stored without it expire with the store
+        password_reset_otp_storage.pop(email)  # Clean up expired OTP
         return False, "OTP has expired"
     
     # Verify OTP
@@ -299,42 +335,65 @@ def verify_password_reset_otp(email, otp):
 
 def reset_user_password(email, new_password):
     """Reset user password in database"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    password_hash = hashlib.sha256(new_password.encode()).hexdigest()
+    password_hash = password_hasher.hash(new_password)
     
     try:
-        cursor.execute('''
-            UPDATE users 
-            SET password_hash = ? 
-            WHERE email = ?
-        ''', (password_hash, email))
+        with db_pool.transaction() as conn:
+            cursor = conn.execute('''
+                UPDATE users 
+                SET password_hash = ? 
+                WHERE email = ?
+            ''', (password_hash, email))
         
         if cursor.rowcount == 0:
-            conn.close()
             return False, "User not found"
         
-        conn.commit()
-        conn.close()
-        
         # Clean up used OTP
-        if email in password_reset_otp_storage:
-            del password_reset_otp_storage[email]
+        password_reset_otp_storage.pop(email)
         
         return True, "Password reset successfully"
     except Exception as e:
-        conn.close()
         return False, f"Error resetting password: {str(e)}"
 
 # Initialize database on startup
 init_database()
 
 # Global variables for video processing
-cap = None
+VIDEO_SOURCE = 'carPark.mp4'
+PIPELINE_QUEUE_SIZE = 2            # Frames buffered between pipeline stages
+FRAME_DROP_POLICY = DROP_OLDEST    # DROP_OLDEST, DROP_NEWEST or BLOCK when a stage falls behind
+video_pipeline = None
 posList = []
 width, height = 107, 48
-current_frame = None
+current_frame = None  # (frame sequence number, raw frame, status codes and counts detected on it)
+annotated_frame_cache = (None, None)  # (frame sequence it was drawn from, annotated image)
+frame_broadcaster = FrameBroadcaster()  # Wakes /api/video-stream viewers on new frames
+
+# With a shared state backend, the detector also writes every frame and its space
+# statuses into shared memory, and API worker processes read them from there.
+SHARED_FRAMES = state_store.shared
+FRAME_SHM_NAME = 'smartpark_frames'
+shared_frames = None  # SharedFrameBuffer: written by the detector, attached by API workers
+shared_frames_lock = threading.Lock()
+FRAME_READ_ATTEMPTS = 3  # Times a frame the detector overwrote mid-read is re-read before giving up
+FRAME_ETAG_PREFIX = f'{int(time.time()):x}'  # Keeps ETags unique across server restarts
+
+# Preview tiers for the frame endpoints: {tier: (max width in pixels or None, JPEG quality)}
+FRAME_TIERS = {
+    'thumb': (320, 60),
+    'medium': (640, 75),
+    'full': (None, 80)
+}
+DEFAULT_FRAME_TIER = 'full'
+frame_jpeg_cache = {}  # {tier: (frame sequence it was encoded from, JPEG bytes)}
+frame_jpeg_locks = {tier: threading.Lock() for tier in FRAME_TIERS}
+
+# Per-space crops for /api/parking-spaces/<id>/snapshot, keyed by (space id, frame sequence)
+SPACE_CROP_PADDING = 12            # Pixels of context around the space rectangle
+SPACE_CROP_QUALITY = 85
+SPACE_CROP_CACHE_SIZE = 512        # Crops kept in memory (a few KB each)
+MAX_BATCH_SNAPSHOTS = 100
+space_crop_cache = LRUCache(SPACE_CROP_CACHE_SIZE)
 parking_data = {
     'total_spaces': 0,
     'available_spaces': 0,
@@ -342,170 +401,524 @@ parking_data = {
     'reserved_spaces': 0,
     'utilization_rate': 0
 }
-individual_spaces = []  # Store individual space status
-reservations = {}  # Store reservations: {space_id: {'user': 'name', 'time': timestamp, 'duration': minutes}}
+space_state = SpaceState(posList, width, height)  # Per-space arrays, updated in place every frame
+occupancy_history = OccupancyHistory(len(posList))  # 1s/1m/1h ring buffers behind /api/occupancy-history
+DEFAULT_HISTORY_POINTS = 60
+MAX_EPOCH_SECONDS = 253402300799     # 9999-12-31T23:59:59Z, the last second datetime can represent
+
+# Durable history: samples and status changes written to SQLite by a background thread
+OCCUPANCY_DB_FILE = 'smartpark_history.db'
+OCCUPANCY_SAMPLE_INTERVAL = 1.0    # Seconds between persisted occupancy samples
+occupancy_store = None
+last_persisted_sample = 0
+
+# Every detected change bumps space_version; space_change_log keeps the ids changed at
+# each recent version so /api/parking-spaces?since=<version> can answer with a delta.
+# Clients older than space_log_floor get a full snapshot instead. Clients see versions
+# as "<epoch>:<n>" tokens; the epoch changes with every start, so a version from an
+# earlier process also gets a full snapshot instead of a delta against unrelated history.
+COUNT_BUCKET_SIZE = 100            # A count change only matters once it crosses a bucket
+SPACE_CHANGE_LOG_SIZE = 1024       # Versions kept for delta queries
+SPACE_VERSION_EPOCH = f'{int(time.time() * 1000):x}'
+space_version = 0
+space_log_floor = 0
+space_change_log = collections.deque(maxlen=SPACE_CHANGE_LOG_SIZE)  # (version, space indices)
+space_log_lock = threading.Lock()
+status_snapshot = StatusSnapshot(f'{SPACE_VERSION_EPOCH}:{space_version}', parking_data, None)  # What the API serves
+space_scorer = SpaceScorer(posList, width, height)  # Rebuilt when positions are loaded
+roi_preprocessor = RoiPreprocessor(posList, width, height)
+motion_gate = MotionGate(posList, width, height)
+overlay_renderer = OverlayRenderer(posList, width, height, COUNT_BUCKET_SIZE)
+
+# Only filter the parts of the frame covered by parking spaces (plus the filter halo).
+# Set to False to run the preprocessing chain over the whole frame.
+ROI_PREPROCESSING = True
+
+# With ROI preprocessing, only filter and re-classify spaces whose part of the camera
+# frame changed; unchanged spaces keep their last count and status.
+MOTION_GATING = True
+detection_stats = {
+    'frames': 0,
+    'spaces_rescored': 0,        # Last frame
+    'spaces_skipped': 0,         # Last frame
+    'total_spaces_checked': 0,
+    'total_spaces_skipped': 0
+}
+
+# Additional camera feeds, each watched by its own detection worker process.
+# Entries are (source, layout) or (lot_id, source, layout) tuples, where source is a
+# camera index, a stream URL or a local video file and layout is a CarParkPos-style file.
+# Lot ids must be unique and must not be PRIMARY_LOT_ID.
+# Example: CAMERA_FEEDS = [('north', 'rtsp://10.0.0.12/stream', 'NorthLotPos'),
+#                          ('south', 'carPark.mp4', 'CarParkPos')]
+CAMERA_FEEDS = []
+PRIMARY_LOT_ID = 'main'  # Lot id of the feed processed by process_video
+detection_supervisor = None
+
+# Server-Sent Events push channel (its own port, one selector thread serving all subscribers)
+SSE_PORT = 5001
+event_server = None
+reservations = state_store.namespace('reservations')  # {space_id: {'user_name': 'name', 'reserved_at': timestamp, ...}}
+reservation_cache = (None, {})  # (reservations version, {space_id: reservation}) read by the detector
+
+# Metrics exposed on /api/metrics
+STAGE_LATENCY = REGISTRY.histogram(
+    'smartpark_stage_seconds', 'Time spent in each frame processing stage', ['stage'])
+FRAMES_PROCESSED = REGISTRY.counter(
+    'smartpark_frames_processed_total', 'Frames run through parking detection')
+FRAMES_DROPPED = REGISTRY.counter(
+    'smartpark_frames_dropped_total', 'Frames dropped in front of a pipeline stage', ['stage'])
+FRAME_AGE = REGISTRY.histogram(
+    'smartpark_frame_age_seconds', 'Time from frame capture until its results are published')
+PIPELINE_QUEUE_DEPTH = REGISTRY.gauge(
+    'smartpark_pipeline_queue_depth', 'Frames waiting in front of a pipeline stage', ['stage'])
+FRAME_ENCODE_LATENCY = REGISTRY.histogram(
+    'smartpark_frame_encode_seconds', 'Time spent resizing and JPEG-encoding frames', ['tier'])
+FRAME_ENCODED_BYTES = REGISTRY.counter(
+    'smartpark_frame_encoded_bytes_total', 'JPEG bytes produced by the frame encoder', ['tier'])
+OTP_STORE = REGISTRY.counter(
+    'smartpark_otp_store_total', 'OTP store lookups, expiries and refused codes', ['store', 'result'])
+OTP_RATE_LIMITED = REGISTRY.counter(
+    'smartpark_otp_rate_limited_total', 'Verification code requests refused by the per-client limit')
+SPACE_CROP_CACHE = REGISTRY.counter(
+    'smartpark_space_crop_cache_total', 'Space snapshot crop cache lookups', ['result'])
+STREAM_VIEWERS = REGISTRY.gauge(
+    'smartpark_stream_viewers', 'Clients connected to /api/video-stream')
+EVENT_SUBSCRIBERS = REGISTRY.gauge(
+    'smartpark_event_subscribers', 'Clients subscribed to the status event stream')
+PARKING_SPACES = REGISTRY.gauge(
+    'smartpark_parking_spaces', 'Parking spaces by status', ['status'])
+HTTP_LATENCY = REGISTRY.histogram(
+    'smartpark_http_request_seconds', 'API request latency', ['endpoint', 'method'])
+HTTP_REQUESTS = REGISTRY.counter(
+    'smartpark_http_requests_total', 'API requests served', ['endpoint', 'method', 'status'])
+
+def collect_live_metrics():
+    """Refresh metrics that mirror live state right before a scrape"""
+    if video_pipeline is not None:
+        for stage, stats in video_pipeline.snapshot()['stages'].items():
+            FRAMES_DROPPED.set(stats['dropped'], stage)
+            if 'queue_depth' in stats:
+                PIPELINE_QUEUE_DEPTH.set(stats['queue_depth'], stage)
+    STREAM_VIEWERS.set(frame_broadcaster.viewers)
+    SPACE_CROP_CACHE.set(space_crop_cache.hits, 'hit')
+    SPACE_CROP_CACHE.set(space_crop_cache.misses, 'miss')
+    for name, store in (('signup', otp_storage), ('password_reset', password_reset_otp_storage)):
+        OTP_STORE.set(store.hits, name, 'hit')
+        OTP_STORE.set(store.misses, name, 'miss')
+        OTP_STORE.set(store.expired, name, 'expired')
+        OTP_STORE.set(store.rejected, name, 'rejected')
+    EVENT_SUBSCRIBERS.set(event_server.subscribers if event_server is not None else 0)
+    for status in ('available', 'occupied', 'reserved'):
+        PARKING_SPACES.set(parking_data[f'{status}_spaces'], status)
+
+REGISTRY.add_collector(collect_live_metrics)
 
 # Simple authentication system
 # No email verification required - direct registration and login
 
-# Caching for optimization
-last_parking_data = None
-last_individual_spaces = None
-frame_cache = None
-last_frame_time = 0
-CACHE_DURATION = 0.5  # Cache for 500ms
 
 
 
+def set_parking_positions(positions):
+    """Install a parking layout and rebuild everything derived from it"""
+    global posList, space_state, space_scorer, roi_preprocessor, motion_gate, overlay_renderer, occupancy_history
+    posList = list(positions)
+    space_state = SpaceState(posList, width, height)
+    occupancy_history = OccupancyHistory(len(posList))
+    space_scorer = SpaceScorer(posList, width, height)
+    roi_preprocessor = RoiPreprocessor(posList, width, height)
+    motion_gate = MotionGate(posList, width, height)
+    overlay_renderer = OverlayRenderer(posList, width, height, COUNT_BUCKET_SIZE)
+    space_crop_cache.clear()
+    return len(posList)
+
 def load_parking_positions():
     """Load parking space positions from pickle file"""
-    global posList
     try:
         with open('CarParkPos', 'rb') as f:
-            posList = pickle.load(f)
-        return len(posList)
+            return set_parking_positions(pickle.load(f))
     except FileNotFoundError:
         print("CarParkPos file not found. Please run ParkingSpacePicker.py first.")
         return 0
 
-def check_parking_space(imgPro, img):
-    """Check parking spaces and draw rectangles"""
-    global parking_data, individual_spaces, last_parking_data, last_individual_spaces
-    spaceCounter = 0
-    reservedCounter = 0
-    individual_spaces = []  # Reset individual spaces
-    
-    for i, pos in enumerate(posList):
-        x, y = pos
-        imgCrop = imgPro[y:y + height, x:x + width]
-        count = cv2.countNonZero(imgCrop)
-        space_id = i + 1
-        
-        # Check if space is reserved
-        is_reserved = space_id in reservations
-        
-        if is_reserved:
-            color = (255, 165, 0)  # Orange for reserved
-            thickness = 3
-            status = 'reserved'
-            reservedCounter += 1
-        elif count < 900:
-            color = (0, 255, 0)  # Green for available
-            thickness = 5
-            spaceCounter += 1
-            status = 'available'
-        else:
-            color = (0, 0, 255)  # Red for occupied
-            thickness = 2
-            status = 'occupied'
-        
-        # Store individual space data
-        individual_spaces.append({
-            'id': space_id,
-            'position': pos,
-            'status': status,
-            'count': count,
-            'is_reserved': is_reserved,
-            'reservation_info': reservations.get(space_id, None),
-            'coordinates': {
-                'x': x,
-                'y': y,
-                'width': width,
-                'height': height
-            }
-        })
-        
-        cv2.rectangle(img, pos, (pos[0] + width, pos[1] + height), color, thickness)
-        cvzone.putTextRect(img, str(count), (x, y + height - 3), scale=1,
-                          thickness=2, offset=0, colorR=color)
+def check_parking_space(imgPro, rescore=None):
+    """Check parking spaces and update the status data (drawing happens on demand)
+
+    `rescore` selects the spaces to re-classify (default: all); the others keep
+    their last count and status.
+    """
+    state = space_state
+    total_spaces = len(state)
+    
+    # Count every space at once from a single summed-area table
+    counts = space_scorer.counts(imgPro)
+    
+    layout_changed = not state.scored
+    if rescore is None or layout_changed or len(rescore) != total_spaces:
+        rescore = np.ones(total_spaces, bool)
+    else:
+        rescore = rescore.copy()
+    
+    # Spaces whose reservation was made or cancelled are always re-classified
+    reservation_changed = state.set_reservations(current_reservations())
+    rescore[reservation_changed] = True
+    
+    changed, status_changed = state.update(counts, rescore, OCCUPIED_THRESHOLD, COUNT_BUCKET_SIZE)
+    changed = np.union1d(changed, reservation_changed)
+    
+    rescored = int(np.count_nonzero(rescore))
+    detection_stats['frames'] += 1
+    detection_stats['spaces_rescored'] = rescored
+    detection_stats['spaces_skipped'] = total_spaces - rescored
+    detection_stats['total_spaces_checked'] += rescored
+    detection_stats['total_spaces_skipped'] += total_spaces - rescored
     
     # Update parking data
-    total_spaces = len(posList)
+    spaceCounter, occupiedCounter, reservedCounter = state.totals()
     new_parking_data = {
         'total_spaces': total_spaces,
         'available_spaces': spaceCounter,
-        'occupied_spaces': total_spaces - spaceCounter - reservedCounter,
+        'occupied_spaces': occupiedCounter,
         'reserved_spaces': reservedCounter,
-        'utilization_rate': int(((total_spaces - spaceCounter - reservedCounter) / total_spaces * 100) if total_spaces > 0 else 0)
+        'utilization_rate': int((occupiedCounter / total_spaces * 100) if total_spaces > 0 else 0)
     }
     
-    # Only update if data has changed
-    if new_parking_data != last_parking_data:
-        parking_data.update(new_parking_data)
-        last_parking_data = new_parking_data.copy()
+    now = time.time()
+    occupancy_history.record(now, new_parking_data, state.status == STATUS_OCCUPIED)
+    if occupancy_store is not None:
+        persist_occupancy(now, new_parking_data, state,
+                          np.arange(total_spaces) if layout_changed else status_changed)
+    
+    # Publish a new snapshot only if something changed
+    totals_changed = new_parking_data != parking_data
+    record_space_changes(state, changed, layout_changed, new_parking_data)
     
-    # Only update individual spaces if they've changed
-    if individual_spaces != last_individual_spaces:
-        last_individual_spaces = individual_spaces.copy()
+    if event_server is not None and event_server.subscribers:
+        publish_space_events(status_changed, layout_changed, new_parking_data if totals_changed else None)
     
-    # Add occupancy text
-    cvzone.putTextRect(img, f'Free: {spaceCounter}/{total_spaces}', (100, 50), scale=3,
-                      thickness=5, offset=20, colorR=(0, 200, 0))
+    return state
 
-def process_video():
-    """Process video frames in a separate thread"""
-    global cap, current_frame, frame_cache, last_frame_time
+def current_reservations():
+    """All reservations, re-read only when some process has changed them"""
+    global reservation_cache
     
-    # Initialize video capture
-    cap = cv2.VideoCapture('carPark.mp4')
+    version = reservations.version
+    if version != reservation_cache[0]:
+        reservation_cache = (version, reservations.items())
+    return reservation_cache[1]
+
+def persist_occupancy(timestamp, status, state, status_changed):
+    """Hand a sample (once per interval) and every status change to the background writer"""
+    global last_persisted_sample
     
-    while True:
-        if cap.get(cv2.CAP_PROP_POS_FRAMES) == cap.get(cv2.CAP_PROP_FRAME_COUNT):
-            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-        
-        success, img = cap.read()
-        if not success:
-            continue
-            
-        # Process the image
-        imgGray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        imgBlur = cv2.GaussianBlur(imgGray, (3, 3), 1)
-        imgThreshold = cv2.adaptiveThreshold(imgBlur, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                                           cv2.THRESH_BINARY_INV, 25, 16)
-        imgMedian = cv2.medianBlur(imgThreshold, 5)
-        kernel = np.ones((3, 3), np.uint8)
-        imgDilate = cv2.dilate(imgMedian, kernel, iterations=1)
-        
-        # Check parking spaces
-        check_parking_space(imgDilate, img)
-        
-        # Store current frame
-        current_frame = img.copy()
-        
-        # Optimized frame rate control
-        time.sleep(0.02)  # ~50 FPS for smoother processing
+    if timestamp - last_persisted_sample >= OCCUPANCY_SAMPLE_INTERVAL:
+        occupancy_store.record_sample(timestamp, status)
+        last_persisted_sample = timestamp
+    if len(status_changed):
+        occupancy_store.record_status_changes(
+            timestamp, [(int(state.ids[i]), STATUS_NAMES[state.status[i]]) for i in status_changed])
+
+def space_version_token(version):
+    """The version clients see: this process's epoch and the change counter"""
+    return f'{SPACE_VERSION_EPOCH}:{version}'
+
+def parse_space_version(token):
+    """The change counter in a version token from this process, or None for any other token"""
+    epoch, _, version = token.partition(':')
+    if epoch != SPACE_VERSION_EPOCH or not version.isdigit():
+        return None
+    return int(version)
+
+def record_space_changes(state, changed, layout_changed, new_parking_data):
+    """Log which spaces changed and publish a snapshot if anything did"""
+    global parking_data, space_version, space_log_floor, status_snapshot
+    
+    with space_log_lock:
+        if len(changed) or layout_changed:
+            space_version += 1
+            if layout_changed:
+                # Old versions refer to a different layout - everyone needs a full snapshot
+                space_change_log.clear()
+                space_log_floor = space_version
+            else:
+                if len(space_change_log) == space_change_log.maxlen:
+                    space_log_floor = space_change_log[0][0]
+                space_change_log.append((space_version, changed))
+        elif new_parking_data == parking_data:
+            return
+        
+        # Replaced, never mutated, so readers always see one consistent state
+        parking_data = new_parking_data
+        status_snapshot = StatusSnapshot(space_version_token(space_version), parking_data, state.copy())
+        snapshot = status_snapshot
+    
+    if state_store.shared:
+        # API workers in other processes serve what is published here
+        state_store.publish_snapshot(snapshot.version, snapshot.timestamp,
+                                     snapshot.status_json, snapshot.spaces_json)
+
+def current_snapshot():
+    """The status to serve: this process's own, or the one the detector process last published"""
+    global status_snapshot
+    
+    snapshot = status_snapshot
+    if not state_store.shared or video_pipeline is not None:
+        return snapshot
+    published = state_store.load_snapshot(snapshot.version, snapshot.timestamp)
+    if published is not None:
+        snapshot = status_snapshot = StatusSnapshot.from_json(*published)
+    return snapshot
+
+def space_count():
+    """Spaces in the layout, known from the published status in API-only workers"""
+    return len(posList) or current_snapshot().status['total_spaces']
+
+def get_space_changes(since):
+    """Return (version, spaces changed after the `since` token), or (version, None) if it is too old or unknown"""
+    snapshot = current_snapshot()
+    if snapshot.state is None:
+        # Published by another process (or nothing detected yet): no change log here, so send everything
+        return snapshot.version, [] if since == snapshot.version else None
+    
+    with space_log_lock:
+        snapshot = status_snapshot
+        if since == snapshot.version:
+            return snapshot.version, []
+        since = parse_space_version(since)
+        if since is None or since > space_version or since < space_log_floor:
+            # From another process (e.g. before a restart), ahead of us or out of the log
+            return snapshot.version, None
+        
+        changed = []
+        for entry_version, indices in reversed(space_change_log):
+            if entry_version <= since:
+                break
+            changed.append(indices)
+    return snapshot.version, snapshot.space_dicts(np.unique(np.concatenate(changed)))
+
+def publish_space_events(status_changed, layout_changed, new_parking_data):
+    """Push the spaces whose status changed (and new totals) to event stream subscribers"""
+    timestamp = time.time()
+    if layout_changed:
+        # Subscribers start over from a full snapshot
+        event_server.publish('snapshot', get_event_snapshot())
+        return
+    
+    snapshot = status_snapshot
+    if len(status_changed):
+        event_server.publish('spaces', {'spaces': snapshot.space_dicts(status_changed),
+                                        'version': snapshot.version, 'timestamp': timestamp})
+    if new_parking_data is not None:
+        event_server.publish('status', dict(new_parking_data, timestamp=timestamp))
+
+def get_event_snapshot():
+    """Full state sent to each new event stream subscriber"""
+    snapshot = status_snapshot
+    return {
+        'status': snapshot.status,
+        'spaces': snapshot.spaces,
+        'version': snapshot.version,
+        'timestamp': snapshot.timestamp
+    }
 
-def frame_to_base64(frame):
-    """Convert OpenCV frame to base64 string with caching"""
-    global frame_cache, last_frame_time
+def process_frame(img):
+    """Preprocess one frame and check the spaces that changed"""
+    with STAGE_LATENCY.time('preprocess'):
+        if ROI_PREPROCESSING:
+            dirty = motion_gate.changed_spaces(img) if MOTION_GATING else None
+            imgDilate = roi_preprocessor.process(img, dirty)
+        else:
+            dirty = None
+            imgDilate = preprocess_frame(img)
     
-    current_time = time.time()
+    # Check parking spaces
+    with STAGE_LATENCY.time('scoring'):
+        state = check_parking_space(imgDilate, dirty)
+    FRAMES_PROCESSED.inc()
+    return img, state.status.copy(), state.count.copy()
+
+def publish_frame(sequence, captured_at, result):
+    """Make a processed frame and the space statuses detected on it available to the API"""
+    global current_frame
+    img, statuses, counts = result
+    current_frame = (sequence, img, statuses, counts)  # Each decoded frame is a fresh array, so no copy is needed
+    if SHARED_FRAMES:
+        write_shared_frame(sequence, captured_at, img, statuses, counts)
+    FRAME_AGE.observe(time.time() - captured_at)
+    frame_broadcaster.publish(sequence)
+
+def write_shared_frame(sequence, captured_at, img, statuses, counts):
+    """Copy a frame into shared memory for API workers, (re)creating the segment to fit it"""
+    global shared_frames
     
-    # Return cached frame if it's still fresh
-    if frame_cache and (current_time - last_frame_time) < CACHE_DURATION:
-        return frame_cache
+    if shared_frames is None or not shared_frames.fits(img.shape, len(statuses)):
+        if shared_frames is not None:
+            shared_frames.close()
+        shared_frames = SharedFrameBuffer.create(FRAME_SHM_NAME, img.shape, len(statuses))
+    shared_frames.write(sequence, captured_at, img, statuses, counts)
+
+def close_shared_frames():
+    """Detach from (or, in the detector, remove) the shared frame segment"""
+    if shared_frames is not None:
+        shared_frames.close()
+
+def latest_frame():
+    """The newest processed frame: this process's own, or views of the detector's in shared memory"""
+    global shared_frames
+    
+    frame = current_frame
+    if frame is not None or not SHARED_FRAMES or video_pipeline is not None:
+        return frame
     
+    with shared_frames_lock:
+        if shared_frames is None or shared_frames.retired:
+            if shared_frames is not None:
+                shared_frames.close()  # Replaced for a new frame size or layout
+            shared_frames = SharedFrameBuffer.attach(FRAME_SHM_NAME)
+            if shared_frames is None:
+                return None
+            if len(posList) != shared_frames.n_spaces:
+                load_parking_positions()  # The overlay and crops need the detector's layout
+        return shared_frames.read()
+
+def get_annotated_frame(frame=None):
+    """Draw the space overlay on the latest frame (or `frame`), only when a viewer asks for it
+
+    Returns None if the detector overwrote a shared-memory frame while it was being drawn.
+    """
+    global annotated_frame_cache
+    
+    if frame is None:
+        frame = latest_frame()
     if frame is None:
         return None
     
-    # Convert BGR to RGB
-    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    sequence, img, statuses, counts = frame
+    cached_sequence, annotated = annotated_frame_cache
+    if cached_sequence == sequence:
+        return annotated
     
-    # Convert to PIL Image
-    pil_image = Image.fromarray(frame_rgb)
-    
-    # Convert to base64 with optimized quality
-    buffer = BytesIO()
-    pil_image.save(buffer, format='JPEG', quality=80, optimize=True)
-    img_str = base64.b64encode(buffer.getvalue()).decode()
+    with STAGE_LATENCY.time('annotation'):
+        annotated = overlay_renderer.render(img, [STATUS_NAMES[code] for code in statuses.tolist()],
+                                            counts.tolist())
+    if not frame_intact(frame):
+        return None  # Torn: the drawing may mix two frames
+    annotated_frame_cache = (sequence, annotated)
+    return annotated
+
+def encode_frame(img, tier=DEFAULT_FRAME_TIER):
+    """Scale an image down to a preview tier and JPEG-encode it with OpenCV"""
+    max_width, quality = FRAME_TIERS[tier]
+    with FRAME_ENCODE_LATENCY.time(tier):
+        if max_width and img.shape[1] > max_width:
+            scaled_height = round(img.shape[0] * max_width / img.shape[1])
+            img = cv2.resize(img, (max_width, scaled_height), interpolation=cv2.INTER_AREA)
+        success, buffer = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not success:
+        return None
+    jpeg = buffer.tobytes()
+    FRAME_ENCODED_BYTES.inc(tier, amount=len(jpeg))
+    return jpeg
+
+def get_frame_jpeg(tier=DEFAULT_FRAME_TIER, frame=None):
+    """Encode the latest annotated frame at a tier, once per frame, shared by every viewer"""
+    return get_sequenced_frame_jpeg(tier, frame)[1]
+
+def get_sequenced_frame_jpeg(tier=DEFAULT_FRAME_TIER, frame=None):
+    """Return (frame sequence, JPEG) for `frame` at a tier, or for a newer frame if `frame` tore"""
+    if frame is None:
+        frame = latest_frame()
     
-    # Cache the result
-    frame_cache = img_str
-    last_frame_time = current_time
+    with frame_jpeg_locks[tier]:
+        for _ in range(FRAME_READ_ATTEMPTS):
+            if frame is None:
+                break
+            sequence = frame[0]
+            cached_sequence, jpeg = frame_jpeg_cache.get(tier, (None, None))
+            if cached_sequence == sequence:
+                return sequence, jpeg
+            
+            annotated = get_annotated_frame(frame)
+            if annotated is not None:
+                jpeg = encode_frame(annotated, tier)
+                frame_jpeg_cache[tier] = (sequence, jpeg)
+                return sequence, jpeg
+            frame = latest_frame()  # Overwritten while it was drawn: start over from the newest one
+    return None, None
+
+def process_video():
+    """Start the decode -> process -> publish pipeline for the video source"""
+    global video_pipeline
     
-    return img_str
+    video_pipeline = FramePipeline(
+        VIDEO_SOURCE,
+        process_frame,
+        publish_frame,
+        queue_size=PIPELINE_QUEUE_SIZE,
+        drop_policy=FRAME_DROP_POLICY,
+        stage_observer=lambda stage, seconds: STAGE_LATENCY.observe(seconds, stage)
+    ).start()
+    return video_pipeline
+
+def get_space_crop(space_id, frame):
+    """JPEG of one space (plus some context) cut from a frame, encoded once per frame
+
+    Returns None if the detector overwrote a shared-memory frame while the crop was copied.
+    """
+    sequence, img = frame[0], frame[1]
+    key = (space_id, sequence)
+    jpeg = space_crop_cache.get(key)
+    if jpeg is None:
+        x, y = posList[space_id - 1]
+        crop = img[max(y - SPACE_CROP_PADDING, 0):y + height + SPACE_CROP_PADDING,
+                   max(x - SPACE_CROP_PADDING, 0):x + width + SPACE_CROP_PADDING]
+        if isinstance(frame, SharedFrame):
+            crop = crop.copy()  # Small, and once it is known to be whole the detector cannot change it
+        if not frame_intact(frame):
+            return None  # Overwritten while it was copied
+        with FRAME_ENCODE_LATENCY.time('crop'):
+            success, buffer = cv2.imencode('.jpg', crop, [cv2.IMWRITE_JPEG_QUALITY, SPACE_CROP_QUALITY])
+        jpeg = buffer.tobytes() if success else b''
+        FRAME_ENCODED_BYTES.inc('crop', amount=len(jpeg))
+        space_crop_cache.put(key, jpeg)
+    return jpeg
+
+def get_space_crops(space_ids, frame):
+    """Return (frame, {space_id: JPEG}) cut from one whole frame: `frame`, or a newer one if it tore"""
+    for _ in range(FRAME_READ_ATTEMPTS):
+        if frame is None:
+            break
+        crops = {}
+        for space_id in space_ids:
+            crops[space_id] = get_space_crop(space_id, frame)
+            if crops[space_id] is None:
+                break
+        else:
+            return frame, crops
+        frame = latest_frame()
+    return None, None
+
+def frame_etag(sequence, tier):
+    """ETag identifying one processed frame at one preview tier"""
+    return f'{FRAME_ETAG_PREFIX}-{sequence}-{tier}'
+
+
 
+@app.before_request
+def start_request_timer():
+    """Remember when the request started for the latency histogram"""
+    g.request_started = time.perf_counter()
 
+@app.after_request
+def record_request_metrics(response):
+    """Record per-endpoint latency and status"""
+    started = g.get('request_started')
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        HTTP_LATENCY.observe(time.perf_counter() - started, endpoint, request.method)
+        HTTP_REQUESTS.inc(endpoint, request.method, str(response.status_code))
+    return response
 
 @app.route('/api/register', methods=['POST'])
 def register_user():
@@ -523,11 +936,12 @@ def register_user():
             return jsonify({'error': 'All required fields must be provided'}), 400
         
         # Check if user data was verified via OTP
-        if email not in otp_storage:
+        stored_data = otp_storage.get(email)
+        if stored_data is None:
             return jsonify({'error': 'Email verification required. Please complete OTP verification first.'}), 400
         
         # Check if OTP was actually verified
-        if not otp_storage[email].get('verified', False):
+        if not stored_data.get('verified', False):
             return jsonify({'error': 'Email verification required. Please complete OTP verification first.'}), 400
         
         # Create user in database
@@ -541,7 +955,7 @@ def register_user():
         })
         
         # Remove OTP data after successful registration
-        del otp_storage[email]
+        otp_storage.pop(email)
         
         return jsonify({
             'message': 'Registration completed successfully',
@@ -555,6 +969,8 @@ def register_user():
         
     except ValueError as e:
         return jsonify({'error': str(e)}), 409
+    except HasherBusy:
+        return jsonify({'error': 'Too many registrations in progress, please retry'}), 503
     except Exception as e:
         print(f"Error in register_user: {e}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -589,6 +1005,8 @@ def login_user():
         else:
             return jsonify({'error': 'Invalid username or password'}), 401
             
+    except HasherBusy:
+        return jsonify({'error': 'Too many login attempts in progress, please retry'}), 503
     except Exception as e:
         print(f"Error in login_user: {e}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -604,18 +1022,20 @@ def send_otp():
             return jsonify({'error': 'Email is required'}), 400
         
         # Check if email already exists
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT id FROM users WHERE email = ?', (email,))
-        existing_user = cursor.fetchone()
-        conn.close()
+        existing_user = find_user_by_email(email)
         
         if existing_user:
             return jsonify({'error': 'Email already registered'}), 409
         
+        if otp_rate_limited():
+            return jsonify({'error': 'Too many verification code requests, please try again later'}), 429
+        
         # Generate and store OTP
         otp = store_otp(email)
         
+        if otp is None:
+            return jsonify({'error': 'Too many pending verification codes, please try again later'}), 503
+        
         # Send OTP via email
         if send_email_otp(email, otp):
             return jsonify({
@@ -658,21 +1078,25 @@ def verify_otp():
             # This is a registration OTP verification
             print(f"✅ Registration OTP verified for {email}")
             
+            stored_data = otp_storage.get(email, count=False)
+            if stored_data is None:
+                # Expired (or was replaced) since it was checked
+                return jsonify({'error': 'Invalid or expired OTP'}), 400
+            
             # If user_data was provided, store it for later use in registration
             if user_data:
                 print(f"💾 Storing user data for registration: {email}")
                 # Keep the original OTP but mark it as verified
-                original_otp = otp_storage[email]['otp']
-                otp_storage[email] = {
-                    'otp': original_otp,  # Keep original OTP
-                    'expires_at': time.time() + 600,
+                otp_storage.set(email, {
+                    'otp': stored_data['otp'],  # Keep original OTP
                     'user_data': user_data,
                     'verified': True  # Mark as verified
-                }
+                })
             else:
-                # If no user_data provided, just mark as verified
+                # If no user_data provided, just mark as verified (keeping its expiry)
                 print(f"💾 Marking OTP as verified for registration: {email}")
-                otp_storage[email]['verified'] = True
+                if not otp_storage.replace(email, dict(stored_data, verified=True)):
+                    return jsonify({'error': 'Invalid or expired OTP'}), 400
         elif isinstance(verified_user_data, dict):
             # This is a login OTP verification - should not happen in this endpoint
             print(f"⚠️ Login OTP received in registration endpoint: {email}")
@@ -701,14 +1125,18 @@ def resend_otp():
         if not email:
             return jsonify({'error': 'Email is required'}), 400
         
+        if otp_rate_limited():
+            return jsonify({'error': 'Too many verification code requests, please try again later'}), 429
+        
         # Check if there's an existing OTP for this email
-        if email in otp_storage:
-            # Remove existing OTP
-            del otp_storage[email]
+        otp_storage.pop(email)
         
         # Generate and store new OTP
         otp = store_otp(email)
         
+        if otp is None:
+            return jsonify({'error': 'Too many pending verification codes, please try again later'}), 503
+        
         # Send new OTP via email
         if send_email_otp(email, otp):
             return jsonify({
@@ -737,18 +1165,20 @@ def forgot_password():
             return jsonify({'error': 'Email is required'}), 400
         
         # Check if user exists
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM users WHERE email = ?', (email,))
-        user = cursor.fetchone()
-        conn.close()
+        user = find_user_by_email(email)
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
+        if otp_rate_limited():
+            return jsonify({'error': 'Too many verification code requests, please try again later'}), 429
+        
         # Generate and store password reset OTP
         otp = store_password_reset_otp(email)
         
+        if otp is None:
+            return jsonify({'error': 'Too many pending verification codes, please try again later'}), 503
+        
         # Send OTP via email
         if send_email_otp(email, otp):
             print(f"📧 Password reset OTP sent to {email}: {otp}")
@@ -814,6 +1244,8 @@ def reset_password():
         else:
             return jsonify({'error': message}), 400
         
+    except HasherBusy:
+        return jsonify({'error': 'Too many password resets in progress, please retry'}), 503
     except Exception as e:
         print(f"❌ Error resetting password: {str(e)}")
         return jsonify({'error': 'Failed to reset password'}), 500
@@ -829,18 +1261,20 @@ def resend_forgot_password_otp():
             return jsonify({'error': 'Email is required'}), 400
         
         # Check if user exists
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM users WHERE email = ?', (email,))
-        user = cursor.fetchone()
-        conn.close()
+        user = find_user_by_email(email)
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
+        if otp_rate_limited():
+            return jsonify({'error': 'Too many verification code requests, please try again later'}), 429
+        
         # Generate and store new password reset OTP
         otp = store_password_reset_otp(email)
         
+        if otp is None:
+            return jsonify({'error': 'Too many pending verification codes, please try again later'}), 503
+        
         # Send OTP via email
         if send_email_otp(email, otp):
             print(f"📧 Password reset OTP resent to {email}: {otp}")
@@ -857,26 +1291,170 @@ def resend_forgot_password_otp():
         print(f"❌ Error resending password reset OTP: {str(e)}")
         return jsonify({'error': 'Failed to resend password reset OTP'}), 500
 
+def build_lot_status(positions, counts):
+    """Build the status totals and space list for a lot watched by a detection worker"""
+    spaces = []
+    available = 0
+    for i, (x, y) in enumerate(positions):
+        count = counts[i] if counts is not None else None
+        if count is None:
+            status = 'unknown'
+        elif count < OCCUPIED_THRESHOLD:
+            status = 'available'
+            available += 1
+        else:
+            status = 'occupied'
+        spaces.append({
+            'id': i + 1,
+            'position': (x, y),
+            'status': status,
+            'count': count,
+            'is_reserved': False,
+            'reservation_info': None,
+            'coordinates': {
+                'x': x,
+                'y': y,
+                'width': width,
+                'height': height
+            }
+        })
+    
+    total_spaces = len(positions)
+    occupied = sum(1 for space in spaces if space['status'] == 'occupied')
+    status = {
+        'total_spaces': total_spaces,
+        'available_spaces': available,
+        'occupied_spaces': occupied,
+        'reserved_spaces': 0,
+        'utilization_rate': int((occupied / total_spaces * 100) if total_spaces > 0 else 0)
+    }
+    return status, spaces
+
+def get_supervised_lots():
+    """Get {lot_id: (status, spaces, lot_info)} for every lot run by the detection supervisor"""
+    if detection_supervisor is None:
+        return {}
+    
+    lots = {}
+    for lot_id, lot in detection_supervisor.snapshot().items():
+        status, spaces = build_lot_status(lot['positions'], lot['counts'])
+        lots[lot_id] = (status, spaces, lot)
+    return lots
+
 @app.route('/api/parking-status')
 def get_parking_status():
     """Get current parking status"""
-    return jsonify(parking_data)
+    snapshot = current_snapshot()
+    if detection_supervisor is None:
+        return Response(snapshot.status_json, mimetype='application/json')
+    
+    # Primary lot stays at the top level; every lot is also listed by id
+    parking_data = snapshot.status
+    lots = {PRIMARY_LOT_ID: dict(parking_data)}
+    for lot_id, (status, _, lot) in get_supervised_lots().items():
+        lots[lot_id] = dict(status, worker_alive=lot['alive'], worker_restarts=lot['restarts'],
+                            updated_at=lot['timestamp'])
+    return jsonify(dict(parking_data, lots=lots))
 
 @app.route('/api/parking-spaces')
 def get_parking_spaces():
-    """Get individual parking space status"""
-    return jsonify({
-        'spaces': individual_spaces,
-        'total_spaces': len(individual_spaces),
-        'timestamp': time.time()
-    })
+    """Get individual parking space status, or only what changed with ?since=<version>"""
+    since = request.args.get('since')
+    if since is not None:
+        version, changes = get_space_changes(since)
+        if changes is not None:
+            return jsonify({
+                'spaces': changes,
+                'version': version,
+                'since': since,
+                'full': False,
+                'total_spaces': space_count(),
+                'timestamp': time.time()
+            })
+    
+    snapshot = current_snapshot()
+    if detection_supervisor is None:
+        return Response(snapshot.spaces_json, mimetype='application/json')
+    
+    response = {
+        'spaces': snapshot.spaces,
+        'version': snapshot.version,
+        'full': True,
+        'total_spaces': len(snapshot.spaces),
+        'timestamp': snapshot.timestamp
+    }
+    lots = {PRIMARY_LOT_ID: {'spaces': snapshot.spaces, 'total_spaces': len(snapshot.spaces)}}
+    for lot_id, (_, spaces, lot) in get_supervised_lots().items():
+        lots[lot_id] = {'spaces': spaces, 'total_spaces': len(spaces), 'updated_at': lot['timestamp']}
+    response['lots'] = lots
+    return jsonify(response)
+
+def valid_epoch(value):
+    """Whether a start/end query argument is a timestamp the history queries can index"""
+    return 0 <= value <= MAX_EPOCH_SECONDS  # False for nan as well as for +/-inf
+
+@app.route('/api/occupancy-history')
+def get_occupancy_history():
+    """Occupancy over time: ?resolution=1s|1m|1h and either start/end (epoch seconds) or points=N"""
+    resolution = request.args.get('resolution', '1m')
+    if resolution not in HISTORY_RESOLUTIONS:
+        return jsonify({'error': f'Unknown resolution, use one of: {", ".join(HISTORY_RESOLUTIONS)}'}), 400
+    bucket_seconds, capacity = HISTORY_RESOLUTIONS[resolution]
+    
+    end = request.args.get('end', type=float)
+    if end is None:
+        end = time.time()
+    points = request.args.get('points', DEFAULT_HISTORY_POINTS, type=int)
+    start = request.args.get('start', type=float)
+    if start is None:
+        start = max(end - min(max(points, 1), capacity) * bucket_seconds, 0)
+    if not (valid_epoch(start) and valid_epoch(end)):
+        return jsonify({'error': f'start and end must be epoch seconds between 0 and {MAX_EPOCH_SECONDS}'}), 400
+    
+    space_ids = None
+    if request.args.get('spaces'):
+        try:
+            space_ids = [int(space_id) for space_id in request.args['spaces'].split(',')]
+        except ValueError:
+            return jsonify({'error': 'spaces must be a comma-separated list of space IDs'}), 400
+        if any(not 1 <= space_id <= len(posList) for space_id in space_ids):
+            return jsonify({'error': 'Invalid space ID'}), 404
+    
+    return jsonify(occupancy_history.query(resolution, start, end, space_ids))
+
+@app.route('/api/occupancy-trends')
+def get_occupancy_trends():
+    """Persisted occupancy rollups: ?resolution=minute|hour&start=<epoch>&end=<epoch> (default: last 24 hours)
+
+    Add events=1 (and optionally space_id=<id>) to include the raw status changes.
+    """
+    if occupancy_store is None:
+        return jsonify({'error': 'Occupancy history is not being recorded'}), 503
+    resolution = request.args.get('resolution', 'hour')
+    if resolution not in ROLLUP_TABLES:
+        return jsonify({'error': f'Unknown resolution, use one of: {", ".join(ROLLUP_TABLES)}'}), 400
+    
+    end = request.args.get('end', type=float)
+    if end is None:
+        end = time.time()
+    start = request.args.get('start', max(end - 86400, 0), type=float)
+    if not (valid_epoch(start) and valid_epoch(end)):
+        return jsonify({'error': f'start and end must be epoch seconds between 0 and {MAX_EPOCH_SECONDS}'}), 400
+    response = {
+        'resolution': resolution,
+        'points': occupancy_store.query_rollup(resolution, start, end)
+    }
+    if request.args.get('events'):
+        response['events'] = occupancy_store.query_events(start, end, request.args.get('space_id', type=int))
+    return jsonify(response)
 
 @app.route('/api/reservations', methods=['GET'])
 def get_reservations():
     """Get all current reservations"""
+    current = reservations.items()
     return jsonify({
-        'reservations': reservations,
-        'total_reservations': len(reservations)
+        'reservations': current,
+        'total_reservations': len(current)
     })
 
 @app.route('/api/reservations', methods=['POST'])
@@ -894,26 +1472,25 @@ def create_reservation():
             return jsonify({'error': 'Space ID and user name are required'}), 400
         
         # Check if space exists
-        if space_id < 1 or space_id > len(posList):
+        if space_id < 1 or space_id > space_count():
             return jsonify({'error': 'Invalid space ID'}), 400
         
-        # Check if space is already reserved
-        if space_id in reservations:
-            return jsonify({'error': 'Space is already reserved'}), 409
-        
-        # Create reservation
-        reservations[space_id] = {
+        # Create the reservation unless the space is already reserved (one atomic step,
+        # so two workers cannot both win the same space)
+        reservation = {
             'user_name': user_name,
             'reserved_at': time.time(),
             'duration_minutes': duration_minutes,
             'expires_at': time.time() + (duration_minutes * 60)
         }
+        if not reservations.add(space_id, reservation):
+            return jsonify({'error': 'Space is already reserved'}), 409
         
-        print(f"Reservation created successfully. Current reservations: {reservations}")
+        print(f"Reservation created successfully. Current reservations: {len(reservations)}")
         
         return jsonify({
             'message': 'Reservation created successfully',
-            'reservation': reservations[space_id]
+            'reservation': reservation
         }), 201
         
     except Exception as e:
@@ -924,8 +1501,7 @@ def create_reservation():
 def cancel_reservation(space_id):
     """Cancel a reservation"""
     try:
-        if space_id in reservations:
-            del reservations[space_id]
+        if reservations.pop(space_id) is not None:
             return jsonify({'message': 'Reservation cancelled successfully'}), 200
         else:
             return jsonify({'error': 'Reservation not found'}), 404
@@ -935,26 +1511,122 @@ def cancel_reservation(space_id):
 
 @app.route('/api/video-frame')
 def get_video_frame():
-    """Get current video frame as base64"""
-    if current_frame is not None:
-        frame_b64 = frame_to_base64(current_frame)
-        return jsonify({
-            'frame': frame_b64,
+    """Get current video frame as base64 at ?tier=thumb|medium|full (304 if the client already has it)"""
+    tier = request.args.get('tier', DEFAULT_FRAME_TIER)
+    if tier not in FRAME_TIERS:
+        return jsonify({'error': f'Unknown tier, use one of: {", ".join(FRAME_TIERS)}'}), 400
+    
+    frame = latest_frame()
+    if frame is None:
+        return jsonify({'error': 'No frame available'})
+    
+    # Clients polling faster than the camera get a 304 without any encoding
+    sequence = frame[0]
+    etag = frame_etag(sequence, tier)
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        sequence, jpeg = get_sequenced_frame_jpeg(tier, frame)
+        if sequence is None:
+            return jsonify({'error': 'No frame available'})
+        etag = frame_etag(sequence, tier)  # Newer than `frame` if that one was overwritten mid-encode
+        response = jsonify({
+            'frame': base64.b64encode(jpeg).decode() if jpeg is not None else None,
+            'tier': tier,
+            'sequence': sequence,
             'timestamp': time.time()
         })
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/api/parking-spaces/<int:space_id>/snapshot')
+def get_space_snapshot(space_id):
+    """JPEG crop of one space from the latest frame"""
+    if not 1 <= space_id <= space_count():
+        return jsonify({'error': 'Invalid space ID'}), 404
+    frame = latest_frame()
+    if frame is None:
+        return jsonify({'error': 'No frame available'}), 503
+    
+    etag = frame_etag(frame[0], f'space{space_id}')
+    if etag in request.if_none_match:
+        response = Response(status=304)
     else:
-        return jsonify({'error': 'No frame available'})
+        frame, crops = get_space_crops([space_id], frame)
+        if frame is None:
+            return jsonify({'error': 'No frame available'}), 503
+        etag = frame_etag(frame[0], f'space{space_id}')
+        response = Response(crops[space_id], mimetype='image/jpeg')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/api/parking-spaces/snapshots')
+def get_space_snapshots():
+    """Base64 JPEG crops of several spaces from the same frame: ?ids=1,2,3"""
+    try:
+        space_ids = [int(space_id) for space_id in request.args.get('ids', '').split(',') if space_id]
+    except ValueError:
+        return jsonify({'error': 'ids must be a comma-separated list of space IDs'}), 400
+    if not space_ids or len(space_ids) > MAX_BATCH_SNAPSHOTS:
+        return jsonify({'error': f'Request between 1 and {MAX_BATCH_SNAPSHOTS} space IDs'}), 400
+    invalid = [space_id for space_id in space_ids if not 1 <= space_id <= space_count()]
+    if invalid:
+        return jsonify({'error': f'Invalid space IDs: {invalid}'}), 404
+    frame, crops = get_space_crops(space_ids, latest_frame())
+    if frame is None:
+        return jsonify({'error': 'No frame available'}), 503
+    
+    return jsonify({
+        'snapshots': {space_id: base64.b64encode(jpeg).decode() for space_id, jpeg in crops.items()},
+        'sequence': frame[0],
+        'timestamp': time.time()
+    })
+
+@app.route('/api/video-stream')
+def stream_video():
+    """Stream annotated frames as MJPEG (multipart/x-mixed-replace) at ?tier=thumb|medium|full"""
+    tier = request.args.get('tier', DEFAULT_FRAME_TIER)
+    if tier not in FRAME_TIERS:
+        return jsonify({'error': f'Unknown tier, use one of: {", ".join(FRAME_TIERS)}'}), 400
+    if video_pipeline is None:
+        # Only the detector publishes frames to the broadcaster; a worker would hold the connection forever
+        return jsonify({'error': 'The live video stream is only served by the detector process'}), 503
+    return Response(frame_broadcaster.stream(lambda: get_frame_jpeg(tier)), mimetype=MJPEG_MIMETYPE,
+                    headers={'Cache-Control': 'no-cache, private', 'Pragma': 'no-cache'})
 
 @app.route('/api/health')
 def health_check():
     """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'parking_spaces_loaded': len(posList)})
+    return jsonify({
+        'status': 'healthy',
+        'parking_spaces_loaded': len(posList),
+        'detection': detection_stats,
+        'occupancy_history_bytes': occupancy_history.nbytes(),
+        'occupancy_store': {
+            'written': occupancy_store.written,
+            'dropped': occupancy_store.dropped,
+            'batches': occupancy_store.batches
+        } if occupancy_store is not None else None,
+        'mail_outbox': {
+            'pending': mail_outbox.pending(),
+            'sent': mail_outbox.sent,
+            'failed': mail_outbox.failed,
+            'retries': mail_outbox.retries,
+            'connections': mail_outbox.connections
+        },
+        'pipeline': video_pipeline.snapshot() if video_pipeline is not None else None
+    })
+
+@app.route('/api/metrics')
+def get_metrics():
+    """Prometheus-style metrics"""
+    return Response(REGISTRY.render(), content_type=METRICS_CONTENT_TYPE)
 
 def start_video_processing():
-    """Start video processing in background thread"""
-    thread = threading.Thread(target=process_video, daemon=True)
-    thread.start()
-    return thread
+    """Start video processing in background threads"""
+    return process_video()
 
 if __name__ == '__main__':
     # Load parking positions
@@ -966,7 +1638,25 @@ if __name__ == '__main__':
     print(f"Loaded {total_spaces} parking spaces")
     
     # Start video processing
-    video_thread = start_video_processing()
+    video_pipeline = start_video_processing()
+    atexit.register(close_shared_frames)
+    
+    # Start one detection worker process per additional camera feed
+    if CAMERA_FEEDS:
+        detection_supervisor = DetectionSupervisor(CAMERA_FEEDS, reserved_lot_ids=(PRIMARY_LOT_ID,)).start()
+        print(f"Watching {len(CAMERA_FEEDS)} additional camera feeds")
+    
+    # Persist occupancy history without ever blocking the detection loop
+    occupancy_store = OccupancyStore(OCCUPANCY_DB_FILE).start()
+    atexit.register(occupancy_store.stop)
+    
+    # Deliver queued email in the background; flush what is left on exit
+    mail_outbox.start()
+    atexit.register(mail_outbox.stop)
+    
+    # Push status changes to dashboards over Server-Sent Events
+    event_server = EventStreamServer(('0.0.0.0', SSE_PORT), get_event_snapshot).start()
+    print(f"Streaming status events on http://localhost:{SSE_PORT}{EVENTS_PATH}")
     
     # Start Flask server
     print("Starting Flask server on http://localhost:5000")
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+SmartPark offline batch analysis
+Re-runs parking detection over recorded footage as fast as the CPU allows and
+writes a compact per-frame occupancy timeline.
+
+Usage:
+    python batch_analysis.py carPark.mp4 --layout CarParkPos --output carPark_timeline.npz
+"""
+
+import argparse
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from detection import (SpaceScorer, RoiPreprocessor, OCCUPIED_THRESHOLD,
+                       SPACE_WIDTH, SPACE_HEIGHT)
+
+DEFAULT_CHUNK_FRAMES = 250
+
+
+def analyse_range(video, positions, start, stop):
+    """Return a (frames, spaces) uint16 count array for frames [start, stop)"""
+    cv2.setNumThreads(1)  # One process per core already - avoid oversubscription
+    scorer = SpaceScorer(positions, SPACE_WIDTH, SPACE_HEIGHT)
+    roi_preprocessor = RoiPreprocessor(positions, SPACE_WIDTH, SPACE_HEIGHT)
+
+    cap = seek(video, start)
+    counts = np.zeros((stop - start, len(positions)), np.uint16)
+
+    read = 0
+    while read < stop - start:
+        success, img = cap.read()
+        if not success:
+            break
+        counts[read] = scorer.counts(roi_preprocessor.process(img))
+        read += 1
+
+    cap.release()
+    return start, counts[:read]
+
+
+def seek(video, start):
+    """A capture whose next read() returns frame `start`
+
+    Seeking compressed footage (H.264/MPEG-4) can land on a nearby keyframe, so
+    the reported position is checked and the rest of the way is decoded.
+    """
+    cap = cv2.VideoCapture(video)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    if position > start or position < 0:
+        cap.release()
+        cap = cv2.VideoCapture(video)   # Overshot: decode from the first frame
+        position = 0
+    for _ in range(start - position):
+        if not cap.grab():
+            cap.release()
+            raise RuntimeError(f'Could not seek to frame {start} of {video}')
+    return cap
+
+
+def frame_ranges(total_frames, chunk_frames):
+    """Split [0, total_frames) into consecutive chunks"""
+    return [(start, min(start + chunk_frames, total_frames))
+            for start in range(0, total_frames, chunk_frames)]
+
+
+def analyse_video(video, positions, workers=None, chunk_frames=DEFAULT_CHUNK_FRAMES):
+    """Process every frame of `video` in a process pool and return the timeline dict"""
+    cap = cv2.VideoCapture(video)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    cap.release()
+    if total_frames <= 0:
+        raise ValueError(f'Could not read frames from {video}')
+
+    started = time.time()
+    chunks = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        ranges = frame_ranges(total_frames, chunk_frames)
+        futures = [pool.submit(analyse_range, video, positions, start, stop) for start, stop in ranges]
+        for (start, stop), future in zip(ranges, futures):
+            _, counts = future.result()
+            # A short chunk would shift every later frame; only the last may end early
+            # because CAP_PROP_FRAME_COUNT is an estimate for some containers
+            if len(counts) != stop - start and stop != total_frames:
+                raise RuntimeError(f'Decoded {len(counts)} of frames {start}-{stop} of {video}')
+            chunks[start] = counts
+    elapsed = time.time() - started
+
+    counts = np.concatenate([chunks[start] for start in sorted(chunks)])
+    occupied = counts >= OCCUPIED_THRESHOLD
+    return {
+        'counts': counts,
+        'occupied': occupied,
+        'free_spaces': (~occupied).sum(axis=1).astype(np.uint16),
+        'fps': fps,
+        'elapsed': elapsed,
+        'frames_per_second': len(counts) / elapsed if elapsed > 0 else 0.0
+    }
+
+
+def save_timeline(path, timeline, positions):
+    """Write the timeline as a compressed .npz file"""
+    frames = len(timeline['counts'])
+    np.savez_compressed(
+        path,
+        positions=np.asarray(positions, np.int32),
+        counts=timeline['counts'],
+        occupied=np.packbits(timeline['occupied'], axis=1),
+        free_spaces=timeline['free_spaces'],
+        seconds=np.arange(frames) / timeline['fps'] if timeline['fps'] else np.arange(frames),
+        threshold=OCCUPIED_THRESHOLD
+    )
+
+
+def load_timeline(path):
+    """Read a timeline written by save_timeline"""
+    with np.load(path) as data:
+        positions = data['positions']
+        return {
+            'positions': positions,
+            'counts': data['counts'],
+            'occupied': np.unpackbits(data['occupied'], axis=1, count=len(positions)).astype(bool),
+            'free_spaces': data['free_spaces'],
+            'seconds': data['seconds']
+        }
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Backfill parking occupancy from recorded footage')
+    parser.add_argument('video', help='Recorded video file, e.g. carPark.mp4')
+    parser.add_argument('--layout', default='CarParkPos', help='Parking space positions file')
+    parser.add_argument('--output', help='Timeline file (default: <video>_timeline.npz)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Worker processes')
+    parser.add_argument('--chunk-frames', type=int, default=DEFAULT_CHUNK_FRAMES,
+                        help='Frames per work unit')
+    args = parser.parse_args()
+
+    with open(args.layout, 'rb') as f:
+        positions = pickle.load(f)
+    output = args.output or os.path.splitext(args.video)[0] + '_timeline.npz'
+
+    print(f"🎥 Analysing {args.video} ({len(positions)} spaces) with {args.workers} workers")
+    timeline = analyse_video(args.video, positions, args.workers, args.chunk_frames)
+    save_timeline(output, timeline, positions)
+
+    print(f"✅ {len(timeline['counts'])} frames in {timeline['elapsed']:.1f}s "
+          f"({timeline['frames_per_second']:.1f} frames/sec)")
+    print(f"💾 Timeline written to {output}")
+
+
+if __name__ == "__main__":
+    main()
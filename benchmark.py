@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+SmartPark benchmark suite
+Runs offline on synthetic frames and layouts - no video or server needed.
+
+Usage:
+    python benchmark.py                                  # run and print
+    python benchmark.py --output bench.json              # save results
+    python benchmark.py --compare bench.json             # fail on regressions
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from detection import (SpaceScorer, RoiPreprocessor, MotionGate, preprocess_frame,
+                       SPACE_WIDTH, SPACE_HEIGHT)
+
+FRAME_SHAPE = (720, 1280)
+WIDE_FRAME_SHAPE = (1080, 1920)
+SPACE_COUNTS = [69, 250, 1000, 2500, 10000]
+BACKEND_SPACE_COUNTS = [69, 250, 1000, 2500]
+PASSWORD_COSTS = [2 ** 12, 2 ** 13, 2 ** 14, 2 ** 15]   # scrypt N values
+LOGIN_STORM_CLIENTS = 16      # Concurrent logins in the password hashing benchmark
+REGRESSION_TOLERANCE = 0.25   # Fail --compare when a benchmark gets 25% slower
+
+
+def synthetic_binary_frame(shape=FRAME_SHAPE, seed=0):
+    """Create a random 0/255 frame that looks like the dilated threshold output"""
+    rng = np.random.default_rng(seed)
+    noise = rng.random(shape) < 0.15
+    frame = noise.astype(np.uint8) * 255
+    return cv2.dilate(frame, np.ones((3, 3), np.uint8), iterations=1)
+
+
+def synthetic_layout(count, shape=FRAME_SHAPE, seed=0):
+    """Create `count` random space positions inside the frame"""
+    rng = np.random.default_rng(seed)
+    xs = rng.integers(0, shape[1] - SPACE_WIDTH, size=count)
+    ys = rng.integers(0, shape[0] - SPACE_HEIGHT, size=count)
+    return [(int(x), int(y)) for x, y in zip(xs, ys)]
+
+
+def synthetic_color_frame(shape=FRAME_SHAPE, seed=0):
+    """Create a smooth random BGR frame for the preprocessing chain"""
+    rng = np.random.default_rng(seed)
+    frame = (rng.random((shape[0], shape[1], 3)) * 255).astype(np.uint8)
+    return cv2.GaussianBlur(frame, (7, 7), 2)
+
+
+def synthetic_lot_layout(rows=4, cols=16, origin=(100, 600)):
+    """Create a grid of spaces in one band of the frame, like a wide-angle camera view"""
+    x0, y0 = origin
+    return [(x0 + c * SPACE_WIDTH, y0 + r * (SPACE_HEIGHT + 10))
+            for r in range(rows) for c in range(cols)]
+
+
+def count_per_space(imgPro, posList):
+    """Reference implementation: the original one-slice-per-space loop"""
+    counts = []
+    for x, y in posList:
+        imgCrop = imgPro[y:y + SPACE_HEIGHT, x:x + SPACE_WIDTH]
+        counts.append(cv2.countNonZero(imgCrop))
+    return np.array(counts)
+
+
+def time_call(func, repeat):
+    """Return mean/p50/p95/p99 wall time of `func` in milliseconds"""
+    func()  # warm up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples = np.array(samples)
+    return {
+        'mean_ms': float(samples.mean()),
+        'p50_ms': float(np.percentile(samples, 50)),
+        'p95_ms': float(np.percentile(samples, 95)),
+        'p99_ms': float(np.percentile(samples, 99)),
+        'repeat': repeat
+    }
+
+
+def record(results, name, timing, **params):
+    """Add one benchmark result and print it"""
+    results.append(dict(timing, name=name, params=params))
+    label = ' '.join(f'{key}={value}' for key, value in params.items())
+    print(f"  {name:<30} {label:<36} {timing['mean_ms']:>9.3f} ms  (p95 {timing['p95_ms']:.3f})")
+
+
+def bench_scoring(results, repeat=20):
+    """Compare per-space counting against the summed-area table scorer"""
+    print("\n🧪 Space scoring")
+    imgPro = synthetic_binary_frame()
+    for count in SPACE_COUNTS:
+        posList = synthetic_layout(count)
+        scorer = SpaceScorer(posList)
+
+        if not np.array_equal(scorer.counts(imgPro), count_per_space(imgPro, posList)):
+            raise AssertionError(f"Scorer counts differ from reference at {count} spaces")
+
+        record(results, 'scoring.per_space_loop',
+               time_call(lambda: count_per_space(imgPro, posList), repeat), spaces=count)
+        record(results, 'scoring.integral_image',
+               time_call(lambda: scorer.counts(imgPro), repeat), spaces=count)
+
+
+def bench_preprocessing(results, repeat=20):
+    """Compare the full-frame chain against ROI-restricted preprocessing"""
+    print("\n🧪 Preprocessing chain")
+    for shape in (FRAME_SHAPE, WIDE_FRAME_SHAPE):
+        img = synthetic_color_frame(shape)
+        posList = synthetic_lot_layout(cols=shape[1] // SPACE_WIDTH - 2,
+                                       origin=(100, shape[0] - 300))
+        roi = RoiPreprocessor(posList)
+
+        imgFull = preprocess_frame(img)
+        imgRoi = roi.process(img)
+        for x, y in posList:
+            window = (slice(y, y + SPACE_HEIGHT), slice(x, x + SPACE_WIDTH))
+            if not np.array_equal(imgFull[window], imgRoi[window]):
+                raise AssertionError(f"ROI output differs from full frame at space {(x, y)}")
+
+        frame = f'{shape[1]}x{shape[0]}'
+        record(results, 'preprocess.full_frame',
+               time_call(lambda: preprocess_frame(img), repeat), frame=frame)
+        record(results, 'preprocess.roi',
+               time_call(lambda: roi.process(img), repeat),
+               frame=frame, coverage=round(roi.coverage(), 3))
+
+        # A mostly static lot: successive frames differ in one space only
+        imgMoved = img.copy()
+        x, y = posList[len(posList) // 2]
+        imgMoved[y:y + SPACE_HEIGHT, x:x + SPACE_WIDTH] = 255 - imgMoved[y:y + SPACE_HEIGHT, x:x + SPACE_WIDTH]
+        frames = [img, imgMoved]
+        gate = MotionGate(posList)
+        gated = RoiPreprocessor(posList)
+
+        def process_gated():
+            frames.reverse()
+            return gated.process(frames[0], gate.changed_spaces(frames[0]))
+
+        process_gated()
+        record(results, 'preprocess.roi_gated',
+               time_call(process_gated, repeat), frame=frame, spaces=len(posList))
+
+
+def bench_check_parking_space(results, repeat=20):
+    """Time backend.check_parking_space at increasing space counts"""
+    import backend
+
+    print("\n🧪 check_parking_space")
+    imgPro = synthetic_binary_frame()
+    for count in BACKEND_SPACE_COUNTS:
+        backend.set_parking_positions(synthetic_layout(count))
+        record(results, 'backend.check_parking_space',
+               time_call(lambda: backend.check_parking_space(imgPro), repeat), spaces=count)
+
+
+def bench_frame_encoding(results, repeat=20):
+    """Time backend.encode_frame for every preview tier on a full-size frame"""
+    import backend
+
+    print("\n🧪 encode_frame")
+    img = synthetic_color_frame()
+    for tier in backend.FRAME_TIERS:
+        record(results, 'backend.encode_frame', time_call(lambda: backend.encode_frame(img, tier), repeat),
+               frame=f'{FRAME_SHAPE[1]}x{FRAME_SHAPE[0]}', tier=tier)
+
+
+def bench_parking_spaces_json(results, repeat=50):
+    """Time /api/parking-spaces serialization at increasing space counts"""
+    import backend
+
+    print("\n🧪 /api/parking-spaces")
+    client = backend.app.test_client()
+    imgPro = synthetic_binary_frame()
+    for count in BACKEND_SPACE_COUNTS:
+        backend.set_parking_positions(synthetic_layout(count))
+        backend.check_parking_space(imgPro)
+        record(results, 'api.parking_spaces',
+               time_call(lambda: client.get('/api/parking-spaces'), repeat), spaces=count)
+
+
+def bench_password_hashing(results, repeat=4):
+    """Logins/sec and p99 latency of a concurrent /api/login storm at each PASSWORD_SCRYPT_N cost"""
+    import backend
+    from password_hashing import PasswordHasher
+
+    print("\n🧪 Password hashing (login storm)")
+    password = 'correct horse battery staple'
+    original = backend.PASSWORD_SCRYPT_N, backend.password_hasher
+    try:
+        for cost in PASSWORD_COSTS:
+            hasher = PasswordHasher(n=cost, workers=backend.PASSWORD_HASH_WORKERS)
+            backend.PASSWORD_SCRYPT_N, backend.password_hasher = cost, hasher
+            with backend.db_pool.transaction() as conn:
+                conn.execute('DELETE FROM users WHERE username = ?', ('bench_login',))
+                conn.execute('INSERT INTO users (username, email, password_hash, full_name) VALUES (?, ?, ?, ?)',
+                             ('bench_login', 'bench_login@example.com', hasher.hash(password), 'Bench Login'))
+            samples = []
+            failures = []
+
+            def login():
+                client = backend.app.test_client()
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    response = client.post('/api/login', json={'username': 'bench_login', 'password': password})
+                    samples.append((time.perf_counter() - start) * 1000)
+                    if response.status_code != 200:
+                        failures.append(response.status_code)
+
+            clients = [threading.Thread(target=login) for _ in range(LOGIN_STORM_CLIENTS)]
+            start = time.perf_counter()
+            for client in clients:
+                client.start()
+            for client in clients:
+                client.join()
+            elapsed = time.perf_counter() - start
+            hasher.shutdown()
+            if failures:
+                raise RuntimeError(f"{len(failures)} logins failed at N={cost}: {sorted(set(failures))}")
+
+            samples = np.array(samples)
+            timing = {
+                'mean_ms': float(samples.mean()),
+                'p50_ms': float(np.percentile(samples, 50)),
+                'p95_ms': float(np.percentile(samples, 95)),
+                'p99_ms': float(np.percentile(samples, 99)),
+                'repeat': len(samples),
+                'logins_per_sec': len(samples) / elapsed
+            }
+            record(results, 'auth.login_storm', timing, n=cost, clients=LOGIN_STORM_CLIENTS)
+            print(f"  {'':<30} {'':<36} {timing['logins_per_sec']:>9.1f} logins/s  (p99 {timing['p99_ms']:.1f} ms)")
+    finally:
+        backend.PASSWORD_SCRYPT_N, backend.password_hasher = original
+        with backend.db_pool.transaction() as conn:
+            conn.execute('DELETE FROM users WHERE username = ?', ('bench_login',))
+
+
+BENCHMARKS = [
+    bench_scoring,
+    bench_preprocessing,
+    bench_check_parking_space,
+    bench_frame_encoding,
+    bench_parking_spaces_json,
+    bench_password_hashing
+]
+
+
+def result_key(result):
+    """Identify a result by benchmark name and parameters"""
+    return result['name'], json.dumps(result['params'], sort_keys=True)
+
+
+def compare_results(previous, current, tolerance=REGRESSION_TOLERANCE):
+    """Return (new, old) result pairs that got slower than `tolerance` allows"""
+    baseline = {result_key(result): result for result in previous['results']}
+    regressions = []
+    for result in current['results']:
+        old = baseline.get(result_key(result))
+        if old and result['mean_ms'] > old['mean_ms'] * (1 + tolerance):
+            regressions.append((result, old))
+    return regressions
+
+
+def run_benchmarks(benchmarks=BENCHMARKS):
+    """Run every benchmark and return the results with environment metadata"""
+    results = []
+    for benchmark in benchmarks:
+        benchmark(results)
+    return {
+        'timestamp': time.time(),
+        'python': sys.version.split()[0],
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'results': results
+    }
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='SmartPark performance benchmarks')
+    parser.add_argument('--output', help='Write results to this JSON file')
+    parser.add_argument('--compare', help='Compare against a previous JSON results file')
+    parser.add_argument('--tolerance', type=float, default=REGRESSION_TOLERANCE,
+                        help='Allowed slowdown before --compare fails (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    print("🚀 Starting SmartPark benchmarks")
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.setdefault('SMARTPARK_DB_FILE', os.path.join(tmp, 'users.db'))  # Leave the real users alone
+        report = run_benchmarks()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        regressions = compare_results(previous, report, args.tolerance)
+        for result, old in regressions:
+            print(f"❌ {result['name']} {result['params']}: "
+                  f"{old['mean_ms']:.3f} ms -> {result['mean_ms']:.3f} ms")
+        if regressions:
+            sys.exit(1)
+        print(f"\n✅ No regressions against {args.compare}")
+
+    print("\n✨ Benchmarks completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+"""
+pytest setup: the backend gets a throwaway user database, so test runs never
+touch smartpark_users.db. Set before any test module imports backend.
+"""
+
+import atexit
+import os
+import shutil
+import tempfile
+
+TEST_DATA_DIR = tempfile.mkdtemp(prefix='smartpark-tests-')
+os.environ['SMARTPARK_DB_FILE'] = os.path.join(TEST_DATA_DIR, 'users.db')
+atexit.register(shutil.rmtree, TEST_DATA_DIR, True)
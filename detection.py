@@ -0,0 +1,286 @@
+"""
+SmartPark detection helpers
+Shared by backend.py and main.py so both score parking spaces the same way.
+"""
+
+import cv2
+import numpy as np
+
+# Size of one parking space rectangle (matches ParkingSpacePicker.py)
+SPACE_WIDTH, SPACE_HEIGHT = 107, 48
+
+# A space with fewer non-zero pixels than this is considered free
+OCCUPIED_THRESHOLD = 900
+
+# Preprocessing chain parameters
+BLUR_KSIZE = 3
+THRESHOLD_BLOCK_SIZE = 25
+MEDIAN_KSIZE = 5
+DILATE_KSIZE = 3
+
+# How far (in pixels) each output pixel of the chain can see into the input
+FILTER_HALO = (BLUR_KSIZE // 2 + THRESHOLD_BLOCK_SIZE // 2 +
+               MEDIAN_KSIZE // 2 + DILATE_KSIZE // 2)
+
+# Motion gating: the camera frame is compared in blocks of this many pixels against
+# the last frame each block was filtered on. A block counts as changed once any
+# channel's block mean moves by more than the tolerance (sensor noise stays below it).
+# Every space is filtered again every MOTION_REFRESH_FRAMES frames regardless.
+MOTION_BLOCK_SIZE = 16
+MOTION_TOLERANCE = 2
+MOTION_REFRESH_FRAMES = 250
+
+_DILATE_KERNEL = np.ones((DILATE_KSIZE, DILATE_KSIZE), np.uint8)
+
+
+def preprocess_frame(img):
+    """Run the grayscale -> blur -> threshold -> median -> dilate chain on a BGR frame"""
+    imgGray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    imgBlur = cv2.GaussianBlur(imgGray, (BLUR_KSIZE, BLUR_KSIZE), 1)
+    imgThreshold = cv2.adaptiveThreshold(imgBlur, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                         cv2.THRESH_BINARY_INV, THRESHOLD_BLOCK_SIZE, 16)
+    imgMedian = cv2.medianBlur(imgThreshold, MEDIAN_KSIZE)
+    return cv2.dilate(imgMedian, _DILATE_KERNEL, iterations=1)
+
+
+class SpaceScorer:
+    """Count non-zero pixels for every parking space from one summed-area table
+
+    width and height may be scalars or per-space arrays.
+    """
+
+    def __init__(self, positions, width=SPACE_WIDTH, height=SPACE_HEIGHT):
+        self.positions = np.asarray(positions, dtype=np.int64).reshape(-1, 2)
+        self.width = width
+        self.height = height
+        self._frame_shape = None
+        self._corners = None
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _build_corners(self, frame_shape):
+        """Precompute flat indices of the four table corners of every space"""
+        rows, cols = frame_shape[:2]
+        x1 = np.clip(self.positions[:, 0], 0, cols)
+        y1 = np.clip(self.positions[:, 1], 0, rows)
+        x2 = np.clip(self.positions[:, 0] + self.width, 0, cols)
+        y2 = np.clip(self.positions[:, 1] + self.height, 0, rows)
+
+        # The summed-area table has one extra row and column
+        stride = cols + 1
+        self._corners = np.stack([
+            y2 * stride + x2,
+            y1 * stride + x2,
+            y2 * stride + x1,
+            y1 * stride + x1,
+        ])
+        self._frame_shape = frame_shape[:2]
+
+    def counts(self, imgPro):
+        """Return an int array with the non-zero pixel count of each space"""
+        if len(self.positions) == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        if self._frame_shape != imgPro.shape[:2]:
+            self._build_corners(imgPro.shape)
+
+        # Map every non-zero pixel to 1 so the table sums give exact counts
+        _, imgBinary = cv2.threshold(imgPro, 0, 1, cv2.THRESH_BINARY)
+        table = cv2.integral(imgBinary, sdepth=cv2.CV_32S)
+
+        a, b, c, d = table.ravel().take(self._corners).astype(np.int64)
+        return a - b - c + d
+
+
+class RoiPreprocessor:
+    """Run the preprocessing chain only over the regions covered by parking spaces
+
+    Each region is the bounding box of a group of overlapping spaces, grown by
+    FILTER_HALO so every pixel inside a space comes out exactly as it would from
+    preprocess_frame. Pixels outside all regions are left at zero.
+    """
+
+    def __init__(self, positions, width=SPACE_WIDTH, height=SPACE_HEIGHT):
+        self.positions = np.asarray(positions, dtype=np.int64).reshape(-1, 2)
+        self.width = width
+        self.height = height
+        self.regions = []  # [(crop_slices, core_slices_in_crop, core_slices_in_frame)]
+        self._frame_shape = None
+        self._previous = None  # Last output, reused for spaces a gated call skips
+
+    def _build_regions(self, frame_shape):
+        """Merge the halo-grown space rectangles into bounding regions"""
+        rows, cols = frame_shape[:2]
+        mask = np.zeros((rows, cols), np.uint8)
+        for x, y in self.positions:
+            mask[max(y - FILTER_HALO, 0):max(y + self.height + FILTER_HALO, 0),
+                 max(x - FILTER_HALO, 0):max(x + self.width + FILTER_HALO, 0)] = 1
+
+        self.regions = []
+        num_labels, labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=4)
+        region_of_label = np.full(num_labels, -1)
+        for label in range(1, num_labels):
+            x, y, w, h = stats[label, :4]
+            crop = (slice(y, y + h), slice(x, x + w))
+
+            # Only pixels at least FILTER_HALO away from a cut edge are exact;
+            # edges that touch the frame border see the same border handling
+            top = y if y == 0 else y + FILTER_HALO
+            left = x if x == 0 else x + FILTER_HALO
+            bottom = y + h if y + h == rows else y + h - FILTER_HALO
+            right = x + w if x + w == cols else x + w - FILTER_HALO
+            if bottom <= top or right <= left:
+                continue
+
+            core_in_crop = (slice(top - y, bottom - y), slice(left - x, right - x))
+            core_in_frame = (slice(top, bottom), slice(left, right))
+            region_of_label[label] = len(self.regions)
+            self.regions.append((crop, core_in_crop, core_in_frame))
+
+        # Region of every space (-1 for spaces entirely outside the frame), for gated calls
+        x1 = np.clip(self.positions[:, 0], 0, cols)
+        y1 = np.clip(self.positions[:, 1], 0, rows)
+        x2 = np.clip(self.positions[:, 0] + self.width, 0, cols)
+        y2 = np.clip(self.positions[:, 1] + self.height, 0, rows)
+        inside = (x2 > x1) & (y2 > y1)
+        self._space_region = np.full(len(self.positions), -1)
+        self._space_region[inside] = region_of_label[labels[y1[inside], x1[inside]]]
+        self._space_boxes = np.stack([x1, y1, x2, y2], axis=1)
+        self._frame_shape = frame_shape[:2]
+
+    def _dirty_regions(self, dirty):
+        """Crops covering only the dirty spaces: per region, their bounding box grown by FILTER_HALO"""
+        rows, cols = self._frame_shape
+        regions = []
+        space_region = np.where(dirty, self._space_region, -1)
+        for region in np.unique(space_region[space_region >= 0]):
+            boxes = self._space_boxes[space_region == region]
+            left, top = boxes[:, :2].min(axis=0)
+            right, bottom = boxes[:, 2:].max(axis=0)
+            y, x = max(top - FILTER_HALO, 0), max(left - FILTER_HALO, 0)
+            crop = (slice(y, min(bottom + FILTER_HALO, rows)), slice(x, min(right + FILTER_HALO, cols)))
+            core_in_crop = (slice(top - y, bottom - y), slice(left - x, right - x))
+            regions.append((crop, core_in_crop, (slice(top, bottom), slice(left, right))))
+        return regions
+
+    def coverage(self):
+        """Fraction of the frame that is filtered each frame"""
+        if self._frame_shape is None:
+            return 0.0
+        area = sum((crop[0].stop - crop[0].start) * (crop[1].stop - crop[1].start)
+                   for crop, _, _ in self.regions)
+        return area / float(self._frame_shape[0] * self._frame_shape[1])
+
+    def process(self, img, dirty=None):
+        """Return a full-size preprocessed frame filled only where spaces are
+
+        With a `dirty` mask (a bool per space, e.g. from MotionGate) only those spaces
+        are filtered again; the others keep their pixels from the previous call.
+        """
+        if self._frame_shape != img.shape[:2]:
+            self._build_regions(img.shape)
+            self._previous = None
+
+        if dirty is None or self._previous is None or dirty.all():
+            imgPro = np.zeros(img.shape[:2], np.uint8)
+            regions = self.regions
+        else:
+            imgPro = self._previous.copy()   # Never modify an array already handed out
+            regions = self._dirty_regions(dirty)
+        if dirty is not None:
+            self._previous = imgPro
+
+        for crop, core_in_crop, core_in_frame in regions:
+            # Copy so OpenCV treats the crop edge as a real border
+            imgRegion = preprocess_frame(np.ascontiguousarray(img[crop]))
+            imgPro[core_in_frame] = imgRegion[core_in_crop]
+        return imgPro
+
+
+class MotionGate:
+    """Find the spaces whose part of the camera frame changed since they were last filtered
+
+    Compares a block-averaged copy of each frame against a reference that is only
+    moved forward for blocks found changed, so slow drift still adds up to a change.
+    Only the part of the frame around the spaces is averaged. A space covers its
+    rectangle plus FILTER_HALO, since those are the pixels its preprocessed output
+    depends on. Every space counts as changed on the first frame, after a frame
+    size change and every `refresh_frames` frames.
+    """
+
+    def __init__(self, positions, width=SPACE_WIDTH, height=SPACE_HEIGHT, block_size=MOTION_BLOCK_SIZE,
+                 tolerance=MOTION_TOLERANCE, refresh_frames=MOTION_REFRESH_FRAMES):
+        self.positions = np.asarray(positions, dtype=np.int64).reshape(-1, 2)
+        self.width = width
+        self.height = height
+        self.block_size = block_size   # A power of two: blocks are averaged by repeated halving
+        self.tolerance = tolerance
+        self.refresh_frames = refresh_frames
+        self._reference = None
+        self._frame_shape = None
+        self._frames_since_refresh = 0
+        self._block_scorer = None
+
+    def reset(self):
+        """Forget the reference frame so every space is filtered again next time"""
+        self._reference = None
+
+    def _build_blocks(self, frame_shape):
+        """Find the window around the spaces and map every halo-grown space rectangle onto its blocks"""
+        rows, cols = frame_shape[:2]
+        x1 = np.clip(self.positions[:, 0] - FILTER_HALO, 0, cols)
+        y1 = np.clip(self.positions[:, 1] - FILTER_HALO, 0, rows)
+        x2 = np.clip(self.positions[:, 0] + self.width + FILTER_HALO, 0, cols)
+        y2 = np.clip(self.positions[:, 1] + self.height + FILTER_HALO, 0, rows)
+
+        block = self.block_size
+        left, top = x1.min() // block * block, y1.min() // block * block
+        right = min(-(-x2.max() // block) * block, cols)
+        bottom = min(-(-y2.max() // block) * block, rows)
+        self._window = (slice(top, bottom), slice(left, right))
+        self._halvings = block.bit_length() - 1
+
+        grid_cols, grid_rows = right - left, bottom - top
+        for _ in range(self._halvings):
+            grid_cols, grid_rows = max(grid_cols // 2, 1), max(grid_rows // 2, 1)
+        scale_x = (right - left) / float(grid_cols)
+        scale_y = (bottom - top) / float(grid_rows)
+
+        bx1 = np.floor((x1 - left) / scale_x).astype(np.int64)
+        by1 = np.floor((y1 - top) / scale_y).astype(np.int64)
+        bx2 = np.ceil((x2 - left) / scale_x).astype(np.int64)
+        by2 = np.ceil((y2 - top) / scale_y).astype(np.int64)
+        self._frame_shape = frame_shape[:2]
+        self._block_scorer = SpaceScorer(np.stack([bx1, by1], axis=1), bx2 - bx1, by2 - by1)
+
+    def _block_means(self, img):
+        """Average the window around the spaces down to one pixel per block"""
+        imgSmall = img[self._window]
+        for _ in range(self._halvings):
+            # Halving is OpenCV's fast path for area averaging
+            imgSmall = cv2.resize(imgSmall, (max(imgSmall.shape[1] // 2, 1), max(imgSmall.shape[0] // 2, 1)),
+                                  interpolation=cv2.INTER_AREA)
+        return imgSmall
+
+    def changed_spaces(self, img):
+        """Return a bool array, True for every space whose pixels need filtering again"""
+        if len(self.positions) == 0:
+            return np.zeros(0, dtype=bool)
+        if self._frame_shape != img.shape[:2]:
+            self._build_blocks(img.shape)
+            self._reference = None
+
+        imgSmall = self._block_means(img)
+        self._frames_since_refresh += 1
+        if self._reference is None or self._frames_since_refresh >= self.refresh_frames:
+            self._reference = imgSmall
+            self._frames_since_refresh = 0
+            return np.ones(len(self.positions), dtype=bool)
+
+        difference = cv2.absdiff(imgSmall, self._reference)
+        if difference.ndim == 3:
+            difference = difference.max(axis=2)
+        changed_blocks = difference > self.tolerance
+        self._reference[changed_blocks] = imgSmall[changed_blocks]
+        return self._block_scorer.counts(changed_blocks.view(np.uint8)) > 0
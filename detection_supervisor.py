@@ -0,0 +1,189 @@
+"""
+SmartPark detection supervisor
+Runs one detection worker process per camera feed so feeds never share a GIL,
+collects their space counts and restarts workers that die.
+"""
+
+import multiprocessing
+import os
+import pickle
+import queue
+import threading
+import time
+
+import cv2
+
+from detection import SpaceScorer, RoiPreprocessor, SPACE_WIDTH, SPACE_HEIGHT
+
+DEFAULT_FPS = 25.0
+MAX_READ_FAILURES = 50      # Consecutive failed reads before a worker gives up
+RESTART_DELAY = 2.0         # Seconds to wait before restarting a dead worker
+RESULT_QUEUE_SIZE = 256
+
+
+def load_layout(layout):
+    """Return a list of (x, y) positions from a CarParkPos-style pickle or a list"""
+    if isinstance(layout, (str, os.PathLike)):
+        with open(layout, 'rb') as f:
+            return pickle.load(f)
+    return list(layout)
+
+
+def open_source(source):
+    """Open a camera index, stream URL or local video file"""
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    return cv2.VideoCapture(source)
+
+
+def run_feed(lot_id, source, layout, results, stop_event):
+    """Detection loop for one camera feed (runs in its own process)"""
+    positions = load_layout(layout)
+    scorer = SpaceScorer(positions, SPACE_WIDTH, SPACE_HEIGHT)
+    roi_preprocessor = RoiPreprocessor(positions, SPACE_WIDTH, SPACE_HEIGHT)
+
+    is_file = isinstance(source, str) and os.path.isfile(source)
+    cap = open_source(source)
+    fps = cap.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+    frame_interval = 1.0 / fps
+    failures = 0
+    frame_index = 0
+
+    while not stop_event.is_set():
+        started = time.time()
+        success, img = cap.read()
+        if not success:
+            failures += 1
+            if failures > MAX_READ_FAILURES:
+                raise RuntimeError(f"Feed {lot_id} stopped delivering frames: {source}")
+            if is_file:
+                # Loop recorded footage so it behaves like a live camera
+                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            else:
+                time.sleep(frame_interval)
+            continue
+
+        failures = 0
+        counts = scorer.counts(roi_preprocessor.process(img))
+        try:
+            results.put_nowait((lot_id, frame_index, counts.tolist(), time.time()))
+        except queue.Full:
+            pass  # The supervisor is behind - it only needs the latest counts anyway
+        frame_index += 1
+
+        remaining = frame_interval - (time.time() - started)
+        if remaining > 0:
+            time.sleep(remaining)
+
+    cap.release()
+
+
+class DetectionSupervisor:
+    """Start, watch and restart one detection process per (source, layout) feed"""
+
+    def __init__(self, feeds, restart_delay=RESTART_DELAY, reserved_lot_ids=()):
+        self.feeds = {}
+        for i, feed in enumerate(feeds):
+            if len(feed) == 3:
+                lot_id, source, layout = feed
+            else:
+                source, layout = feed
+                lot_id = f'lot-{i + 1}'
+            if lot_id in reserved_lot_ids:
+                raise ValueError(f"Lot id {lot_id!r} is reserved for the primary feed")
+            if lot_id in self.feeds:
+                raise ValueError(f"Duplicate lot id {lot_id!r} in camera feeds")
+            self.feeds[lot_id] = (source, layout)
+
+        self.layouts = {lot_id: load_layout(layout) for lot_id, (_, layout) in self.feeds.items()}
+        self.restart_delay = restart_delay
+        self.lots = {}  # {lot_id: {'counts': [...], 'frame_index': n, 'timestamp': t}}
+        self.restarts = {lot_id: 0 for lot_id in self.feeds}
+
+        self._context = multiprocessing.get_context('spawn')
+        self._results = self._context.Queue(maxsize=RESULT_QUEUE_SIZE)
+        self._stop_event = self._context.Event()
+        self._processes = {}
+        self._died_at = {}
+        self._lock = threading.Lock()
+        self._monitor_thread = None
+
+    def _spawn(self, lot_id):
+        """Start the worker process for one lot"""
+        source, layout = self.feeds[lot_id]
+        process = self._context.Process(
+            target=run_feed,
+            args=(lot_id, source, layout, self._results, self._stop_event),
+            name=f'detector-{lot_id}',
+            daemon=True
+        )
+        process.start()
+        self._processes[lot_id] = process
+        print(f"🎥 Started detection worker for {lot_id} (pid {process.pid}): {source}")
+
+    def start(self):
+        """Start every worker and the monitor thread"""
+        for lot_id in self.feeds:
+            self._spawn(lot_id)
+        self._monitor_thread = threading.Thread(target=self._monitor, daemon=True)
+        self._monitor_thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        """Ask every worker to stop and wait for them"""
+        self._stop_event.set()
+        for process in self._processes.values():
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+
+    def _check_workers(self):
+        """Restart workers that have exited"""
+        now = time.time()
+        for lot_id, process in list(self._processes.items()):
+            if process.is_alive() or self._stop_event.is_set():
+                continue
+            if lot_id not in self._died_at:
+                self._died_at[lot_id] = now
+                print(f"❌ Detection worker for {lot_id} exited with code {process.exitcode}")
+            elif now - self._died_at[lot_id] >= self.restart_delay:
+                del self._died_at[lot_id]
+                self.restarts[lot_id] += 1
+                self._spawn(lot_id)
+
+    def _monitor(self):
+        """Collect worker results and keep the workers running"""
+        while not self._stop_event.is_set():
+            try:
+                lot_id, frame_index, counts, timestamp = self._results.get(timeout=0.2)
+            except queue.Empty:
+                pass
+            else:
+                with self._lock:
+                    self.lots[lot_id] = {
+                        'counts': counts,
+                        'frame_index': frame_index,
+                        'timestamp': timestamp
+                    }
+            self._check_workers()
+
+    def is_alive(self, lot_id):
+        """Whether the worker for a lot is currently running"""
+        process = self._processes.get(lot_id)
+        return process is not None and process.is_alive()
+
+    def snapshot(self):
+        """Return {lot_id: result} for every lot, including lots with no result yet"""
+        with self._lock:
+            lots = dict(self.lots)
+        return {
+            lot_id: {
+                'positions': self.layouts[lot_id],
+                'counts': lots.get(lot_id, {}).get('counts'),
+                'frame_index': lots.get(lot_id, {}).get('frame_index'),
+                'timestamp': lots.get(lot_id, {}).get('timestamp'),
+                'alive': self.is_alive(lot_id),
+                'restarts': self.restarts[lot_id]
+            }
+            for lot_id in self.feeds
+        }
@@ -0,0 +1,242 @@
+"""
+SmartPark event stream
+A Server-Sent Events server driven by one selector on one thread. Subscribers
+are just registered sockets, so hundreds of idle dashboards cost no threads,
+and every event is formatted once and queued as the same bytes for everyone.
+"""
+
+import json
+import selectors
+import socket
+import threading
+import time
+
+EVENTS_PATH = '/api/events'
+HEARTBEAT_INTERVAL = 15.0        # Seconds between keep-alive comments
+RETRY_MS = 3000                  # Reconnect delay suggested to EventSource clients
+MAX_CLIENT_BUFFER = 1 << 20      # Drop a subscriber that falls this many bytes behind
+MAX_REQUEST_BYTES = 8192
+
+SSE_HEADERS = (b'HTTP/1.1 200 OK\r\n'
+               b'Content-Type: text/event-stream\r\n'
+               b'Cache-Control: no-cache\r\n'
+               b'Connection: keep-alive\r\n'
+               b'Access-Control-Allow-Origin: *\r\n\r\n')
+NOT_FOUND = (b'HTTP/1.1 404 Not Found\r\n'
+             b'Content-Length: 0\r\n'
+             b'Connection: close\r\n\r\n')
+HEARTBEAT = b': keep-alive\n\n'
+
+
+def format_event(event, data, event_id=None):
+    """Encode one SSE message with a compact JSON payload"""
+    message = f'event: {event}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'
+    if event_id is not None:
+        message = f'id: {event_id}\n' + message
+    return message.encode()
+
+
+class _Client:
+    """Connection state for one socket"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.request = b''
+        self.outbox = bytearray()
+        self.subscribed = False
+        self.closing = False      # Close once the outbox has been flushed
+
+
+class EventStreamServer:
+    """Serve an SSE endpoint: a full snapshot on connect, then every published event"""
+
+    def __init__(self, address, snapshot, path=EVENTS_PATH):
+        self.snapshot = snapshot          # Called on the server thread for each new subscriber
+        self.path = path
+        self.subscribers = 0
+        self.events_published = 0
+        self.clients_dropped = 0          # Subscribers dropped for falling too far behind
+
+        self._listener = socket.create_server(address)
+        self._listener.setblocking(False)
+        self.address = self._listener.getsockname()
+        self._wake_reader, self._wake_writer = socket.socketpair()
+        self._wake_reader.setblocking(False)
+        self._wake_writer.setblocking(False)
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._listener, selectors.EVENT_READ)
+        self._selector.register(self._wake_reader, selectors.EVENT_READ)
+
+        self._pending = []                # Encoded events waiting for the server thread
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start serving on a background thread"""
+        self._thread = threading.Thread(target=self._run, name='event-stream', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        """Stop serving and close every connection"""
+        self._stop.set()
+        self._wake()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def publish(self, event, data):
+        """Queue an event for every subscriber; safe to call from any thread"""
+        payload = format_event(event, data)
+        with self._lock:
+            self._pending.append(payload)
+            self.events_published += 1
+        self._wake()
+
+    def _wake(self):
+        """Interrupt the selector so queued events go out immediately"""
+        try:
+            self._wake_writer.send(b'\0')
+        except (BlockingIOError, OSError):
+            pass  # Already woken (buffer full) or shutting down
+
+    def _run(self):
+        """Selector loop: accept, read requests, flush outboxes, fan out events"""
+        next_heartbeat = time.monotonic() + HEARTBEAT_INTERVAL
+        try:
+            while not self._stop.is_set():
+                timeout = max(0.0, next_heartbeat - time.monotonic())
+                for key, mask in self._selector.select(timeout):
+                    if key.fileobj is self._listener:
+                        self._accept()
+                    elif key.fileobj is self._wake_reader:
+                        self._drain_wakeups()
+                    else:
+                        if mask & selectors.EVENT_READ:
+                            self._read(key.data)
+                        if mask & selectors.EVENT_WRITE and key.data.sock.fileno() != -1:
+                            self._flush(key.data)
+
+                self._deliver_pending()
+
+                if time.monotonic() >= next_heartbeat:
+                    self._broadcast(HEARTBEAT)
+                    next_heartbeat = time.monotonic() + HEARTBEAT_INTERVAL
+        finally:
+            for key in list(self._selector.get_map().values()):
+                if isinstance(key.data, _Client):
+                    self._close(key.data)
+            self._selector.close()
+            self._listener.close()
+            self._wake_reader.close()
+            self._wake_writer.close()
+
+    def _accept(self):
+        """Accept every waiting connection"""
+        while True:
+            try:
+                sock, _ = self._listener.accept()
+            except BlockingIOError:
+                return
+            sock.setblocking(False)
+            self._selector.register(sock, selectors.EVENT_READ, _Client(sock))
+
+    def _drain_wakeups(self):
+        """Empty the wake-up socket"""
+        try:
+            while self._wake_reader.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _read(self, client):
+        """Read the HTTP request line and headers, or notice a closed connection"""
+        try:
+            data = client.sock.recv(4096)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b''
+        if not data:
+            self._close(client)
+            return
+        if client.subscribed or client.closing:
+            return  # Nothing more is expected from an EventSource client
+
+        client.request += data
+        if b'\r\n\r\n' not in client.request:
+            if len(client.request) > MAX_REQUEST_BYTES:
+                self._close(client)
+            return
+
+        request_line = client.request.split(b'\r\n', 1)[0].decode('latin-1').split()
+        target = request_line[1].split('?', 1)[0] if len(request_line) >= 2 else ''
+        if request_line[:1] != ['GET'] or target != self.path:
+            client.closing = True
+            self._send(client, NOT_FOUND)
+            return
+
+        try:
+            snapshot = format_event('snapshot', self.snapshot())
+        except Exception as e:
+            print(f"❌ Error building event stream snapshot: {str(e)}")
+            self._close(client)
+            return
+
+        client.subscribed = True
+        self.subscribers += 1
+        self._send(client, SSE_HEADERS + f'retry: {RETRY_MS}\n\n'.encode() + snapshot)
+
+    def _deliver_pending(self):
+        """Append every queued event to each subscriber's outbox"""
+        with self._lock:
+            if not self._pending:
+                return
+            payload = b''.join(self._pending)
+            self._pending = []
+        self._broadcast(payload)
+
+    def _broadcast(self, payload):
+        """Send the same bytes to every subscriber"""
+        for key in list(self._selector.get_map().values()):
+            client = key.data
+            if isinstance(client, _Client) and client.subscribed:
+                self._send(client, payload)
+
+    def _send(self, client, payload):
+        """Queue bytes for a client and write as much as the socket accepts"""
+        client.outbox += payload
+        if len(client.outbox) > MAX_CLIENT_BUFFER:
+            # Too slow to keep up - it reconnects and starts again from a snapshot
+            self.clients_dropped += 1
+            self._close(client)
+            return
+        self._flush(client)
+
+    def _flush(self, client):
+        """Write the outbox and only wait for writability while bytes remain"""
+        try:
+            while client.outbox:
+                sent = client.sock.send(client.outbox)
+                del client.outbox[:sent]
+        except BlockingIOError:
+            pass
+        except OSError:
+            self._close(client)
+            return
+
+        if not client.outbox and client.closing:
+            self._close(client)
+            return
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if client.outbox else 0)
+        if self._selector.get_key(client.sock).events != events:
+            self._selector.modify(client.sock, events, client)
+
+    def _close(self, client):
+        """Forget a connection"""
+        if client.sock.fileno() == -1:
+            return
+        if client.subscribed:
+            self.subscribers -= 1
+        self._selector.unregister(client.sock)
+        client.sock.close()
@@ -0,0 +1,184 @@
+"""
+SmartPark shared-memory frames
+The detector writes each processed frame, with the status and count of every
+space, into a two-slot buffer in POSIX shared memory. API worker processes
+attach to it by name and read NumPy views straight out of the segment, with
+no copying or pickling. A seqlock counter per slot lets a reader tell whether
+the detector overwrote the slot while it was reading. The writer always fills
+the inactive slot, so a reader has a full frame interval before that happens.
+"""
+
+import threading
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+MAGIC = 0x5350524B46524D31      # Marks a live segment; zeroed when the writer retires it
+SLOTS = 2
+
+# Header: int64 fields
+H_MAGIC, H_HEIGHT, H_WIDTH, H_CHANNELS, H_SPACES, H_ACTIVE, H_PUBLISHED, H_SLOT_BYTES = range(8)
+HEADER_BYTES = 8 * 8
+SLOT_META_BYTES = 3 * 8          # seqlock counter, frame sequence, capture time
+
+_tracker_lock = threading.Lock()
+
+
+def _attach_untracked(name):
+    """Attach without registering with the resource tracker (Python < 3.13 has no track=False)
+
+    A tracked reader would unlink the detector's segment when it exits.
+    """
+    with _tracker_lock:
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name)
+        finally:
+            resource_tracker.register = register
+
+
+def _align(n, to=8):
+    """Round `n` bytes up to a multiple of `to`"""
+    return (n + to - 1) // to * to
+
+
+class SharedFrame(tuple):
+    """(sequence, image, statuses, counts) backed by a shared-memory slot"""
+
+    def intact(self):
+        """True while the slot still holds the frame that was read"""
+        return self.buffer.slot_version(self.slot) == self.token
+
+
+def frame_intact(frame):
+    """False only for a shared-memory frame the detector overwrote while it was in use"""
+    return not isinstance(frame, SharedFrame) or frame.intact()
+
+
+class SharedFrameBuffer:
+    """Double-buffered frames and space status in one shared-memory segment"""
+
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner
+        self.header = np.ndarray(8, np.int64, shm.buf)
+        height, width, channels, n_spaces, slot_bytes = (int(self.header[i]) for i in
+                                                         (H_HEIGHT, H_WIDTH, H_CHANNELS, H_SPACES, H_SLOT_BYTES))
+        self.frame_shape = (height, width, channels) if channels > 1 else (height, width)
+        self.n_spaces = n_spaces
+        frame_bytes = height * width * channels
+
+        # Views of each slot, built once
+        self._meta, self._frames, self._statuses, self._counts = [], [], [], []
+        for slot in range(SLOTS):
+            offset = HEADER_BYTES + slot * slot_bytes
+            self._meta.append(np.ndarray(2, np.int64, shm.buf, offset))
+            self._frames.append(np.ndarray(self.frame_shape, np.uint8, shm.buf, offset + SLOT_META_BYTES))
+            offset += _align(SLOT_META_BYTES + frame_bytes)
+            self._statuses.append(np.ndarray(n_spaces, np.uint8, shm.buf, offset))
+            self._counts.append(np.ndarray(n_spaces, np.int32, shm.buf, offset + _align(n_spaces)))
+        self._captured = [np.ndarray(1, np.float64, shm.buf, HEADER_BYTES + slot * slot_bytes + 16)
+                          for slot in range(SLOTS)]
+
+    @classmethod
+    def create(cls, name, frame_shape, n_spaces):
+        """Create the segment (replacing a stale one with the same name) as the writer"""
+        channels = frame_shape[2] if len(frame_shape) > 2 else 1
+        frame_bytes = frame_shape[0] * frame_shape[1] * channels
+        slot_bytes = _align(SLOT_META_BYTES + frame_bytes) + _align(n_spaces) + _align(4 * n_spaces)
+        try:
+            stale = shared_memory.SharedMemory(name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        shm = shared_memory.SharedMemory(name, create=True, size=HEADER_BYTES + SLOTS * slot_bytes)
+        header = np.ndarray(8, np.int64, shm.buf)
+        header[:] = (0, frame_shape[0], frame_shape[1], channels, n_spaces, 0, 0, slot_bytes)
+        del header
+        buffer = cls(shm, owner=True)
+        buffer.header[H_MAGIC] = MAGIC
+        return buffer
+
+    @classmethod
+    def attach(cls, name):
+        """Attach to a segment created by the detector; None if there is none yet"""
+        try:
+            try:
+                shm = shared_memory.SharedMemory(name, track=False)
+            except TypeError:
+                shm = _attach_untracked(name)
+        except FileNotFoundError:
+            return None
+        if int(np.ndarray(1, np.int64, shm.buf)[0]) != MAGIC:
+            shm.close()
+            return None
+        return cls(shm, owner=False)
+
+    def fits(self, frame_shape, n_spaces):
+        """Whether frames of this shape and layout fit the segment"""
+        return tuple(frame_shape) == self.frame_shape and n_spaces == self.n_spaces
+
+    @property
+    def retired(self):
+        """True once the writer has replaced this segment with a new one"""
+        return self.header is None or int(self.header[H_MAGIC]) != MAGIC
+
+    @property
+    def published(self):
+        """Frames written so far"""
+        return int(self.header[H_PUBLISHED])
+
+    def write(self, sequence, captured_at, img, statuses, counts):
+        """Copy one frame and its space state into the inactive slot, then make it active"""
+        slot = 1 - int(self.header[H_ACTIVE])
+        meta = self._meta[slot]
+        meta[0] += 1                  # Odd: slot is being written
+        np.copyto(self._frames[slot], img)
+        self._statuses[slot][:] = statuses
+        self._counts[slot][:] = counts
+        meta[1] = sequence
+        self._captured[slot][0] = captured_at
+        meta[0] += 1                  # Even: slot is complete
+        self.header[H_ACTIVE] = slot
+        self.header[H_PUBLISHED] += 1
+
+    def read(self):
+        """The latest frame as (sequence, image, statuses, counts) views, or None if none is ready"""
+        if self.header is None:
+            return None   # Closed
+        for _ in range(SLOTS + 1):
+            if self.header[H_PUBLISHED] == 0:
+                return None
+            slot = int(self.header[H_ACTIVE])
+            meta = self._meta[slot]
+            token = int(meta[0])
+            sequence = int(meta[1])
+            if token % 2 == 0 and int(meta[0]) == token:
+                frame = SharedFrame((sequence, self._frames[slot], self._statuses[slot], self._counts[slot]))
+                frame.buffer, frame.slot, frame.token = self, slot, token
+                frame.captured_at = float(self._captured[slot][0])
+                return frame
+        return None
+
+    def slot_version(self, slot):
+        """Seqlock counter of one slot; -1 once closed, so frames read before that are no longer intact"""
+        meta = self._meta
+        return int(meta[slot][0]) if meta else -1
+
+    def close(self):
+        """Detach; the writer also retires and removes the segment"""
+        if self.owner:
+            self.header[H_MAGIC] = 0
+        self.header = None
+        self._meta = self._frames = self._statuses = self._counts = self._captured = []
+        try:
+            self.shm.close()
+        except BufferError:
+            pass   # A reader still holds a view; the mapping goes away with the process
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,56 @@
+"""
+SmartPark frame streaming
+Wakes MJPEG viewers when a new frame is published. Viewers always pick up the
+newest frame when they are ready for one, so a slow viewer skips frames
+instead of building a backlog, and every viewer shares the same encoded JPEG.
+"""
+
+import threading
+
+MJPEG_BOUNDARY = 'frame'
+MJPEG_MIMETYPE = f'multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}'
+
+
+class FrameBroadcaster:
+    """Tracks the latest published frame sequence and wakes waiting viewers"""
+
+    def __init__(self):
+        self.sequence = 0
+        self.viewers = 0
+        self._condition = threading.Condition()
+
+    def publish(self, sequence):
+        """Announce that frame `sequence` is available"""
+        with self._condition:
+            self.sequence = sequence
+            self._condition.notify_all()
+
+    def wait_for_frame(self, after_sequence, timeout=None):
+        """Block until a frame newer than `after_sequence` is published
+
+        Returns the newest sequence, or `after_sequence` if the timeout expired.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self.sequence != after_sequence, timeout)
+            return self.sequence
+
+    def stream(self, get_jpeg, timeout=5.0):
+        """Yield multipart MJPEG parts, one per frame the viewer is ready for"""
+        with self._condition:
+            self.viewers += 1
+        try:
+            sequence = 0
+            while True:
+                newest = self.wait_for_frame(sequence, timeout)
+                if newest == sequence:
+                    continue  # No new frame yet - keep waiting
+                sequence = newest
+                jpeg = get_jpeg()
+                if jpeg is None:
+                    continue
+                yield (f'--{MJPEG_BOUNDARY}\r\n'
+                       f'Content-Type: image/jpeg\r\n'
+                       f'Content-Length: {len(jpeg)}\r\n\r\n').encode() + jpeg + b'\r\n'
+        finally:
+            with self._condition:
+                self.viewers -= 1
@@ -0,0 +1,48 @@
+"""
+SmartPark LRU cache
+A small thread-safe least-recently-used cache with hit/miss counters, used to
+keep memory bounded for caches keyed by frame sequence numbers.
+"""
+
+import collections
+import threading
+
+
+class LRUCache:
+    """Keep at most `maxsize` entries, evicting the least recently used"""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """Return the cached value and mark it as recently used"""
+        with self._lock:
+            try:
+                self._entries.move_to_end(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return self._entries[key]
+
+    def put(self, key, value):
+        """Store a value, evicting the oldest entries beyond maxsize"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,182 @@
+"""
+SmartPark mail outbox
+Outgoing email is queued and delivered by one background sender, so API
+requests return as soon as a message is queued instead of waiting on the mail
+server. The sender keeps one authenticated SMTP session open and sends every
+queued message over it. It reconnects when the server drops the session,
+retries transient failures with exponential backoff, and closes the session
+after it has been idle for a while.
+"""
+
+import queue
+import smtplib
+import threading
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+QUEUE_SIZE = 1000            # Messages waiting before new ones are refused
+MAX_ATTEMPTS = 5             # Delivery attempts per message
+RETRY_BACKOFF = 1.0          # Seconds before the first retry, doubled on each attempt
+MAX_BACKOFF = 60.0
+IDLE_TIMEOUT = 30.0          # Seconds without mail before the SMTP session is closed
+SMTP_TIMEOUT = 15.0
+
+# Errors worth retrying on a fresh connection; 5xx replies are permanent, and so is a
+# server that lacks a feature we need (e.g. STARTTLS) or refuses our credentials
+TRANSIENT_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError)
+PERMANENT_ERRORS = (smtplib.SMTPNotSupportedError, smtplib.SMTPAuthenticationError)
+_WAKE = None                 # Queued by stop() so an idle sender notices at once
+
+
+class MailTemplate:
+    """An HTML body split around its placeholders once, so rendering is a join"""
+
+    def __init__(self, subject, html, placeholder):
+        self.subject = subject
+        self.placeholder = placeholder
+        self._parts = html.split(placeholder)
+
+    def render(self, value):
+        """The body with `value` in place of every placeholder"""
+        return value.join(self._parts)
+
+
+class MailOutbox:
+    """Queue of outgoing messages delivered by a background sender over one SMTP session"""
+
+    def __init__(self, host, port, username=None, password=None, sender=None, use_tls=True,
+                 queue_size=QUEUE_SIZE, max_attempts=MAX_ATTEMPTS, retry_backoff=RETRY_BACKOFF,
+                 idle_timeout=IDLE_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender = sender or username
+        self.use_tls = use_tls
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.idle_timeout = idle_timeout
+        self.sent = 0
+        self.failed = 0           # Messages given up on
+        self.retries = 0
+        self.refused = 0          # Messages not queued because the outbox was full
+        self.connections = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._smtp = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """Start the sender thread (once)"""
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='mail-outbox', daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self, timeout=10.0):
+        """Deliver what is already queued, then close the session"""
+        self._stop.set()
+        try:
+            self._queue.put_nowait(_WAKE)
+        except queue.Full:
+            pass    # The sender is busy draining and checks for stop between messages
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def pending(self):
+        """Messages waiting to be sent"""
+        return self._queue.qsize()
+
+    def send(self, to, subject, html):
+        """Queue an HTML message; returns False only if the outbox is full"""
+        self.start()
+        try:
+            self._queue.put_nowait((to, subject, html))
+            return True
+        except queue.Full:
+            self.refused += 1
+            return False
+
+    def _run(self):
+        """Deliver messages as they arrive, closing the session when idle"""
+        try:
+            while not (self._stop.is_set() and self._queue.empty()):
+                try:
+                    message = self._queue.get(timeout=self.idle_timeout if self._smtp else 0.5)
+                except queue.Empty:
+                    self._disconnect()
+                    continue
+                if message is not _WAKE:
+                    self._deliver(*message)
+        finally:
+            self._disconnect()
+
+    def _deliver(self, to, subject, html):
+        """Send one message, reconnecting and backing off on transient errors"""
+        msg = MIMEMultipart()
+        msg['From'] = self.sender
+        msg['To'] = to
+        msg['Subject'] = subject
+        msg.attach(MIMEText(html, 'html'))
+        text = msg.as_string()
+
+        for attempt in range(self.max_attempts):
+            if attempt:
+                self.retries += 1
+                # Returns at once when stopping, so shutdown is not held up by backoff
+                self._stop.wait(min(self.retry_backoff * 2 ** (attempt - 1), MAX_BACKOFF))
+            try:
+                self._connection().sendmail(self.sender, to, text)
+                self.sent += 1
+                print(f"✅ Email sent successfully to {to}")
+                return True
+            except PERMANENT_ERRORS as e:
+                # Checked first: these are also OSErrors or SMTP replies, but retrying cannot help
+                print(f"❌ Email to {to} failed, not retrying: {e}")
+                self._disconnect()
+                break
+            except smtplib.SMTPResponseException as e:
+                if e.smtp_code >= 500:
+                    print(f"❌ Email to {to} rejected: {e.smtp_code} {e.smtp_error!r}")
+                    break
+                self._disconnect()
+            except smtplib.SMTPRecipientsRefused as e:
+                print(f"❌ Email to {to} rejected: {e.recipients}")
+                break
+            except TRANSIENT_ERRORS as e:
+                print(f"⚠️ Email to {to} failed (attempt {attempt + 1}/{self.max_attempts}): {e}")
+                self._disconnect()
+            except Exception as e:
+                print(f"❌ Error sending email to {to}: {e}")
+                self._disconnect()
+                break
+        self.failed += 1
+        return False
+
+    def _connection(self):
+        """The open SMTP session, logging in again if there is none"""
+        if self._smtp is None:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT)
+            try:
+                if self.use_tls:
+                    smtp.starttls()
+                if self.username:
+                    smtp.login(self.username, self.password)
+            except Exception:
+                smtp.close()
+                raise
+            self._smtp = smtp
+            self.connections += 1
+        return self._smtp
+
+    def _disconnect(self):
+        """Close the SMTP session, ignoring a server that is already gone"""
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self._smtp.close()
+        self._smtp = None
@@ -1,7 +1,7 @@
 import cv2
 import pickle
 import cvzone
-import numpy as np
+from detection import SpaceScorer, preprocess_frame, OCCUPIED_THRESHOLD
 
 # Video feed
 cap = cv2.VideoCapture('carPark.mp4')
@@ -10,20 +10,17 @@ with open('CarParkPos', 'rb') as f:
     posList = pickle.load(f)
 
 width, height = 107, 48
+scorer = SpaceScorer(posList, width, height)
 
 
 def checkParkingSpace(imgPro):
     spaceCounter = 0
+    counts = scorer.counts(imgPro)
 
-    for pos in posList:
+    for pos, count in zip(posList, counts):
         x, y = pos
 
-        imgCrop = imgPro[y:y + height, x:x + width]
-        # cv2.imshow(str(x * y), imgCrop)
-        count = cv2.countNonZero(imgCrop)
-
-
-        if count < 900:
+        if count < OCCUPIED_THRESHOLD:
             color = (0, 255, 0)
             thickness = 5
             spaceCounter += 1
@@ -42,16 +39,8 @@ while True:
     if cap.get(cv2.CAP_PROP_POS_FRAMES) == cap.get(cv2.CAP_PROP_FRAME_COUNT):
         cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
     success, img = cap.read()
-    imgGray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    imgBlur = cv2.GaussianBlur(imgGray, (3, 3), 1)
-    imgThreshold = cv2.adaptiveThreshold(imgBlur, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                                         cv2.THRESH_BINARY_INV, 25, 16)
-    imgMedian = cv2.medianBlur(imgThreshold, 5)
-    kernel = np.ones((3, 3), np.uint8)
-    imgDilate = cv2.dilate(imgMedian, kernel, iterations=1)
+    imgDilate = preprocess_frame(img)
 
     checkParkingSpace(imgDilate)
     cv2.imshow("Image", img)
-    # cv2.imshow("ImageBlur", imgBlur)
-    # cv2.imshow("ImageThres", imgMedian)
     cv2.waitKey(10)
\ No newline at end of file
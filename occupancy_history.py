@@ -0,0 +1,121 @@
+"""
+SmartPark occupancy history
+Fixed-size ring buffers of lot and per-space occupancy at 1 s, 1 min and 1 h
+resolution. Each frame only touches the open 1 s bucket; every bucket that
+closes is folded into the next coarser level, and range queries index the
+rings directly, so neither memory nor query time grows with uptime.
+"""
+
+import threading
+
+import numpy as np
+
+# {resolution: (seconds per bucket, buckets kept)}
+RESOLUTIONS = {
+    '1s': (1, 3600),          # Last hour
+    '1m': (60, 24 * 60),      # Last day
+    '1h': (3600, 30 * 24)     # Last 30 days
+}
+AGGREGATE_FIELDS = ('available_spaces', 'occupied_spaces', 'reserved_spaces', 'utilization_rate')
+
+
+class RingSeries:
+    """One resolution: a ring of closed buckets plus the bucket being filled"""
+
+    def __init__(self, bucket_seconds, capacity, n_spaces):
+        self.bucket_seconds = bucket_seconds
+        self.capacity = capacity
+        self.bucket_ids = np.full(capacity, -1, np.int64)        # Bucket held by each slot
+        self.aggregates = np.zeros((capacity, len(AGGREGATE_FIELDS)), np.float32)
+        self.spaces = np.zeros((capacity, n_spaces), np.uint8)   # Percent of the bucket each space was occupied
+        self.open_bucket = None
+        self._weight = 0.0
+        self._aggregate_sum = np.zeros(len(AGGREGATE_FIELDS))
+        self._space_sum = np.zeros(n_spaces)
+
+    def add(self, bucket_id, aggregates, occupancy, weight=1.0):
+        """Accumulate one sample; return the bucket it closed as (id, aggregates, occupancy) or None"""
+        closed = None
+        if self.open_bucket is not None and bucket_id != self.open_bucket:
+            closed = self._close()
+        self.open_bucket = bucket_id
+        self._aggregate_sum += aggregates * weight
+        self._space_sum += occupancy * weight
+        self._weight += weight
+        return closed
+
+    def _close(self):
+        """Write the open bucket's averages into its ring slot"""
+        aggregates = self._aggregate_sum / self._weight
+        occupancy = self._space_sum / self._weight
+        slot = self.open_bucket % self.capacity
+        self.bucket_ids[slot] = self.open_bucket
+        self.aggregates[slot] = aggregates
+        self.spaces[slot] = np.rint(occupancy * 100)
+        closed = (self.open_bucket, aggregates, occupancy)
+
+        self.open_bucket = None
+        self._weight = 0.0
+        self._aggregate_sum = np.zeros_like(self._aggregate_sum)
+        self._space_sum = np.zeros_like(self._space_sum)
+        return closed
+
+    def query(self, first_bucket, last_bucket):
+        """Return (bucket ids, aggregates, space percents) of closed buckets in [first, last]"""
+        first_bucket = max(first_bucket, last_bucket - self.capacity + 1)
+        ids = np.arange(first_bucket, last_bucket + 1)
+        slots = ids % self.capacity
+        held = self.bucket_ids[slots] == ids
+        return ids[held], self.aggregates[slots[held]], self.spaces[slots[held]]
+
+
+class OccupancyHistory:
+    """Lot and per-space occupancy kept at every resolution in RESOLUTIONS"""
+
+    def __init__(self, n_spaces, resolutions=RESOLUTIONS):
+        self.n_spaces = n_spaces
+        self.levels = {name: RingSeries(seconds, capacity, n_spaces)
+                       for name, (seconds, capacity) in
+                       sorted(resolutions.items(), key=lambda item: item[1][0])}
+        self._lock = threading.Lock()
+
+    def record(self, timestamp, status, occupied):
+        """Add one frame: `status` holds AGGREGATE_FIELDS, `occupied` is a bool per space"""
+        aggregates = np.array([status[field] for field in AGGREGATE_FIELDS], np.float64)
+        occupancy = np.asarray(occupied, np.float64)
+        with self._lock:
+            levels = list(self.levels.values())
+            closed = levels[0].add(int(timestamp // levels[0].bucket_seconds), aggregates, occupancy)
+            # Fold each bucket that just closed into the next coarser level
+            for finer, coarser in zip(levels, levels[1:]):
+                if closed is None:
+                    break
+                bucket_id, aggregates, occupancy = closed
+                started = bucket_id * finer.bucket_seconds
+                closed = coarser.add(started // coarser.bucket_seconds, aggregates, occupancy)
+
+    def query(self, resolution, start, end, space_ids=None):
+        """Closed buckets between `start` and `end` (epoch seconds) at one resolution"""
+        level = self.levels[resolution]
+        first = int(start // level.bucket_seconds)
+        last = int(end // level.bucket_seconds)
+        with self._lock:
+            ids, aggregates, spaces = level.query(first, last)
+
+        timestamps = (ids * level.bucket_seconds).tolist()
+        values = np.round(aggregates.astype(np.float64), 2).tolist()
+        points = [dict(zip(AGGREGATE_FIELDS, row), timestamp=timestamp)
+                  for timestamp, row in zip(timestamps, values)]
+        result = {
+            'resolution': resolution,
+            'bucket_seconds': level.bucket_seconds,
+            'points': points
+        }
+        if space_ids is not None:
+            result['spaces'] = {space_id: spaces[:, space_id - 1].tolist() for space_id in space_ids}
+        return result
+
+    def nbytes(self):
+        """Memory held by the ring buffers"""
+        return sum(level.bucket_ids.nbytes + level.aggregates.nbytes + level.spaces.nbytes
+                   for level in self.levels.values())
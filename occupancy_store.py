@@ -0,0 +1,231 @@
+"""
+SmartPark occupancy store
+Persists occupancy samples and space status changes to SQLite from a
+background writer thread. The detector only appends to a bounded queue; the
+writer batches rows into one WAL transaction per flush and keeps per-minute
+and per-hour rollup tables up to date in the same transaction, so long-range
+analytics read pre-aggregated rows instead of raw samples.
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+
+from db_pool import ConnectionPool, connect
+
+DEFAULT_DB_FILE = 'smartpark_history.db'
+BATCH_SIZE = 500              # Rows per transaction at most
+FLUSH_INTERVAL = 1.0          # Seconds a row may wait before it is written
+QUEUE_SIZE = 10000            # Rows buffered before new ones are dropped
+RAW_RETENTION = 7 * 86400     # Seconds of raw samples and events kept; rollups are kept forever
+PRUNE_INTERVAL = 3600
+
+ROLLUP_TABLES = {'minute': ('occupancy_minute', 60), 'hour': ('occupancy_hour', 3600)}
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS occupancy_samples (
+        ts REAL NOT NULL,
+        available INTEGER NOT NULL,
+        occupied INTEGER NOT NULL,
+        reserved INTEGER NOT NULL,
+        utilization REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_occupancy_samples_ts ON occupancy_samples (ts);
+
+    CREATE TABLE IF NOT EXISTS space_events (
+        ts REAL NOT NULL,
+        space_id INTEGER NOT NULL,
+        status TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_space_events_ts ON space_events (ts);
+
+    CREATE TABLE IF NOT EXISTS occupancy_minute (
+        bucket INTEGER PRIMARY KEY,
+        samples INTEGER NOT NULL,
+        available_sum REAL NOT NULL,
+        occupied_sum REAL NOT NULL,
+        reserved_sum REAL NOT NULL,
+        utilization_sum REAL NOT NULL,
+        utilization_max REAL NOT NULL,
+        status_changes INTEGER NOT NULL DEFAULT 0
+    );
+
+    CREATE TABLE IF NOT EXISTS occupancy_hour (
+        bucket INTEGER PRIMARY KEY,
+        samples INTEGER NOT NULL,
+        available_sum REAL NOT NULL,
+        occupied_sum REAL NOT NULL,
+        reserved_sum REAL NOT NULL,
+        utilization_sum REAL NOT NULL,
+        utilization_max REAL NOT NULL,
+        status_changes INTEGER NOT NULL DEFAULT 0
+    );
+'''
+
+ROLLUP_UPSERT = '''
+    INSERT INTO {table} (bucket, samples, available_sum, occupied_sum, reserved_sum,
+                         utilization_sum, utilization_max, status_changes)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(bucket) DO UPDATE SET
+        samples = samples + excluded.samples,
+        available_sum = available_sum + excluded.available_sum,
+        occupied_sum = occupied_sum + excluded.occupied_sum,
+        reserved_sum = reserved_sum + excluded.reserved_sum,
+        utilization_sum = utilization_sum + excluded.utilization_sum,
+        utilization_max = MAX(utilization_max, excluded.utilization_max),
+        status_changes = status_changes + excluded.status_changes
+'''
+
+
+class OccupancyStore:
+    """Background writer for occupancy samples, status changes and their rollups"""
+
+    def __init__(self, path=DEFAULT_DB_FILE, batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL, queue_size=QUEUE_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0          # Rows discarded because the queue was full
+        self.batches = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._thread = None
+
+        conn = connect(path)
+        conn.executescript(SCHEMA)
+        conn.close()
+        self._readers = ConnectionPool(path, size=4, row_factory=None)
+
+    def start(self):
+        """Start the writer thread"""
+        self._thread = threading.Thread(target=self._run, name='occupancy-store', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=10.0):
+        """Write everything still queued and stop the writer"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._readers.close()
+
+    def record_sample(self, timestamp, status):
+        """Queue one occupancy sample; never blocks"""
+        self._put(('sample', timestamp, status['available_spaces'], status['occupied_spaces'],
+                   status['reserved_spaces'], status['utilization_rate']))
+
+    def record_status_changes(self, timestamp, changes):
+        """Queue (space_id, status) changes; never blocks"""
+        for space_id, status in changes:
+            self._put(('event', timestamp, space_id, status))
+
+    def _put(self, row):
+        """Add a row to the queue, dropping it if the writer has fallen behind"""
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        """Collect rows into batches and write each batch in one transaction"""
+        conn = connect(self.path)
+        next_prune = time.monotonic()
+        try:
+            while not (self._stop.is_set() and self._queue.empty()):
+                batch = self._collect()
+                if batch:
+                    self._write(conn, batch)
+                if time.monotonic() >= next_prune:
+                    self._prune(conn)
+                    next_prune = time.monotonic() + PRUNE_INTERVAL
+        finally:
+            conn.close()
+
+    def _collect(self):
+        """Wait up to flush_interval for rows, returning as soon as a batch is full"""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (self._stop.is_set() and self._queue.empty()):
+                break
+            try:
+                batch.append(self._queue.get(timeout=min(remaining, 0.1)))
+            except queue.Empty:
+                continue
+        return batch
+
+    def _write(self, conn, batch):
+        """Insert a batch of rows and fold them into the rollups"""
+        samples = [row[1:] for row in batch if row[0] == 'sample']
+        events = [row[1:] for row in batch if row[0] == 'event']
+
+        # Pre-aggregate the batch so each touched bucket gets a single upsert
+        rollups = {name: {} for name in ROLLUP_TABLES}
+        for name, (_, seconds) in ROLLUP_TABLES.items():
+            buckets = rollups[name]
+            for ts, available, occupied, reserved, utilization in samples:
+                row = buckets.setdefault(int(ts // seconds), [0, 0, 0, 0, 0, 0, 0])
+                row[0] += 1
+                row[1] += available
+                row[2] += occupied
+                row[3] += reserved
+                row[4] += utilization
+                row[5] = max(row[5], utilization)
+            for ts, _, _ in events:
+                buckets.setdefault(int(ts // seconds), [0, 0, 0, 0, 0, 0, 0])[6] += 1
+
+        try:
+            with conn:
+                conn.executemany('INSERT INTO occupancy_samples VALUES (?, ?, ?, ?, ?)', samples)
+                conn.executemany('INSERT INTO space_events VALUES (?, ?, ?)', events)
+                for name, (table, _) in ROLLUP_TABLES.items():
+                    conn.executemany(ROLLUP_UPSERT.format(table=table),
+                                     [(bucket, *row) for bucket, row in rollups[name].items()])
+            self.written += len(batch)
+            self.batches += 1
+        except sqlite3.Error as e:
+            print(f"❌ Error writing occupancy history: {str(e)}")
+
+    def _prune(self, conn):
+        """Delete raw rows older than the retention window"""
+        cutoff = time.time() - RAW_RETENTION
+        try:
+            with conn:
+                conn.execute('DELETE FROM occupancy_samples WHERE ts < ?', (cutoff,))
+                conn.execute('DELETE FROM space_events WHERE ts < ?', (cutoff,))
+        except sqlite3.Error as e:
+            print(f"❌ Error pruning occupancy history: {str(e)}")
+
+    def query_rollup(self, resolution, start, end):
+        """Averaged rollup rows for buckets between `start` and `end` (epoch seconds)"""
+        table, seconds = ROLLUP_TABLES[resolution]
+        with self._readers.connection() as conn:
+            rows = conn.execute(f'''
+                SELECT bucket, samples, available_sum / samples, occupied_sum / samples,
+                       reserved_sum / samples, utilization_sum / samples, utilization_max, status_changes
+                FROM {table} WHERE bucket BETWEEN ? AND ? AND samples > 0 ORDER BY bucket
+            ''', (int(start // seconds), int(end // seconds))).fetchall()
+        return [{
+            'timestamp': bucket * seconds,
+            'samples': samples,
+            'available_spaces': round(available, 2),
+            'occupied_spaces': round(occupied, 2),
+            'reserved_spaces': round(reserved, 2),
+            'utilization_rate': round(utilization, 2),
+            'peak_utilization_rate': utilization_max,
+            'status_changes': status_changes
+        } for bucket, samples, available, occupied, reserved, utilization, utilization_max, status_changes in rows]
+
+    def query_events(self, start, end, space_id=None, limit=1000):
+        """Raw status changes between `start` and `end`, newest first"""
+        with self._readers.connection() as conn:
+            sql = 'SELECT ts, space_id, status FROM space_events WHERE ts BETWEEN ? AND ?'
+            params = [start, end]
+            if space_id is not None:
+                sql += ' AND space_id = ?'
+                params.append(space_id)
+            rows = conn.execute(sql + ' ORDER BY ts DESC LIMIT ?', params + [limit]).fetchall()
+        return [{'timestamp': ts, 'space_id': space_id, 'status': status} for ts, space_id, status in rows]
@@ -0,0 +1,115 @@
+"""
+SmartPark password hashing
+Salted scrypt hashes computed on a small, bounded thread pool. scrypt is
+memory-hard and deliberately slow. OpenSSL runs it without holding the GIL,
+so a login storm keeps at most `workers` cores busy hashing. The serving
+threads are not starved: requests beyond the queue limit fail fast instead
+of piling up. Hashes record their cost parameters, so raising the cost later,
+or upgrading a legacy unsalted SHA-256 hash, happens on the next successful
+login.
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+SCRYPT_N = 2 ** 14           # CPU/memory cost (16 MiB with r=8)
+SCRYPT_R = 8                 # Block size
+SCRYPT_P = 1                 # Parallelism
+SALT_BYTES = 16
+KEY_BYTES = 32
+HASH_WORKERS = max(1, min(4, os.cpu_count() or 1))
+MAX_PENDING = 64             # Hashes queued or running before new ones are refused
+QUEUE_TIMEOUT = 2.0          # Seconds to wait for a queue slot
+
+
+class HasherBusy(Exception):
+    """Raised when too many hashes are already queued"""
+
+
+def _b64(data):
+    """Unpadded base64 text"""
+    return base64.b64encode(data).decode().rstrip('=')
+
+
+def _unb64(text):
+    """Bytes from unpadded base64 text"""
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+def is_legacy_hash(stored):
+    """True for the old unsalted hex SHA-256 hashes"""
+    return len(stored) == 64 and all(c in '0123456789abcdef' for c in stored)
+
+
+class PasswordHasher:
+    """scrypt hashing and verification on a bounded worker pool"""
+
+    def __init__(self, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P, workers=HASH_WORKERS,
+                 max_pending=MAX_PENDING, queue_timeout=QUEUE_TIMEOUT):
+        self.n = n
+        self.r = r
+        self.p = p
+        self.queue_timeout = queue_timeout
+        self.hashed = 0
+        self.rejected = 0             # Calls refused because the queue was full
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._dummy_salt = os.urandom(SALT_BYTES)
+
+    def hash(self, password):
+        """A new salted hash of `password` at the current cost"""
+        return self._submit(self._hash, password)
+
+    def verify(self, password, stored):
+        """Return (matches, needs_rehash) for `password` against a stored hash"""
+        return self._submit(self._verify, password, stored)
+
+    def verify_missing(self, password):
+        """Do the work of verify() for a user that does not exist, so the two cannot be told apart by timing"""
+        self._submit(self._derive, password, self._dummy_salt, self.n, self.r, self.p)
+        return False, False
+
+    def shutdown(self):
+        """Stop the worker threads"""
+        self._executor.shutdown(wait=True)
+
+    def _submit(self, func, *args):
+        """Run `func` on the pool and wait for it, or raise HasherBusy if the queue is full"""
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self.rejected += 1
+            raise HasherBusy('Too many password hashes in progress')
+        try:
+            return self._executor.submit(func, *args).result()
+        finally:
+            self._slots.release()
+
+    def _derive(self, password, salt, n, r, p):
+        """Raw scrypt key"""
+        self.hashed += 1
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                              maxmem=256 * n * r + (1 << 20), dklen=KEY_BYTES)
+
+    def _hash(self, password):
+        """Encode a fresh salt and key as scrypt$n$r$p$salt$key"""
+        salt = os.urandom(SALT_BYTES)
+        key = self._derive(password, salt, self.n, self.r, self.p)
+        return f'scrypt${self.n}${self.r}${self.p}${_b64(salt)}${_b64(key)}'
+
+    def _verify(self, password, stored):
+        """Check a scrypt or legacy SHA-256 hash in constant time"""
+        if is_legacy_hash(stored):
+            legacy = hashlib.sha256(password.encode()).hexdigest()
+            return hmac.compare_digest(legacy, stored), True
+        try:
+            scheme, n, r, p, salt, key = stored.split('$')
+            n, r, p = int(n), int(r), int(p)
+        except ValueError:
+            return False, False
+        if scheme != 'scrypt':
+            return False, False
+        matches = hmac.compare_digest(self._derive(password, _unb64(salt), n, r, p), _unb64(key))
+        return matches, (n, r, p) != (self.n, self.r, self.p)
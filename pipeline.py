@@ -0,0 +1,232 @@
+"""
+SmartPark frame pipeline
+Decode, process and publish run in their own threads, connected by bounded
+queues, so a slow stage never stalls the camera and stale frames are dropped.
+"""
+
+import collections
+import os
+import queue
+import threading
+import time
+
+import cv2
+
+DEFAULT_FPS = 25.0
+READ_RETRY_DELAY = 0.1   # Seconds to back off after a failed read from a live source
+
+# What the decode stage does when the process queue is full
+DROP_OLDEST = 'drop_oldest'   # Discard the oldest queued frame, keep the newest
+DROP_NEWEST = 'drop_newest'   # Discard the frame that was just decoded
+BLOCK = 'block'               # Wait for room (no drops, decode slows down)
+DROP_POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+
+class StageStats:
+    """Throughput, timing and drop counters for one pipeline stage"""
+
+    def __init__(self, name, input_queue=None, window=50):
+        self.name = name
+        self.input_queue = input_queue
+        self.processed = 0
+        self.dropped = 0
+        self.busy_seconds = 0.0
+        self._times = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, busy_seconds):
+        """Record one item handled by the stage"""
+        with self._lock:
+            self.processed += 1
+            self.busy_seconds += busy_seconds
+            self._times.append(time.time())
+
+    def record_drop(self):
+        """Record one frame dropped in front of the stage"""
+        with self._lock:
+            self.dropped += 1
+
+    def fps(self):
+        """Items per second over the recent window"""
+        with self._lock:
+            if len(self._times) < 2:
+                return 0.0
+            span = self._times[-1] - self._times[0]
+            return (len(self._times) - 1) / span if span > 0 else 0.0
+
+    def snapshot(self):
+        """Return the stage stats as a plain dict"""
+        fps = self.fps()
+        with self._lock:
+            stats = {
+                'processed': self.processed,
+                'dropped': self.dropped,
+                'fps': round(fps, 2),
+                'avg_ms': round(self.busy_seconds / self.processed * 1000, 3) if self.processed else 0.0
+            }
+        if self.input_queue is not None:
+            stats['queue_depth'] = self.input_queue.qsize()
+            stats['queue_size'] = self.input_queue.maxsize
+        return stats
+
+
+class FramePipeline:
+    """Capture -> process -> publish pipeline for one video source
+
+    process(img) returns a result (or None to skip publishing) and runs on the
+    process thread; publish(sequence, captured_at, result) runs on the publish thread.
+    stage_observer(stage, seconds), if given, is called after every stage runs.
+    """
+
+    def __init__(self, source, process, publish, queue_size=2, drop_policy=DROP_OLDEST,
+                 pace_to_source=True, stage_observer=None):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f'Unknown drop policy: {drop_policy}')
+
+        self.source = source
+        self.process = process
+        self.publish = publish
+        self.drop_policy = drop_policy
+        self.pace_to_source = pace_to_source
+        self.stage_observer = stage_observer
+        self.source_fps = None
+
+        self._process_queue = queue.Queue(maxsize=queue_size)
+        self._publish_queue = queue.Queue(maxsize=queue_size)
+        self.stats = {
+            'decode': StageStats('decode'),
+            'process': StageStats('process', self._process_queue),
+            'publish': StageStats('publish', self._publish_queue)
+        }
+        self._stop_event = threading.Event()
+        self._threads = []
+
+    def start(self):
+        """Start the decode, process and publish threads"""
+        for name, target in (('decode', self._decode_loop),
+                             ('process', self._process_loop),
+                             ('publish', self._publish_loop)):
+            thread = threading.Thread(target=target, name=f'pipeline-{name}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=2.0):
+        """Stop all stages"""
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _record(self, stage, seconds):
+        """Update the stage stats and notify the observer"""
+        self.stats[stage].record(seconds)
+        if self.stage_observer is not None:
+            self.stage_observer(stage, seconds)
+
+    def _put(self, target_queue, item, stats):
+        """Queue an item for the next stage according to the drop policy"""
+        if self.drop_policy == BLOCK:
+            while not self._stop_event.is_set():
+                try:
+                    target_queue.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+            return
+
+        try:
+            target_queue.put_nowait(item)
+            return
+        except queue.Full:
+            pass
+
+        if self.drop_policy == DROP_NEWEST:
+            stats.record_drop()
+            return
+
+        # DROP_OLDEST: make room by discarding the stalest queued item
+        try:
+            target_queue.get_nowait()
+            stats.record_drop()
+        except queue.Empty:
+            pass
+        try:
+            target_queue.put_nowait(item)
+        except queue.Full:
+            stats.record_drop()
+
+    def _get(self, source_queue):
+        """Wait for the next item, returning None when the pipeline stops"""
+        while not self._stop_event.is_set():
+            try:
+                return source_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None
+
+    def _decode_loop(self):
+        """Read frames from the source at its native rate"""
+        is_file = isinstance(self.source, str) and os.path.isfile(self.source)
+        cap = cv2.VideoCapture(self.source)
+        self.source_fps = cap.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+        frame_interval = 1.0 / self.source_fps
+        next_frame_at = time.time()
+        sequence = 0
+
+        while not self._stop_event.is_set():
+            started = time.time()
+            success, img = cap.read()
+            if not success:
+                if is_file:
+                    # Loop recorded footage
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                # Back off instead of spinning on a source with no frames
+                time.sleep(frame_interval if is_file else READ_RETRY_DELAY)
+                continue
+
+            sequence += 1
+            self._record('decode', time.time() - started)
+            self._put(self._process_queue, (sequence, started, img), self.stats['process'])
+
+            if self.pace_to_source:
+                next_frame_at += frame_interval
+                delay = next_frame_at - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+                elif delay < -frame_interval:
+                    # Fell behind by more than a frame - don't try to catch up in a burst
+                    next_frame_at = time.time()
+
+        cap.release()
+
+    def _process_loop(self):
+        """Run the detection work on queued frames"""
+        while True:
+            item = self._get(self._process_queue)
+            if item is None:
+                return
+            sequence, captured_at, img = item
+            started = time.time()
+            result = self.process(img)
+            self._record('process', time.time() - started)
+            if result is not None:
+                self._put(self._publish_queue, (sequence, captured_at, result), self.stats['publish'])
+
+    def _publish_loop(self):
+        """Hand processed frames to the publisher"""
+        while True:
+            item = self._get(self._publish_queue)
+            if item is None:
+                return
+            sequence, captured_at, result = item
+            started = time.time()
+            self.publish(sequence, captured_at, result)
+            self._record('publish', time.time() - started)
+
+    def snapshot(self):
+        """Return per-stage stats"""
+        return {
+            'source_fps': self.source_fps,
+            'drop_policy': self.drop_policy,
+            'stages': {name: stats.snapshot() for name, stats in self.stats.items()}
+        }
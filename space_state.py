@@ -0,0 +1,111 @@
+"""
+SmartPark space state
+Per-space detection state kept in fixed NumPy arrays that are allocated once per
+layout and updated in place every frame. Dicts for the API are only built when
+someone asks for them.
+"""
+
+import numpy as np
+
+from detection import SPACE_WIDTH, SPACE_HEIGHT, OCCUPIED_THRESHOLD
+
+# Status codes stored in SpaceState.status
+STATUS_AVAILABLE = 0
+STATUS_OCCUPIED = 1
+STATUS_RESERVED = 2
+STATUS_UNKNOWN = 3
+STATUS_NAMES = ('available', 'occupied', 'reserved', 'unknown')
+
+
+class SpaceState:
+    """Status of every space of one layout as parallel arrays"""
+
+    def __init__(self, positions, width=SPACE_WIDTH, height=SPACE_HEIGHT):
+        n = len(positions)
+        pos = np.asarray(positions, np.int32).reshape(n, 2)
+        self.ids = np.arange(1, n + 1, dtype=np.int32)
+        self.x = pos[:, 0].copy()
+        self.y = pos[:, 1].copy()
+        self.w = np.full(n, width, np.int32)
+        self.h = np.full(n, height, np.int32)
+        self.count = np.zeros(n, np.int32)
+        self.status = np.full(n, STATUS_UNKNOWN, np.uint8)
+        self.reserved = np.zeros(n, bool)
+        self.reservations = {}   # {space index: reservation info} for reserved spaces only
+        self.scored = False      # Set once the first frame has been classified
+
+    def __len__(self):
+        return len(self.ids)
+
+    def set_reservations(self, reservations):
+        """Apply {space_id: info}; return the indices whose reservation changed"""
+        current = {space_id - 1: info for space_id, info in list(reservations.items())
+                   if 0 < space_id <= len(self)}
+        changed = [i for i in self.reservations.keys() | current.keys()
+                   if self.reservations.get(i) is not current.get(i)]
+        self.reservations = current
+        if changed:
+            self.reserved[:] = False
+            self.reserved[list(current)] = True
+        return np.array(sorted(changed), np.intp)
+
+    def update(self, counts, rescore, threshold=OCCUPIED_THRESHOLD, bucket_size=1):
+        """Re-classify the spaces selected by the `rescore` mask from `counts`
+
+        Returns (changed, status_changed) index arrays: spaces whose status or count
+        bucket moved, and the subset whose status moved.
+        """
+        index = np.flatnonzero(rescore)
+        new_count = counts[index].astype(np.int32)
+        new_status = np.where(self.reserved[index], STATUS_RESERVED,
+                              np.where(new_count < threshold, STATUS_AVAILABLE, STATUS_OCCUPIED))
+
+        status_moved = new_status != self.status[index]
+        bucket_moved = new_count // bucket_size != self.count[index] // bucket_size
+        self.count[index] = new_count
+        self.status[index] = new_status
+        self.scored = True
+        return index[status_moved | bucket_moved], index[status_moved]
+
+    def totals(self):
+        """Return (available, occupied, reserved) counts"""
+        counts = np.bincount(self.status, minlength=len(STATUS_NAMES))
+        return int(counts[STATUS_AVAILABLE]), int(counts[STATUS_OCCUPIED]), int(counts[STATUS_RESERVED])
+
+    def copy(self):
+        """Frozen copy of the per-frame values; layout arrays are shared"""
+        state = SpaceState.__new__(SpaceState)
+        state.__dict__.update(self.__dict__)
+        state.count = self.count.copy()
+        state.status = self.status.copy()
+        state.reserved = self.reserved.copy()
+        state.reservations = dict(self.reservations)
+        return state
+
+    def status_names(self):
+        """Status name of every space"""
+        return [STATUS_NAMES[code] for code in self.status.tolist()]
+
+    def to_dict(self, i):
+        """API view of one space"""
+        x, y = int(self.x[i]), int(self.y[i])
+        return {
+            'id': int(self.ids[i]),
+            'position': (x, y),
+            'status': STATUS_NAMES[self.status[i]],
+            'count': int(self.count[i]),
+            'is_reserved': bool(self.reserved[i]),
+            'reservation_info': self.reservations.get(int(i)),
+            'coordinates': {
+                'x': x,
+                'y': y,
+                'width': int(self.w[i]),
+                'height': int(self.h[i])
+            }
+        }
+
+    def to_dicts(self, indices=None):
+        """API view of every space, or of the given indices"""
+        if indices is None:
+            indices = range(len(self))
+        return [self.to_dict(i) for i in indices]
@@ -25,30 +25,31 @@ ChartJS.register(
   ArcElement
 );
 
+const HISTORY_URL = 'http://localhost:5000/api/occupancy-history?resolution=1m&points=60';
+
 const OccupancyChart = ({ parkingData }) => {
   const [chartData, setChartData] = useState([]);
-  const [currentTime, setCurrentTime] = useState(new Date());
 
   useEffect(() => {
-    if (parkingData) {
-      // Add current data point to chart history
-      setChartData(prev => {
-        const newData = [...prev, {
-          time: currentTime.toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' }),
-          occupancy: parkingData.utilization_rate
-        }];
-        
-        // Keep only last 10 data points
-        return newData.slice(-10);
-      });
-    }
-  }, [parkingData, currentTime]);
+    // History is kept by the backend, so every tab starts with the last hour
+    const fetchHistory = async () => {
+      try {
+        const response = await fetch(HISTORY_URL);
+        if (!response.ok) {
+          return;
+        }
+        const data = await response.json();
+        setChartData(data.points.map(point => ({
+          time: new Date(point.timestamp * 1000).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' }),
+          occupancy: point.utilization_rate
+        })));
+      } catch (err) {
+        console.error('Error fetching occupancy history:', err);
+      }
+    };
 
-  useEffect(() => {
-    // Update time every minute
-    const interval = setInterval(() => {
-      setCurrentTime(new Date());
-    }, 60000);
+    fetchHistory();
+    const interval = setInterval(fetchHistory, 60000);
 
     return () => clearInterval(interval);
   }, []);
@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { motion } from 'framer-motion';
 import ReservationModal from './ReservationModal';
+import { subscribeToParkingEvents } from '../parkingEvents';
 
 const ParkingMap = ({ parkingData }) => {
   const [selectedSpace, setSelectedSpace] = useState(null);
@@ -11,6 +12,8 @@ const ParkingMap = ({ parkingData }) => {
   const [lastUpdateTime, setLastUpdateTime] = useState(0);
   const intervalRef = useRef(null);
   const lastDataRef = useRef(null);
+  const parkingDataRef = useRef(parkingData);
+  parkingDataRef.current = parkingData;
 
   // Fetch individual parking space data from backend
   const fetchParkingSpaces = async () => {
@@ -39,6 +42,7 @@ const ParkingMap = ({ parkingData }) => {
 
   // Fallback function to generate spaces when backend is not available
   const generateFallbackSpaces = () => {
+    const parkingData = parkingDataRef.current;
     if (!parkingData || !parkingData.total_spaces) {
       setParkingSpaces([]);
       setIsLoading(false);
@@ -88,34 +92,41 @@ const ParkingMap = ({ parkingData }) => {
     setIsLoading(false);
   };
 
+  // Apply a space list pushed over the event stream
+  const applySpaces = (spaces) => {
+    setParkingSpaces(spaces || []);
+    setLastUpdateTime(Date.now());
+    setIsLoading(false);
+  };
+
   useEffect(() => {
     fetchParkingSpaces();
     
-    // Optimized polling: Start with 1 second, then increase to 3 seconds for stability
-    let pollInterval = 1000;
-    let pollCount = 0;
+    // Live updates are pushed over the event stream; poll only while it is down
+    const stopPolling = () => {
+      if (intervalRef.current) {
+        clearInterval(intervalRef.current);
+        intervalRef.current = null;
+      }
+    };
     
-    const startPolling = () => {
-      intervalRef.current = setInterval(() => {
-        pollCount++;
-        fetchParkingSpaces();
-        
-        // After 10 quick polls, slow down to reduce server load
-        if (pollCount >= 10) {
-          clearInterval(intervalRef.current);
+    const unsubscribe = subscribeToParkingEvents({
+      onSnapshot: ({ spaces }) => applySpaces(spaces),
+      onSpaces: applySpaces,
+      onConnectionChange: (connected) => {
+        if (connected) {
+          stopPolling();
+        } else if (!intervalRef.current) {
           intervalRef.current = setInterval(fetchParkingSpaces, 3000);
         }
-      }, pollInterval);
-    };
-    
-    startPolling();
+      }
+    });
     
     return () => {
-      if (intervalRef.current) {
-        clearInterval(intervalRef.current);
-      }
+      unsubscribe();
+      stopPolling();
     };
-  }, [parkingData]);
+  }, []);
 
   // Optimized status color function with memoization
   const getStatusColor = (status) => {
@@ -256,6 +267,15 @@ const ParkingMap = ({ parkingData }) => {
             <div className={`w-4 h-4 rounded-full ${getStatusColor(selectedSpace.status)}`}></div>
           </div>
           
+          {/* Live view of just this bay */}
+          <img
+            src={`http://localhost:5000/api/parking-spaces/${selectedSpace.id}/snapshot?t=${lastUpdateTime}`}
+            alt={`Space #${selectedSpace.id}`}
+            className="mt-3 w-full max-w-xs rounded border border-gray-200"
+            onLoad={(e) => { e.currentTarget.style.display = ''; }}
+            onError={(e) => { e.currentTarget.style.display = 'none'; }}
+          />
+          
           <div className="mt-3 grid grid-cols-2 gap-4 text-sm">
             <div>
               <span className="text-gray-500">Position:</span>
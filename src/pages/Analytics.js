@@ -22,6 +22,7 @@ import {
   ArcElement,
 } from 'chart.js';
 import { Bar, Doughnut } from 'react-chartjs-2';
+import { subscribeToParkingEvents } from '../parkingEvents';
 
 ChartJS.register(
   CategoryScale,
@@ -38,6 +39,7 @@ const Analytics = () => {
   const [parkingData, setParkingData] = useState(null);
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [trendPoints, setTrendPoints] = useState([]);
 
   const fetchParkingData = async () => {
     try {
@@ -58,13 +60,61 @@ const Analytics = () => {
     fetchParkingData();
     setIsLoading(false);
 
-    // Set up real-time updates every 5 seconds
-    const interval = setInterval(fetchParkingData, 5000);
+    // Live updates are pushed over the event stream; poll every 5 seconds only while it is down
+    let interval = null;
+    const unsubscribe = subscribeToParkingEvents({
+      onSnapshot: ({ status }) => setParkingData(status),
+      onStatus: setParkingData,
+      onConnectionChange: (connected) => {
+        if (connected) {
+          clearInterval(interval);
+          interval = null;
+        } else if (!interval) {
+          interval = setInterval(fetchParkingData, 5000);
+        }
+      }
+    });
+    return () => {
+      unsubscribe();
+      clearInterval(interval);
+    };
+  }, []);
+
+  // Hourly occupancy for the last 24 hours, read from the backend's persisted rollups
+  useEffect(() => {
+    const fetchTrends = async () => {
+      try {
+        const response = await fetch('http://localhost:5000/api/occupancy-trends?resolution=hour');
+        if (response.ok) {
+          const data = await response.json();
+          setTrendPoints(data.points || []);
+        }
+      } catch (err) {
+        console.error('Error fetching occupancy trends:', err);
+      }
+    };
+
+    fetchTrends();
+    const interval = setInterval(fetchTrends, 5 * 60 * 1000);
     return () => clearInterval(interval);
   }, []);
 
-  // Generate mock historical data based on current occupancy
+  // Recorded history when there is some, otherwise mock data based on current occupancy
   const generateHistoricalData = () => {
+    if (trendPoints.length > 0) {
+      return {
+        labels: trendPoints.map(point => new Date(point.timestamp * 1000).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' })),
+        datasets: [
+          {
+            label: 'Occupancy Rate',
+            data: trendPoints.map(point => point.utilization_rate),
+            backgroundColor: 'rgba(59, 130, 246, 0.8)',
+            borderColor: 'rgba(59, 130, 246, 1)',
+            borderWidth: 1,
+          }
+        ],
+      };
+    }
     if (!parkingData) return { labels: [], datasets: [] };
     
     const baseOccupancy = parkingData.utilization_rate;
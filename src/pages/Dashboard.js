@@ -15,6 +15,7 @@ import StatCard from '../components/StatCard';
 import ParkingMap from '../components/ParkingMap';
 import RecentActivity from '../components/RecentActivity';
 import OccupancyChart from '../components/OccupancyChart';
+import { subscribeToParkingEvents } from '../parkingEvents';
 
 const Dashboard = () => {
   const [parkingData, setParkingData] = useState({
@@ -53,33 +54,41 @@ const Dashboard = () => {
     }
   };
 
+  // Apply totals pushed over the event stream
+  const applyParkingData = (data) => {
+    setParkingData(data);
+    setLastUpdated(new Date());
+    lastDataRef.current = JSON.stringify(data);
+  };
+
   useEffect(() => {
     // Initial data fetch
     fetchParkingData();
     setIsLoading(false);
 
-    // Optimized polling: Start with 1.5 seconds, then increase to 4 seconds for stability
-    let pollCount = 0;
-    
-    const startPolling = () => {
-      intervalRef.current = setInterval(() => {
-        pollCount++;
-        fetchParkingData();
-        
-        // After 8 quick polls, slow down to reduce server load
-        if (pollCount >= 8) {
-          clearInterval(intervalRef.current);
+    // Live updates are pushed over the event stream; poll only while it is down
+    const stopPolling = () => {
+      if (intervalRef.current) {
+        clearInterval(intervalRef.current);
+        intervalRef.current = null;
+      }
+    };
+
+    const unsubscribe = subscribeToParkingEvents({
+      onSnapshot: ({ status }) => applyParkingData(status),
+      onStatus: applyParkingData,
+      onConnectionChange: (connected) => {
+        if (connected) {
+          stopPolling();
+        } else if (!intervalRef.current) {
           intervalRef.current = setInterval(fetchParkingData, 4000);
         }
-      }, 1500);
-    };
-    
-    startPolling();
+      }
+    });
 
     return () => {
-      if (intervalRef.current) {
-        clearInterval(intervalRef.current);
-      }
+      unsubscribe();
+      stopPolling();
     };
   }, []);
 
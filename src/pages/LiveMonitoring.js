@@ -8,9 +8,12 @@ import {
   RefreshCw
 } from 'lucide-react';
 
+const VIDEO_STREAM_URL = 'http://localhost:5000/api/video-stream';
+
 const LiveMonitoring = () => {
   const [currentTime, setCurrentTime] = useState(new Date().toLocaleTimeString());
-  const [currentFrame, setCurrentFrame] = useState(null);
+  const [streamUrl, setStreamUrl] = useState(VIDEO_STREAM_URL);
+  const [isStreaming, setIsStreaming] = useState(false);
   const [isConnected, setIsConnected] = useState(false);
   const [parkingStatus, setParkingStatus] = useState({
     total_spaces: 0,
@@ -19,7 +22,7 @@ const LiveMonitoring = () => {
     utilization_rate: 0
   });
   const videoRef = useRef(null);
-  const frameIntervalRef = useRef(null);
+  const reconnectRef = useRef(null);
 
   // Fetch parking status from backend
   const fetchParkingStatus = async () => {
@@ -36,18 +39,14 @@ const LiveMonitoring = () => {
     }
   };
 
-  // Fetch video frame from backend
-  const fetchVideoFrame = async () => {
-    try {
-      const response = await fetch('http://localhost:5000/api/video-frame');
-      if (response.ok) {
-        const data = await response.json();
-        if (data.frame) {
-          setCurrentFrame(`data:image/jpeg;base64,${data.frame}`);
-        }
-      }
-    } catch (error) {
-      console.log('Could not fetch video frame from backend');
+  // The MJPEG stream pushes each new frame; reconnect if it drops
+  const handleStreamError = () => {
+    setIsStreaming(false);
+    if (!reconnectRef.current) {
+      reconnectRef.current = setTimeout(() => {
+        reconnectRef.current = null;
+        setStreamUrl(`${VIDEO_STREAM_URL}?t=${Date.now()}`);
+      }, 2000);
     }
   };
 
@@ -60,14 +59,11 @@ const LiveMonitoring = () => {
     // Fetch parking status every 2 seconds
     const statusTimer = setInterval(fetchParkingStatus, 2000);
 
-    // Fetch video frames every 100ms (10 FPS)
-    frameIntervalRef.current = setInterval(fetchVideoFrame, 100);
-
     return () => {
       clearInterval(timer);
       clearInterval(statusTimer);
-      if (frameIntervalRef.current) {
-        clearInterval(frameIntervalRef.current);
+      if (reconnectRef.current) {
+        clearTimeout(reconnectRef.current);
       }
     };
   }, []);
@@ -130,14 +126,15 @@ const LiveMonitoring = () => {
             
             {/* Video Container */}
             <div className="relative bg-gray-900 rounded-lg overflow-hidden">
-              {currentFrame ? (
-                <img
-                  ref={videoRef}
-                  src={currentFrame}
-                  alt="Live Detection Feed"
-                  className="w-full aspect-video object-cover"
-                />
-              ) : (
+              <img
+                ref={videoRef}
+                src={streamUrl}
+                alt="Live Detection Feed"
+                onLoad={() => setIsStreaming(true)}
+                onError={handleStreamError}
+                className={`w-full aspect-video object-cover ${isStreaming ? '' : 'hidden'}`}
+              />
+              {!isStreaming && (
                 <div className="aspect-video bg-gradient-to-br from-gray-800 to-gray-900 flex items-center justify-center">
                   <div className="text-center text-white">
                     <RefreshCw className="w-16 h-16 mx-auto mb-4 animate-spin" />
@@ -191,9 +188,9 @@ const LiveMonitoring = () => {
               <div className="flex items-center justify-between">
                 <span className="text-sm text-gray-600">Video Feed</span>
                 <span className={`text-sm font-medium ${
-                  currentFrame ? 'text-success-600' : 'text-warning-600'
+                  isStreaming ? 'text-success-600' : 'text-warning-600'
                 }`}>
-                  {currentFrame ? 'Active' : 'Connecting...'}
+                  {isStreaming ? 'Active' : 'Connecting...'}
                 </span>
               </div>
               <div className="flex items-center justify-between">
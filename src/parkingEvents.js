@@ -0,0 +1,67 @@
+// Shared Server-Sent Events connection for live parking updates.
+// One EventSource per tab, however many components subscribe.
+const EVENTS_URL = 'http://localhost:5001/api/events';
+
+const listeners = new Set();
+let eventSource = null;
+let latest = null; // { status, spaces } as of the last event
+
+const notify = (type, payload) => {
+  listeners.forEach((listener) => listener[type] && listener[type](payload));
+};
+
+const open = () => {
+  eventSource = new EventSource(EVENTS_URL);
+
+  eventSource.addEventListener('snapshot', (event) => {
+    latest = JSON.parse(event.data);
+    notify('onSnapshot', latest);
+    notify('onConnectionChange', true);
+  });
+
+  eventSource.addEventListener('spaces', (event) => {
+    const { spaces } = JSON.parse(event.data);
+    if (latest) {
+      const changed = new Map(spaces.map((space) => [space.id, space]));
+      latest = { ...latest, spaces: latest.spaces.map((space) => changed.get(space.id) || space) };
+    }
+    notify('onSpaces', latest ? latest.spaces : spaces);
+  });
+
+  eventSource.addEventListener('status', (event) => {
+    const status = JSON.parse(event.data);
+    if (latest) {
+      latest = { ...latest, status };
+    }
+    notify('onStatus', status);
+  });
+
+  // EventSource reconnects by itself; callers fall back to polling meanwhile
+  eventSource.onerror = () => notify('onConnectionChange', false);
+};
+
+// Subscribe to live updates. Handlers: onSnapshot({status, spaces}), onSpaces(spaces),
+// onStatus(status), onConnectionChange(connected). Returns an unsubscribe function.
+export const subscribeToParkingEvents = (handlers) => {
+  if (typeof EventSource === 'undefined') {
+    handlers.onConnectionChange && handlers.onConnectionChange(false);
+    return () => {};
+  }
+
+  listeners.add(handlers);
+  if (!eventSource) {
+    open();
+  } else if (latest) {
+    handlers.onSnapshot && handlers.onSnapshot(latest);
+    handlers.onConnectionChange && handlers.onConnectionChange(eventSource.readyState === EventSource.OPEN);
+  }
+
+  return () => {
+    listeners.delete(handlers);
+    if (listeners.size === 0 && eventSource) {
+      eventSource.close();
+      eventSource = null;
+      latest = null;
+    }
+  };
+};
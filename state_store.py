@@ -0,0 +1,267 @@
+"""
+SmartPark shared state
+The state the API reads and writes behind one interface: reservations, OTPs
+and the latest parking status published by the detector. MemoryStateStore
+keeps it in this process, which is enough for a single threaded server.
+SQLiteStateStore keeps it in a WAL database, so several API worker processes
+see the same reservations and OTPs. Detection then runs in one process and
+publishes the status to all the workers.
+"""
+
+import json
+import time
+
+from db_pool import ConnectionPool
+from ttl_store import TTLStore
+
+DEFAULT_DB_FILE = 'smartpark_state.db'
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS state_entries (
+        namespace TEXT NOT NULL,
+        key TEXT NOT NULL,
+        value TEXT NOT NULL,
+        expires_at REAL,
+        PRIMARY KEY (namespace, key)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_state_entries_expiry ON state_entries (namespace, expires_at);
+
+    CREATE TABLE IF NOT EXISTS state_versions (
+        namespace TEXT PRIMARY KEY,
+        version INTEGER NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS status_snapshot (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version TEXT NOT NULL,
+        timestamp REAL NOT NULL,
+        status_json BLOB NOT NULL,
+        spaces_json BLOB NOT NULL
+    );
+'''
+
+
+class MemoryStateStore:
+    """State kept in this process: one TTLStore per namespace"""
+
+    shared = False
+
+    def namespace(self, name, ttl=None, maxsize=10000):
+        """The key/value store for one kind of state"""
+        return TTLStore(ttl, maxsize)
+
+    def publish_snapshot(self, version, timestamp, status_json, spaces_json):
+        """Nothing to do: the API reads the detector's snapshot directly"""
+
+    def load_snapshot(self, version, timestamp):
+        """Never anything newer than what this process already holds"""
+        return None
+
+
+class SQLiteStateStore:
+    """State kept in a SQLite database shared by every process that opens it"""
+
+    shared = True
+
+    def __init__(self, path=DEFAULT_DB_FILE, pool_size=4):
+        self.path = path
+        self.pool = ConnectionPool(path, size=pool_size, row_factory=None)
+        with self.pool.transaction() as conn:
+            conn.executescript(SCHEMA)
+
+    def namespace(self, name, ttl=None, maxsize=10000):
+        """The key/value store for one kind of state"""
+        return SQLiteNamespace(self.pool, name, ttl, maxsize)
+
+    def publish_snapshot(self, version, timestamp, status_json, spaces_json):
+        """Replace the published parking status"""
+        with self.pool.transaction() as conn:
+            conn.execute('INSERT OR REPLACE INTO status_snapshot VALUES (1, ?, ?, ?, ?)',
+                         (version, timestamp, status_json, spaces_json))
+
+    def load_snapshot(self, version, timestamp):
+        """(version, timestamp, status_json, spaces_json) unless the caller already holds that snapshot"""
+        with self.pool.connection() as conn:
+            row = conn.execute('SELECT version, timestamp FROM status_snapshot WHERE id = 1').fetchone()
+            if row is None or row == (version, timestamp):
+                return None
+            row = conn.execute('SELECT version, timestamp, status_json, spaces_json '
+                               'FROM status_snapshot WHERE id = 1').fetchone()
+        return row[0], row[1], bytes(row[2]), bytes(row[3])
+
+    def close(self):
+        """Close the pooled connections"""
+        self.pool.close()
+
+
+class SQLiteNamespace:
+    """TTLStore-compatible view of one namespace in a SQLiteStateStore
+
+    Keys and values are stored as JSON, so they must be JSON-serializable and
+    values come back as fresh objects: change an entry by setting it again.
+    Counters are kept per process.
+    """
+
+    def __init__(self, pool, name, ttl=None, maxsize=10000, clock=time.time):
+        self.pool = pool
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.rejected = 0
+
+    def __len__(self):
+        with self.pool.connection() as conn:
+            return conn.execute('SELECT COUNT(*) FROM state_entries WHERE namespace = ? '
+                                'AND (expires_at IS NULL OR expires_at > ?)',
+                                (self.name, self.clock())).fetchone()[0]
+
+    def __contains__(self, key):
+        return self.get(key, count=False) is not None
+
+    @property
+    def version(self):
+        """Bumped on every write by any process"""
+        with self.pool.connection() as conn:
+            row = conn.execute('SELECT version FROM state_versions WHERE namespace = ?',
+                               (self.name,)).fetchone()
+        return row[0] if row else 0
+
+    def get(self, key, default=None, count=True):
+        """The live value for `key`, or `default` if it is missing or expired"""
+        with self.pool.connection() as conn:
+            row = conn.execute('SELECT value, expires_at FROM state_entries WHERE namespace = ? AND key = ?',
+                               (self.name, json.dumps(key))).fetchone()
+        if row is not None and row[1] is not None and row[1] <= self.clock():
+            row = None      # Deleted by the next write
+        if count:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return default if row is None else json.loads(row[0])
+
+    def expires_at(self, key):
+        """When `key` expires (inf if never), or None if it is not stored or has expired"""
+        with self.pool.connection() as conn:
+            row = conn.execute('SELECT expires_at FROM state_entries WHERE namespace = ? AND key = ?',
+                               (self.name, json.dumps(key))).fetchone()
+        if row is None:
+            return None
+        if row[0] is None:
+            return float('inf')
+        return row[0] if row[0] > self.clock() else None
+
+    def items(self):
+        """{key: value} of every live entry"""
+        with self.pool.connection() as conn:
+            rows = conn.execute('SELECT key, value FROM state_entries WHERE namespace = ? '
+                                'AND (expires_at IS NULL OR expires_at > ?)',
+                                (self.name, self.clock())).fetchall()
+        return {json.loads(key): json.loads(value) for key, value in rows}
+
+    def set(self, key, value, ttl=None):
+        """Store `value`, replacing any entry for `key` and restarting its TTL
+
+        Returns when it expires, or None if `key` is new and the namespace is full.
+        """
+        return self._write(key, value, ttl, 'INSERT OR REPLACE')[1]
+
+    def add(self, key, value, ttl=None):
+        """Store `value` only if `key` has no live entry and there is room; returns whether it was stored"""
+        return self._write(key, value, ttl, 'INSERT OR IGNORE')[0]
+
+    def replace(self, key, value):
+        """Change the value of a live entry without touching its expiry; returns whether it was stored"""
+        with self.pool.transaction() as conn:
+            stored = conn.execute('UPDATE state_entries SET value = ? WHERE namespace = ? AND key = ? '
+                                  'AND (expires_at IS NULL OR expires_at > ?)',
+                                  (json.dumps(value), self.name, json.dumps(key), self.clock())).rowcount == 1
+            if stored:
+                self._bump(conn)
+        return stored
+
+    def increment(self, key, ttl=None):
+        """Add 1 to the counter at `key`, starting it at 1 (with a fresh TTL) if it is missing
+
+        Later increments keep the expiry, so the counter covers a fixed window.
+        Returns the new count, or None if `key` is new and the namespace is full.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        with self.pool.transaction() as conn:
+            self._purge(conn)   # Takes the write lock first, so the steps below cannot race
+            row = conn.execute('UPDATE state_entries SET value = CAST(value + 1 AS TEXT) '
+                               'WHERE namespace = ? AND key = ? RETURNING value',
+                               (self.name, json.dumps(key))).fetchone()
+            if row is None:
+                if self._full(conn, key):
+                    self.rejected += 1
+                    return None
+                conn.execute('INSERT INTO state_entries VALUES (?, ?, ?, ?)',
+                             (self.name, json.dumps(key), '1', None if ttl is None else self.clock() + ttl))
+            self._bump(conn)
+        return 1 if row is None else json.loads(row[0])
+
+    def pop(self, key, default=None):
+        """Remove `key` and return its value"""
+        with self.pool.transaction() as conn:
+            row = conn.execute('DELETE FROM state_entries WHERE namespace = ? AND key = ? '
+                               'RETURNING value, expires_at', (self.name, json.dumps(key))).fetchone()
+            if row is not None:
+                self._bump(conn)
+        if row is None or (row[1] is not None and row[1] <= self.clock()):
+            return default
+        return json.loads(row[0])
+
+    def purge(self):
+        """Remove every expired entry"""
+        with self.pool.transaction() as conn:
+            self._purge(conn)
+
+    def _write(self, key, value, ttl, verb):
+        """Insert one entry after purging; returns (stored, expires_at or None if it was not stored)"""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = None if ttl is None else self.clock() + ttl
+        with self.pool.transaction() as conn:
+            self._purge(conn)   # Takes the write lock first, so the steps below cannot race
+            if self._full(conn, key):
+                self.rejected += 1
+                return False, None
+            stored = conn.execute(f'{verb} INTO state_entries VALUES (?, ?, ?, ?)',
+                                  (self.name, json.dumps(key), json.dumps(value), expires_at)).rowcount == 1
+            if stored:
+                self._bump(conn)
+        return stored, float('inf') if expires_at is None else expires_at
+
+    def _purge(self, conn):
+        """Delete expired entries using the expiry index"""
+        removed = conn.execute('DELETE FROM state_entries WHERE namespace = ? AND expires_at <= ?',
+                               (self.name, self.clock())).rowcount
+        if removed:
+            self.expired += removed
+            self._bump(conn)
+
+    def _full(self, conn, key):
+        """Whether `key` is new and the namespace already holds maxsize entries"""
+        count = conn.execute('SELECT COUNT(*) FROM state_entries WHERE namespace = ?', (self.name,)).fetchone()[0]
+        if count < self.maxsize:
+            return False
+        return conn.execute('SELECT 1 FROM state_entries WHERE namespace = ? AND key = ?',
+                            (self.name, json.dumps(key))).fetchone() is None
+
+    def _bump(self, conn):
+        """Advance this namespace's version"""
+        conn.execute('INSERT INTO state_versions VALUES (?, 1) '
+                     'ON CONFLICT(namespace) DO UPDATE SET version = version + 1', (self.name,))
+
+
+def create_state_store(backend='memory', path=DEFAULT_DB_FILE):
+    """The store for STATE_BACKEND: 'memory' (single process) or 'sqlite' (shared by workers)"""
+    if backend == 'memory':
+        return MemoryStateStore()
+    if backend == 'sqlite':
+        return SQLiteStateStore(path)
+    raise ValueError(f"Unknown state backend '{backend}', use 'memory' or 'sqlite'")
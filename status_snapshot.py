@@ -0,0 +1,90 @@
+"""
+SmartPark status snapshots
+Immutable views of the parking status published by the detector. A snapshot
+holds a frozen copy of the space arrays; the space dicts and JSON bytes are
+built the first time an API request needs them and then reused, so requests
+never re-serialize and never see a half-updated state.
+"""
+
+import json
+import threading
+import time
+
+
+def encode_json(data):
+    """Compact JSON bytes"""
+    return json.dumps(data, separators=(',', ':')).encode()
+
+
+class StatusSnapshot:
+    """One published parking status: totals, frozen space state and their JSON encodings"""
+
+    __slots__ = ('version', 'status', 'state', 'timestamp', 'status_json',
+                 '_spaces', '_spaces_json', '_lock')
+
+    def __init__(self, version, status, state, timestamp=None):
+        fields = {
+            'version': version,
+            'status': dict(status),
+            'state': state,               # SpaceState copy, or None before the first frame
+            'timestamp': time.time() if timestamp is None else timestamp,
+            'status_json': encode_json(status),
+            '_spaces': None,
+            '_spaces_json': None,
+            '_lock': threading.Lock()
+        }
+        for name, value in fields.items():
+            object.__setattr__(self, name, value)
+
+    @classmethod
+    def from_json(cls, version, timestamp, status_json, spaces_json):
+        """Rebuild a snapshot another process published from its JSON encodings"""
+        snapshot = cls.__new__(cls)
+        fields = {
+            'version': version,
+            'status': json.loads(status_json),
+            'state': None,
+            'timestamp': timestamp,
+            'status_json': status_json,
+            '_spaces': tuple(json.loads(spaces_json)['spaces']),
+            '_spaces_json': spaces_json,
+            '_lock': threading.Lock()
+        }
+        for name, value in fields.items():
+            object.__setattr__(snapshot, name, value)
+        return snapshot
+
+    def __setattr__(self, name, value):
+        raise AttributeError('StatusSnapshot is immutable; publish a new one instead')
+
+    @property
+    def spaces(self):
+        """Every space as an API dict (built once)"""
+        if self._spaces is None:
+            with self._lock:
+                if self._spaces is None:
+                    spaces = tuple(self.state.to_dicts()) if self.state is not None else ()
+                    object.__setattr__(self, '_spaces', spaces)
+        return self._spaces
+
+    @property
+    def spaces_json(self):
+        """The /api/parking-spaces response body (encoded once)"""
+        if self._spaces_json is None:
+            spaces = self.spaces
+            with self._lock:
+                if self._spaces_json is None:
+                    object.__setattr__(self, '_spaces_json', encode_json({
+                        'spaces': spaces,
+                        'version': self.version,
+                        'full': True,
+                        'total_spaces': len(spaces),
+                        'timestamp': self.timestamp
+                    }))
+        return self._spaces_json
+
+    def space_dicts(self, indices):
+        """API dicts for a few spaces, without building the whole list"""
+        if self._spaces is not None:
+            return [self._spaces[i] for i in indices]
+        return self.state.to_dicts(indices)
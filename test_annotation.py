@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Offline tests for on-demand frame annotation
+"""
+
+import numpy as np
+
+from annotation import OverlayRenderer, draw_space, draw_summary
+from benchmark import synthetic_color_frame, synthetic_layout
+
+
+def draw_directly(frame, posList, statuses, counts):
+    """Reference: draw every space straight onto a copy of the frame"""
+    img = frame.copy()
+    for pos, status, count in zip(posList, statuses, counts):
+        draw_space(img, pos, status, count)
+    draw_summary(img, statuses.count('available'), len(statuses))
+    return img
+
+
+def test_cached_overlay_matches_direct_drawing():
+    """Incrementally updated overlays give the same pixels as drawing every frame"""
+    frame = synthetic_color_frame()
+    posList = synthetic_layout(60)
+    rng = np.random.default_rng(3)
+    statuses = ['available'] * len(posList)
+    counts = [100] * len(posList)
+    renderer = OverlayRenderer(posList)
+
+    for step in range(5):
+        for i in rng.choice(len(posList), size=4, replace=False):
+            statuses[i] = ['available', 'occupied', 'reserved'][step % 3]
+            counts[i] = int(rng.integers(0, 20000))
+        annotated = renderer.render(frame, statuses, counts)
+        assert np.array_equal(annotated, draw_directly(frame, posList, statuses, counts)), step
+
+    print("✅ Cached overlay matches direct drawing")
+
+
+def test_unchanged_statuses_do_not_redraw():
+    """Rendering the same statuses again reuses the overlay"""
+    frame = synthetic_color_frame()
+    renderer = OverlayRenderer(synthetic_layout(10))
+    statuses, counts = ['occupied'] * 10, [1000] * 10
+
+    renderer.render(frame, statuses, counts)
+    renderer.render(frame, statuses, counts)
+    assert renderer.rebuilds == 1
+    print("✅ Overlay reused when nothing changed")
+
+
+def test_count_jitter_within_a_bucket_draws_nothing():
+    """Counts that stay in their bucket reuse the overlay; crossing a bucket redraws"""
+    frame = synthetic_color_frame()
+    posList = synthetic_layout(10)
+    renderer = OverlayRenderer(posList, bucket_size=100)
+    statuses = ['occupied'] * 10
+
+    first = renderer.render(frame, statuses, [1234] * 10)
+    jittered = renderer.render(frame, statuses, [1200 + i * 9 for i in range(10)])
+    assert renderer.rebuilds == 1
+    assert np.array_equal(jittered, first)
+    assert np.array_equal(first, draw_directly(frame, posList, statuses, [1200] * 10))
+
+    renderer.render(frame, statuses, [1300] + [1234] * 9)
+    assert renderer.rebuilds == 2
+    print("✅ Count jitter inside a bucket draws nothing")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing frame annotation")
+    test_cached_overlay_matches_direct_drawing()
+    test_unchanged_statuses_do_not_redraw()
+    test_count_jitter_within_a_bucket_draws_nothing()
+    print("\n✨ Annotation tests completed!")
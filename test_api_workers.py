@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end test: a detector process and a separate API worker process
+sharing state through the SQLite backend
+"""
+
+import multiprocessing
+import os
+import tempfile
+
+import numpy as np
+
+
+def start_in(directory):
+    """Run from `directory` with the shared state backend, as the README describes"""
+    os.chdir(directory)
+    os.environ['SMARTPARK_STATE_BACKEND'] = 'sqlite'
+
+
+def run_detector(directory, results, reserved):
+    """Detector process: classify a frame and publish it, then pick up a worker's reservation"""
+    start_in(directory)
+    import backend
+    from benchmark import synthetic_layout
+    from detection import SPACE_WIDTH, SPACE_HEIGHT
+
+    backend.set_parking_positions(synthetic_layout(6))
+    imgPro = np.zeros((720, 1280), np.uint8)
+    x, y = backend.posList[0]
+    imgPro[y:y + SPACE_HEIGHT, x:x + SPACE_WIDTH] = 255
+    backend.check_parking_space(imgPro)
+    results.put(('published', backend.status_snapshot.version))
+
+    reserved.wait(60)
+    backend.check_parking_space(imgPro)
+    results.put(('detector', backend.status_snapshot.status['reserved_spaces'],
+                 backend.space_state.to_dict(1)['status']))
+
+
+def run_worker(directory, results):
+    """API worker process: serve status and take a reservation through the WSGI entry point"""
+    start_in(directory)
+    import wsgi
+
+    client = wsgi.app.test_client()
+    status = client.get('/api/parking-status').get_json()
+    spaces = client.get('/api/parking-spaces').get_json()
+    created = client.post('/api/reservations', json={'space_id': 2, 'user_name': 'Ann'}).status_code
+    duplicate = client.post('/api/reservations', json={'space_id': 2, 'user_name': 'Bob'}).status_code
+    invalid = client.post('/api/reservations', json={'space_id': 7, 'user_name': 'Bob'}).status_code
+    stream = client.get('/api/video-stream').status_code
+    results.put(('worker', status, len(spaces['spaces']), spaces['version'], created, duplicate, invalid, stream))
+
+
+def test_worker_serves_what_the_detector_publishes():
+    """A worker process serves the detector's status, and its reservations reach the detector"""
+    context = multiprocessing.get_context('spawn')   # Fresh interpreters, like separately started processes
+    with tempfile.TemporaryDirectory() as directory:
+        results = context.Queue()
+        reserved = context.Event()
+        detector = context.Process(target=run_detector, args=(directory, results, reserved))
+        detector.start()
+        try:
+            _, version = results.get(timeout=60)
+
+            worker = context.Process(target=run_worker, args=(directory, results))
+            worker.start()
+            worker.join(60)
+            _, status, n_spaces, worker_version, created, duplicate, invalid, stream = results.get(timeout=60)
+            assert status['total_spaces'] == 6 and status['occupied_spaces'] == 1
+            assert n_spaces == 6 and worker_version == version
+            assert (created, duplicate, invalid) == (201, 409, 400)
+            assert stream == 503   # The video stream only has frames in the detector process
+
+            reserved.set()
+            _, reserved_spaces, space_status = results.get(timeout=60)
+            assert reserved_spaces == 1 and space_status == 'reserved'
+        finally:
+            reserved.set()
+            detector.join(60)
+    print("✅ API worker serves the detector's status and shares reservations")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing API worker processes")
+    test_worker_serves_what_the_detector_publishes()
+    print("\n✨ API worker tests completed!")
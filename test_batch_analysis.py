@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Offline tests for headless batch analysis of recorded footage
+"""
+
+import os
+import tempfile
+
+import cv2
+import numpy as np
+
+from batch_analysis import analyse_video, save_timeline, load_timeline, seek
+from benchmark import synthetic_layout, synthetic_color_frame
+from detection import SpaceScorer, preprocess_frame, OCCUPIED_THRESHOLD
+from test_detection_supervisor import write_test_video
+
+
+def live_counts(video, posList):
+    """Reference: score every frame sequentially like the live detection loop"""
+    scorer = SpaceScorer(posList)
+    cap = cv2.VideoCapture(video)
+    counts = []
+    while True:
+        success, img = cap.read()
+        if not success:
+            break
+        counts.append(scorer.counts(preprocess_frame(img)))
+    return np.array(counts)
+
+
+def write_mp4_video(path, frames=10, shape=(240, 320)):
+    """Write a short MPEG-4 video whose chunks start between keyframes"""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 25, (shape[1], shape[0]))
+    for i in range(frames):
+        writer.write(synthetic_color_frame(shape, seed=i))
+    writer.release()
+
+
+def test_batch_matches_live_path():
+    """Chunked multi-process results equal the sequential live results"""
+    with tempfile.TemporaryDirectory() as tmp:
+        video = os.path.join(tmp, 'footage.avi')
+        write_test_video(video, frames=23)
+        posList = synthetic_layout(8, shape=(240, 320))
+
+        timeline = analyse_video(video, posList, workers=3, chunk_frames=5)
+        assert np.array_equal(timeline['counts'], live_counts(video, posList))
+
+        path = os.path.join(tmp, 'timeline.npz')
+        save_timeline(path, timeline, posList)
+        loaded = load_timeline(path)
+        assert np.array_equal(loaded['occupied'], loaded['counts'] >= OCCUPIED_THRESHOLD)
+        assert len(loaded['free_spaces']) == 23
+
+    print(f"✅ Batch timeline matches the live path ({timeline['frames_per_second']:.0f} frames/sec)")
+
+
+def test_mp4_chunks_match_sequential_pass():
+    """Chunks of compressed footage start on their own frame, not a nearby keyframe"""
+    with tempfile.TemporaryDirectory() as tmp:
+        video = os.path.join(tmp, 'footage.mp4')
+        write_mp4_video(video, frames=40)
+        posList = synthetic_layout(8, shape=(240, 320))
+
+        cap = cv2.VideoCapture(video)
+        frames = [cap.read()[1] for _ in range(40)]
+        cap.release()
+        for start in (7, 13, 27):
+            cap = seek(video, start)
+            assert np.array_equal(cap.read()[1], frames[start])
+            cap.release()
+
+        timeline = analyse_video(video, posList, workers=3, chunk_frames=7)
+        assert len(timeline['counts']) == 40
+        assert np.array_equal(timeline['counts'], live_counts(video, posList))
+
+    print("✅ MPEG-4 chunked timeline matches a sequential pass")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing batch analysis")
+    test_batch_matches_live_path()
+    test_mp4_chunks_match_sequential_pass()
+    print("\n✨ Batch analysis tests completed!")
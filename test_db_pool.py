@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the pooled SQLite connections
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+
+from db_pool import ConnectionPool
+
+
+def make_pool(tmp, size=2):
+    """A pool over a fresh database with one table"""
+    pool = ConnectionPool(os.path.join(tmp, 'users.db'), size=size)
+    with pool.transaction() as conn:
+        conn.execute('CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT UNIQUE NOT NULL)')
+    return pool
+
+
+def test_connections_are_reused():
+    """Connections stay open in WAL mode and are handed out again instead of reopened"""
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = make_pool(tmp)
+        for i in range(50):
+            with pool.connection() as conn:
+                conn.execute('SELECT id FROM users WHERE email = ?', (f'user{i}@example.com',)).fetchone()
+        assert pool.created == 1 and pool.reused == 50
+        with pool.connection() as conn:
+            assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+            assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1  # NORMAL
+        pool.close()
+    print("✅ Pooled connections are reused and run in WAL mode")
+
+
+def test_transactions_commit_or_roll_back():
+    """A failed transaction leaves nothing behind and the connection stays usable"""
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = make_pool(tmp, size=1)
+        with pool.transaction() as conn:
+            conn.execute('INSERT INTO users (email) VALUES (?)', ('a@example.com',))
+        try:
+            with pool.transaction() as conn:
+                conn.execute('INSERT INTO users (email) VALUES (?)', ('b@example.com',))
+                conn.execute('INSERT INTO users (email) VALUES (?)', ('a@example.com',))
+        except sqlite3.IntegrityError:
+            pass
+        with pool.connection() as conn:
+            emails = [row['email'] for row in conn.execute('SELECT email FROM users')]
+        assert emails == ['a@example.com']
+        pool.close()
+    print("✅ Transactions commit or roll back as a whole")
+
+
+def test_threads_share_bounded_pool():
+    """Many threads reading and writing never open more than `size` connections"""
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = make_pool(tmp, size=3)
+        errors = []
+
+        def worker(n):
+            try:
+                for i in range(20):
+                    with pool.transaction() as conn:
+                        conn.execute('INSERT INTO users (email) VALUES (?)', (f'{n}-{i}@example.com',))
+                    with pool.connection() as conn:
+                        conn.execute('SELECT * FROM users WHERE email = ?', (f'{n}-{i}@example.com',)).fetchone()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert not errors
+        assert pool.created <= 3
+        with pool.connection() as conn:
+            assert conn.execute('SELECT COUNT(*) FROM users').fetchone()[0] == 200
+        pool.close()
+    print("✅ Threads share a bounded pool")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing the database connection pool")
+    test_connections_are_reused()
+    test_transactions_commit_or_roll_back()
+    test_threads_share_bounded_pool()
+    print("\n✨ Connection pool tests completed!")
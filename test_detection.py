@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the detection helpers (no video or server required)
+"""
+
+import numpy as np
+
+from benchmark import (synthetic_binary_frame, synthetic_color_frame, synthetic_layout,
+                       count_per_space)
+from detection import (SpaceScorer, RoiPreprocessor, MotionGate, preprocess_frame,
+                       SPACE_WIDTH, SPACE_HEIGHT, FILTER_HALO, MOTION_TOLERANCE)
+
+
+def test_scorer_matches_per_space_count():
+    """Summed-area counts must equal cv2.countNonZero on every crop"""
+    imgPro = synthetic_binary_frame()
+    posList = synthetic_layout(500)
+    # Spaces hanging over the frame edge are clipped just like array slicing
+    posList += [(1250, 700), (0, 0), (1279, 10)]
+
+    counts = SpaceScorer(posList).counts(imgPro)
+
+    assert np.array_equal(counts, count_per_space(imgPro, posList))
+    print("✅ Integral image counts match the per-space loop")
+
+
+def test_scorer_empty_layout():
+    """An empty layout returns an empty count array"""
+    counts = SpaceScorer([]).counts(synthetic_binary_frame())
+    assert counts.shape == (0,)
+    print("✅ Empty layout handled")
+
+
+def test_roi_preprocessing_matches_full_frame():
+    """ROI preprocessing must give the same pixels as the full frame inside every space"""
+    img = synthetic_color_frame()
+    posList = synthetic_layout(40) + [(0, 0), (1173, 672), (5, 600)]
+
+    imgFull = preprocess_frame(img)
+    imgRoi = RoiPreprocessor(posList).process(img)
+
+    for x, y in posList:
+        window = (slice(y, y + SPACE_HEIGHT), slice(x, x + SPACE_WIDTH))
+        assert np.array_equal(imgFull[window], imgRoi[window]), (x, y)
+    print("✅ ROI preprocessing matches the full-frame chain")
+
+
+def test_motion_gate_flags_only_changed_spaces():
+    """Only spaces whose rectangle or filter halo changed are flagged, and slow drift adds up"""
+    posList = [(0, 0), (300, 300), (900, 500)]
+    gate = MotionGate(posList)
+    img = synthetic_color_frame()
+
+    assert gate.changed_spaces(img).all()  # First frame filters everything
+    assert not gate.changed_spaces(img).any()
+
+    imgMoved = img.copy()
+    imgMoved[310:320, 320:330] = 255 - imgMoved[310:320, 320:330]
+    assert gate.changed_spaces(imgMoved).tolist() == [False, True, False]
+
+    imgHalo = imgMoved.copy()   # Just outside the rectangle, inside the halo
+    imgHalo[500 - FILTER_HALO:490, 920:930] = 255 - imgHalo[500 - FILTER_HALO:490, 920:930]
+    assert gate.changed_spaces(imgHalo).tolist() == [False, False, True]
+
+    # Each step stays under the tolerance, but the reference only moves with real changes
+    imgDrift = imgHalo.astype(np.int16)
+    flagged = False
+    for _ in range(MOTION_TOLERANCE + 1):
+        imgDrift[0:SPACE_HEIGHT, 0:SPACE_WIDTH] += 1
+        flagged |= bool(gate.changed_spaces(np.clip(imgDrift, 0, 255).astype(np.uint8))[0])
+    assert flagged
+    print("✅ Motion gate flags only the spaces that changed")
+
+
+def test_gated_preprocessing_matches_full_frame():
+    """Filtering only the changed spaces gives the same pixels as the full chain inside every space"""
+    img = synthetic_color_frame()
+    posList = synthetic_layout(40) + [(0, 0), (1173, 672), (5, 600)]
+    gate = MotionGate(posList)
+    roi = RoiPreprocessor(posList)
+    imgFirst = roi.process(img, gate.changed_spaces(img))
+    first = imgFirst.copy()
+
+    imgNext = img.copy()
+    x, y = posList[3]
+    imgNext[y:y + SPACE_HEIGHT, x:x + SPACE_WIDTH] = synthetic_color_frame(seed=1)[y:y + SPACE_HEIGHT,
+                                                                                  x:x + SPACE_WIDTH]
+    dirty = gate.changed_spaces(imgNext)
+    assert dirty[3] and not dirty.all()
+    imgGated = roi.process(imgNext, dirty)
+
+    imgFull = preprocess_frame(imgNext)
+    for x, y in posList:
+        window = (slice(y, y + SPACE_HEIGHT), slice(x, x + SPACE_WIDTH))
+        assert np.array_equal(imgFull[window], imgGated[window]), (x, y)
+    assert np.array_equal(imgFirst, first)   # Earlier results are never modified
+    print("✅ Gated preprocessing matches the full-frame chain")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing detection helpers")
+    test_scorer_matches_per_space_count()
+    test_scorer_empty_layout()
+    test_roi_preprocessing_matches_full_frame()
+    test_motion_gate_flags_only_changed_spaces()
+    test_gated_preprocessing_matches_full_frame()
+    print("\n✨ Detection tests completed!")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the multi-camera detection supervisor
+Uses small local video files as stand-ins for cameras.
+"""
+
+import os
+import tempfile
+import time
+
+import cv2
+
+from benchmark import synthetic_color_frame, synthetic_layout
+from detection_supervisor import DetectionSupervisor
+
+
+def write_test_video(path, frames=10, shape=(240, 320)):
+    """Write a short MJPG video made of synthetic frames"""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 25, (shape[1], shape[0]))
+    for i in range(frames):
+        writer.write(synthetic_color_frame(shape, seed=i))
+    writer.release()
+
+
+def wait_for(condition, timeout=20.0):
+    """Poll `condition` until it is true or the timeout expires"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def test_supervisor_runs_and_restarts_feeds():
+    """Every feed reports counts, and a killed worker is restarted"""
+    with tempfile.TemporaryDirectory() as tmp:
+        video = os.path.join(tmp, 'feed.avi')
+        write_test_video(video)
+        layout = synthetic_layout(5, shape=(240, 320))
+
+        supervisor = DetectionSupervisor(
+            [('north', video, layout), ('south', video, layout[:3])],
+            restart_delay=0.1
+        ).start()
+        try:
+            assert wait_for(lambda: all(lot['counts'] is not None
+                                        for lot in supervisor.snapshot().values()))
+            lots = supervisor.snapshot()
+            assert len(lots['north']['counts']) == 5
+            assert len(lots['south']['counts']) == 3
+            print("✅ Both feeds reported space counts")
+
+            supervisor._processes['north'].terminate()
+            assert wait_for(lambda: supervisor.restarts['north'] == 1
+                            and supervisor.is_alive('north'))
+            print("✅ Dead worker was restarted")
+        finally:
+            supervisor.stop()
+
+
+def test_reserved_and_duplicate_lot_ids_are_rejected():
+    """A feed may not reuse the primary lot id or another feed's id"""
+    bad_feeds = (
+        [('main', 'a.avi', 'APos')],
+        [('north', 'a.avi', 'APos'), ('north', 'b.avi', 'BPos')],
+        [('b.avi', 'BPos'), ('lot-1', 'a.avi', 'APos')],   # Clashes with the generated id
+    )
+    for feeds in bad_feeds:
+        try:
+            DetectionSupervisor(feeds, reserved_lot_ids=('main',))
+            raise AssertionError(f'feeds accepted: {feeds}')
+        except ValueError:
+            pass
+    print("✅ Reserved and duplicate lot ids are rejected")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing detection supervisor")
+    test_supervisor_runs_and_restarts_feeds()
+    test_reserved_and_duplicate_lot_ids_are_rejected()
+    print("\n✨ Supervisor tests completed!")
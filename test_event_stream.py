@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the Server-Sent Events push channel
+"""
+
+import json
+import socket
+import threading
+import time
+
+from event_stream import EventStreamServer, EVENTS_PATH
+
+
+def connect(server, path=EVENTS_PATH):
+    """Open a raw connection and send an EventSource-style request"""
+    sock = socket.create_connection(server.address, timeout=5)
+    sock.sendall(f'GET {path} HTTP/1.1\r\nHost: localhost\r\nAccept: text/event-stream\r\n\r\n'.encode())
+    return sock
+
+
+def read_events(sock, count):
+    """Read until `count` SSE messages with data have arrived; return [(event, data)]"""
+    buffer = b''
+    events = []
+    while len(events) < count:
+        chunk = sock.recv(65536)
+        assert chunk, 'connection closed'
+        buffer += chunk
+        while b'\n\n' in buffer:
+            message, buffer = buffer.split(b'\n\n', 1)
+            fields = dict(line.split(': ', 1) for line in message.decode().split('\n')
+                          if ': ' in line and not line.startswith(':'))
+            if 'data' in fields:
+                events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+def wait_for(condition, timeout=5.0):
+    """Poll `condition` until it is true or the timeout expires"""
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+def test_snapshot_then_events():
+    """Subscribers get the full snapshot on connect, then only published events"""
+    state = {'spaces': [{'id': 1, 'status': 'available'}]}
+    server = EventStreamServer(('127.0.0.1', 0), lambda: state).start()
+    try:
+        sock = connect(server)
+        assert read_events(sock, 1) == [('snapshot', state)]
+        wait_for(lambda: server.subscribers == 1)
+
+        server.publish('spaces', {'spaces': [{'id': 1, 'status': 'occupied'}]})
+        assert read_events(sock, 1) == [('spaces', {'spaces': [{'id': 1, 'status': 'occupied'}]})]
+
+        sock.close()
+        wait_for(lambda: server.subscribers == 0)
+    finally:
+        server.stop()
+    print("✅ Snapshot on connect, then pushed events")
+
+
+def test_idle_subscribers_share_one_thread():
+    """Hundreds of subscribers are served without a thread each"""
+    server = EventStreamServer(('127.0.0.1', 0), lambda: {'spaces': []}).start()
+    socks = []
+    try:
+        threads_before = set(threading.enumerate())
+        for _ in range(200):
+            socks.append(connect(server))
+        wait_for(lambda: server.subscribers == 200)
+        assert not set(threading.enumerate()) - threads_before
+
+        server.publish('status', {'available_spaces': 3})
+        for sock in socks:
+            assert read_events(sock, 2)[1] == ('status', {'available_spaces': 3})
+    finally:
+        for sock in socks:
+            sock.close()
+        server.stop()
+    print("✅ 200 subscribers on one thread")
+
+
+def test_unknown_path_is_rejected():
+    """Requests for anything but the events path get a 404"""
+    server = EventStreamServer(('127.0.0.1', 0), lambda: {}).start()
+    try:
+        sock = connect(server, '/api/parking-spaces')
+        assert sock.recv(1024).startswith(b'HTTP/1.1 404')
+        assert server.subscribers == 0
+        sock.close()
+    finally:
+        server.stop()
+    print("✅ Unknown paths rejected")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing the event stream")
+    test_snapshot_then_events()
+    test_idle_subscribers_share_one_thread()
+    test_unknown_path_is_rejected()
+    print("\n✨ Event stream tests completed!")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the shared-memory frame buffer
+"""
+
+import multiprocessing
+import os
+
+import numpy as np
+
+from frame_shm import SharedFrameBuffer, frame_intact
+
+SHAPE = (72, 128, 3)
+N_SPACES = 5
+
+
+def segment_name(test):
+    """A segment name no other test run uses"""
+    return f'smartpark_test_{test}_{os.getpid()}'
+
+
+def frame(value):
+    """A solid frame plus statuses and counts derived from `value`"""
+    return (np.full(SHAPE, value, np.uint8), np.full(N_SPACES, value % 4, np.uint8),
+            np.arange(N_SPACES, dtype=np.int32) * value)
+
+
+def read_in_child(name, results):
+    """Child process: attach and report what the latest frame holds"""
+    buffer = SharedFrameBuffer.attach(name)
+    sequence, img, statuses, counts = buffer.read()
+    results.put((sequence, int(img[0, 0, 0]), statuses.tolist(), counts.tolist(), img.flags.owndata))
+
+
+def test_reader_process_sees_latest_frame():
+    """Another process reads the newest frame through views of the segment"""
+    name = segment_name('read')
+    writer = SharedFrameBuffer.create(name, SHAPE, N_SPACES)
+    try:
+        for sequence in (1, 2, 3):
+            writer.write(sequence, 1000.0 + sequence, *frame(sequence * 10))
+
+        results = multiprocessing.Queue()
+        child = multiprocessing.Process(target=read_in_child, args=(name, results))
+        child.start()
+        child.join()
+        sequence, pixel, statuses, counts, owndata = results.get()
+        assert (sequence, pixel) == (3, 30)
+        assert statuses == [2] * N_SPACES and counts == [0, 30, 60, 90, 120]
+        assert not owndata  # A view of shared memory, not a copy
+    finally:
+        writer.close()
+    print("✅ Reader process sees the latest frame without copying")
+
+
+def test_overwritten_frames_are_detected():
+    """A frame read from a slot the writer has since refilled is reported as torn"""
+    name = segment_name('seqlock')
+    writer = SharedFrameBuffer.create(name, SHAPE, N_SPACES)
+    reader = SharedFrameBuffer.attach(name)
+    try:
+        assert reader.read() is None
+        writer.write(1, 1000.0, *frame(1))
+        first = reader.read()
+        assert first[0] == 1 and frame_intact(first)
+
+        writer.write(2, 1001.0, *frame(2))   # Fills the other slot
+        assert frame_intact(first)
+        writer.write(3, 1002.0, *frame(3))   # Reuses the slot `first` points into
+        assert not frame_intact(first)
+        assert reader.read()[0] == 3
+        assert frame_intact((3, None, None, None))  # Frames not from shared memory are always intact
+    finally:
+        reader.close()
+        writer.close()
+    assert reader.retired or SharedFrameBuffer.attach(name) is None
+    print("✅ Overwritten frames are detected")
+
+
+def test_retired_segment_is_replaced():
+    """Readers notice when the writer replaces the segment for a new frame size"""
+    name = segment_name('retire')
+    writer = SharedFrameBuffer.create(name, SHAPE, N_SPACES)
+    reader = SharedFrameBuffer.attach(name)
+    try:
+        assert writer.fits(SHAPE, N_SPACES) and not writer.fits(SHAPE, N_SPACES + 1)
+        writer.close()
+        assert reader.retired
+        writer = SharedFrameBuffer.create(name, SHAPE, N_SPACES + 1)
+        writer.write(1, 1000.0, np.zeros(SHAPE, np.uint8), np.zeros(N_SPACES + 1, np.uint8),
+                     np.zeros(N_SPACES + 1, np.int32))
+        reader = SharedFrameBuffer.attach(name)
+        assert reader.n_spaces == N_SPACES + 1 and reader.read()[0] == 1
+    finally:
+        reader.close()
+        writer.close()
+    print("✅ Readers re-attach after the segment is replaced")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing the shared-memory frame buffer")
+    test_reader_process_sees_latest_frame()
+    test_overwritten_frames_are_detected()
+    test_retired_segment_is_replaced()
+    print("\n✨ Shared-memory frame tests completed!")
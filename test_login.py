@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Offline tests for login, registration and password reset (no running server needed)
+"""
+
+import hashlib
+
+import backend
+from password_hashing import HasherBusy
+
+
+def seed_legacy_user(username, password):
+    """Insert a user whose password is stored as an old unsalted SHA-256 hash"""
+    with backend.db_pool.transaction() as conn:
+        conn.execute('DELETE FROM users WHERE username = ?', (username,))
+        conn.execute('INSERT INTO users (username, email, password_hash, full_name) VALUES (?, ?, ?, ?)',
+                     (username, f'{username}@example.com', hashlib.sha256(password.encode()).hexdigest(),
+                      'Legacy User'))
+
+
+def stored_hash(username):
+    """The password hash currently stored for `username`"""
+    with backend.db_pool.connection() as conn:
+        return conn.execute('SELECT password_hash FROM users WHERE username = ?', (username,)).fetchone()[0]
+
+
+def remove_user(username):
+    """Delete a test user"""
+    with backend.db_pool.transaction() as conn:
+        conn.execute('DELETE FROM users WHERE username = ?', (username,))
+
+
+def test_login_upgrades_legacy_hash():
+    """A successful login rewrites a legacy SHA-256 hash as scrypt"""
+    client = backend.app.test_client()
+    seed_legacy_user('legacy_login', 'old-secret')
+    try:
+        assert client.post('/api/login', json={'username': 'legacy_login', 'password': 'wrong'}).status_code == 401
+        assert len(stored_hash('legacy_login')) == 64   # Only the right password upgrades it
+
+        response = client.post('/api/login', json={'username': 'legacy_login', 'password': 'old-secret'})
+        assert response.status_code == 200
+        assert stored_hash('legacy_login').startswith(f'scrypt${backend.PASSWORD_SCRYPT_N}$')
+        assert client.post('/api/login', json={'username': 'legacy_login',
+                                               'password': 'old-secret'}).status_code == 200
+    finally:
+        remove_user('legacy_login')
+    print("✅ Login upgrades legacy hashes to scrypt")
+
+
+def test_unknown_user_costs_a_full_hash():
+    """Unknown usernames do the same scrypt work as known ones, so timing does not reveal them"""
+    client = backend.app.test_client()
+    hashed = backend.password_hasher.hashed
+    assert client.post('/api/login', json={'username': 'admin', 'password': 'wrong'}).status_code == 401
+    assert backend.password_hasher.hashed == hashed + 1
+    assert client.post('/api/login', json={'username': 'nobody_here', 'password': 'wrong'}).status_code == 401
+    assert backend.password_hasher.hashed == hashed + 2
+    print("✅ Unknown users cost a full hash")
+
+
+def test_busy_hasher_returns_503():
+    """Registration and password reset answer 503, not 500, when the hashing queue is full"""
+    client = backend.app.test_client()
+    email = 'busy@example.com'
+    backend.otp_storage.set(email, {'otp': '123456', 'user_data': None, 'verified': True})
+    backend.password_reset_otp_storage.set(email, {'otp': '654321', 'expires_at': backend.time.time() + 60})
+
+    def busy(password):
+        raise HasherBusy('Too many password hashes in progress')
+
+    original = backend.password_hasher.hash
+    backend.password_hasher.hash = busy
+    try:
+        register = client.post('/api/register', json={'email': email, 'username': 'busy_user',
+                                                      'password': 'pw', 'full_name': 'Busy'})
+        assert register.status_code == 503
+        reset = client.post('/api/reset-password', json={'email': email, 'otp': '654321',
+                                                         'newPassword': 'pw'})
+        assert reset.status_code == 503
+    finally:
+        backend.password_hasher.hash = original
+        backend.otp_storage.pop(email)
+        backend.password_reset_otp_storage.pop(email)
+    print("✅ A busy hasher answers 503")
+
+
+def test_expired_reset_code_is_reported():
+    """An expired password reset code gets its own message"""
+    client = backend.app.test_client()
+    email = 'expired@example.com'
+    backend.password_reset_otp_storage.set(email, {'otp': '111111', 'expires_at': backend.time.time() - 1})
+    response = client.post('/api/verify-forgot-password-otp', json={'email': email, 'otp': '111111'})
+    assert response.status_code == 400 and response.get_json()['error'] == 'OTP has expired'
+    response = client.post('/api/verify-forgot-password-otp', json={'email': email, 'otp': '111111'})
+    assert response.get_json()['error'] == 'OTP not found or expired'
+    print("✅ Expired reset codes are reported as expired")
+
+
+def test_full_otp_store_refuses_new_codes():
+    """A full OTP store answers 503 for new addresses and keeps the codes already pending"""
+    client = backend.app.test_client()
+    backend.otp_storage.set('pending@example.com', {'otp': '222222', 'user_data': None})
+    maxsize = backend.otp_storage.maxsize
+    backend.otp_storage.maxsize = len(backend.otp_storage)
+    try:
+        response = client.post('/api/send-otp', json={'email': 'throwaway@example.com'})
+        assert response.status_code == 503
+        assert backend.otp_storage.get('pending@example.com')['otp'] == '222222'
+    finally:
+        backend.otp_storage.maxsize = maxsize
+        backend.otp_storage.pop('pending@example.com')
+    print("✅ A full OTP store refuses new codes")
+
+
+def test_flood_cannot_lock_out_other_clients():
+    """A client flooding throwaway addresses is rate limited long before it can fill the OTP store"""
+    client = backend.app.test_client()
+    attacker, user = {'REMOTE_ADDR': '203.0.113.9'}, {'REMOTE_ADDR': '198.51.100.7'}
+    flood = [f'throwaway{i}@example.com' for i in range(50)]
+    maxsize = backend.otp_storage.maxsize
+    backend.otp_storage.maxsize = len(backend.otp_storage) + 2 * backend.OTP_REQUESTS_PER_CLIENT
+    try:
+        statuses = [client.post('/api/send-otp', json={'email': email}, environ_base=attacker).status_code
+                    for email in flood]
+        assert statuses.count(200) == backend.OTP_REQUESTS_PER_CLIENT
+        assert statuses.count(429) == len(flood) - backend.OTP_REQUESTS_PER_CLIENT
+
+        response = client.post('/api/send-otp', json={'email': 'real.user@example.com'}, environ_base=user)
+        assert response.status_code == 200
+        assert backend.otp_storage.get('real.user@example.com') is not None
+    finally:
+        backend.otp_storage.maxsize = maxsize
+        for email in flood + ['real.user@example.com']:
+            backend.otp_storage.pop(email)
+        for address in (attacker, user):
+            backend.otp_request_counts.pop(address['REMOTE_ADDR'])
+    print("✅ A flood from one client does not lock out others")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing login and password endpoints")
+    test_login_upgrades_legacy_hash()
+    test_unknown_user_costs_a_full_hash()
+    test_busy_hasher_returns_503()
+    test_expired_reset_code_is_reported()
+    test_full_otp_store_refuses_new_codes()
+    test_flood_cannot_lock_out_other_clients()
+    print("\n✨ Login tests completed!")
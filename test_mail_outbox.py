@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the mail outbox against a local SMTP stand-in
+"""
+
+import socketserver
+import threading
+import time
+
+from mail_outbox import MailOutbox, MailTemplate
+
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    """Just enough SMTP to accept mail: records sessions and delivered messages"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, fail_first_sessions=0, reject=()):
+        super().__init__(('127.0.0.1', 0), FakeSMTPHandler)
+        self.sessions = 0
+        self.messages = []
+        self.fail_first_sessions = fail_first_sessions   # Sessions dropped right after the first MAIL
+        self.reject = set(reject)                        # Recipients answered with 550
+        self.delay = 0.0                                 # Seconds to stall each DATA reply
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+class FakeSMTPHandler(socketserver.StreamRequestHandler):
+    """One SMTP session"""
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        server.sessions += 1
+        drop = server.sessions <= server.fail_first_sessions
+        self.reply('220 fake ESMTP')
+        recipient = None
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply('250 fake')
+            elif command.startswith('MAIL'):
+                if drop:
+                    return  # Hang up mid-session
+                self.reply('250 OK')
+            elif command.startswith('RCPT'):
+                recipient = line.decode().strip()[8:].strip('<>')
+                self.reply('550 No such user' if recipient in server.reject else '250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                body = []
+                while True:
+                    data = self.rfile.readline()
+                    if data in (b'.\r\n', b''):
+                        break
+                    body.append(data.decode())
+                time.sleep(server.delay)
+                server.messages.append((recipient, ''.join(body)))
+                self.reply('250 Queued')
+            elif command in ('RSET', 'NOOP'):
+                self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Not implemented')
+
+
+def make_outbox(server, **kwargs):
+    """An outbox pointed at the stand-in without TLS or login"""
+    return MailOutbox('127.0.0.1', server.port, sender='smartpark@example.com', use_tls=False,
+                      retry_backoff=0.05, **kwargs)
+
+
+def test_messages_share_one_session():
+    """Queued messages go out over a single SMTP session with the rendered template"""
+    server = FakeSMTPServer()
+    outbox = make_outbox(server)
+    template = MailTemplate('Code', '<p>Your code: {{otp}}</p>', '{{otp}}')
+    for i in range(20):
+        assert outbox.send(f'user{i}@example.com', template.subject, template.render(f'{i:06d}'))
+    outbox.stop()
+
+    assert outbox.sent == 20 and outbox.failed == 0
+    assert server.sessions == 1 and outbox.connections == 1
+    assert server.messages[7][0] == 'user7@example.com'
+    assert 'Your code: 000007' in server.messages[7][1]
+    server.shutdown()
+    print("✅ Messages share one SMTP session")
+
+
+def test_send_returns_before_delivery():
+    """A slow mail server never holds up the caller"""
+    server = FakeSMTPServer()
+    server.delay = 0.2
+    outbox = make_outbox(server)
+    started = time.perf_counter()
+    for i in range(5):
+        outbox.send(f'user{i}@example.com', 'Code', '<p>123456</p>')
+    assert time.perf_counter() - started < 0.1
+    outbox.stop()
+    assert outbox.sent == 5
+    server.shutdown()
+    print("✅ Sending only queues the message")
+
+
+def test_retries_and_permanent_failures():
+    """Dropped sessions are retried on a new connection; 5xx rejections are not"""
+    server = FakeSMTPServer(fail_first_sessions=2, reject={'nobody@example.com'})
+    outbox = make_outbox(server)
+    outbox.send('user@example.com', 'Code', '<p>123456</p>')
+    outbox.send('nobody@example.com', 'Code', '<p>654321</p>')
+    outbox.stop()
+
+    assert outbox.sent == 1 and outbox.failed == 1
+    assert outbox.retries == 2                   # Two dropped sessions, the rejection is not retried
+    assert [to for to, _ in server.messages] == ['user@example.com']
+    server.shutdown()
+    print("✅ Transient errors are retried, rejections are not")
+
+
+def test_unsupported_starttls_is_not_retried():
+    """A server without STARTTLS fails the message at once instead of holding the sender in backoff"""
+    server = FakeSMTPServer()
+    outbox = MailOutbox('127.0.0.1', server.port, sender='smartpark@example.com', use_tls=True,
+                        retry_backoff=5.0)
+    outbox.send('user@example.com', 'Code', '<p>123456</p>')
+    started = time.monotonic()
+    outbox.stop()
+    assert time.monotonic() - started < 2.0
+    assert outbox.failed == 1 and outbox.retries == 0 and server.messages == []
+    server.shutdown()
+    print("✅ Unsupported STARTTLS is a permanent failure")
+
+
+def test_stop_wakes_an_idle_sender():
+    """stop() returns at once while the sender idles on an open session"""
+    server = FakeSMTPServer()
+    outbox = make_outbox(server, idle_timeout=30.0)
+    outbox.send('user@example.com', 'Code', '<p>123456</p>')
+    deadline = time.monotonic() + 5
+    while outbox.sent == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert outbox.sent == 1
+
+    started = time.monotonic()
+    outbox.stop()
+    assert time.monotonic() - started < 2.0 and not outbox._thread.is_alive()
+    server.shutdown()
+    print("✅ stop() wakes an idle sender")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing the mail outbox")
+    test_messages_share_one_session()
+    test_send_returns_before_delivery()
+    test_retries_and_permanent_failures()
+    test_unsupported_starttls_is_not_retried()
+    test_stop_wakes_an_idle_sender()
+    print("\n✨ Mail outbox tests completed!")
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the metrics registry and its text exposition output
+"""
+
+from metrics import MetricsRegistry
+
+
+def rendered_lines(registry):
+    """The rendered scrape as a list of lines"""
+    text = registry.render()
+    assert text.endswith('\n')
+    return text.splitlines()
+
+
+def test_histogram_buckets_sum_and_count():
+    """Observations land in cumulative le buckets, with matching _sum and _count"""
+    registry = MetricsRegistry()
+    latency = registry.histogram('test_stage_seconds', 'Stage latency', ['stage'], buckets=(1.0, 0.5))
+    for value in (0.25, 0.5, 0.75, 2.0):
+        latency.observe(value, 'scoring')
+    with latency.time('encode'):
+        pass
+
+    lines = rendered_lines(registry)
+    assert lines[:2] == ['# HELP test_stage_seconds Stage latency', '# TYPE test_stage_seconds histogram']
+    assert 'test_stage_seconds_bucket{stage="scoring",le="0.5"} 2' in lines   # le is inclusive
+    assert 'test_stage_seconds_bucket{stage="scoring",le="1"} 3' in lines
+    assert 'test_stage_seconds_bucket{stage="scoring",le="+Inf"} 4' in lines
+    assert 'test_stage_seconds_sum{stage="scoring"} 3.5' in lines
+    assert 'test_stage_seconds_count{stage="scoring"} 4' in lines
+    assert 'test_stage_seconds_count{stage="encode"} 1' in lines
+    print("✅ Histogram buckets, sum and count rendered")
+
+
+def test_counters_gauges_and_label_escaping():
+    """Counters and gauges render one line per series, with label values escaped"""
+    registry = MetricsRegistry()
+    requests = registry.counter('test_requests_total', 'Requests served', ['endpoint', 'status'])
+    viewers = registry.gauge('test_viewers', 'Connected viewers')
+    requests.inc('/api/a"b\\c\nd', '200')
+    requests.inc('/api/a"b\\c\nd', '200', amount=2)
+    registry.add_collector(lambda: viewers.set(7))
+
+    lines = rendered_lines(registry)
+    assert '# TYPE test_requests_total counter' in lines
+    assert 'test_requests_total{endpoint="/api/a\\"b\\\\c\\nd",status="200"} 3' in lines
+    assert '# TYPE test_viewers gauge' in lines
+    assert 'test_viewers 7' in lines   # Refreshed by the collector right before the scrape
+    print("✅ Counters, gauges and escaped labels rendered")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing metrics")
+    test_histogram_buckets_sum_and_count()
+    test_counters_gauges_and_label_escaping()
+    print("\n✨ Metrics tests completed!")
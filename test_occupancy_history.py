@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the in-memory occupancy history
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+import backend
+from occupancy_store import OccupancyStore
+from occupancy_history import OccupancyHistory, RESOLUTIONS
+
+START = 472222 * 3600  # On the hour, so buckets line up with the timestamps below
+
+
+def status_for(occupied):
+    """Aggregate fields for a frame with the given occupied mask"""
+    count = int(np.count_nonzero(occupied))
+    return {
+        'available_spaces': len(occupied) - count,
+        'occupied_spaces': count,
+        'reserved_spaces': 0,
+        'utilization_rate': count / len(occupied) * 100
+    }
+
+
+def feed(history, seconds, fps=2):
+    """Record `seconds` of frames where space 1 is occupied during the first quarter of every minute"""
+    for frame in range(seconds * fps):
+        timestamp = START + frame / fps
+        occupied = np.zeros(history.n_spaces, bool)
+        occupied[0] = timestamp % 60 < 15
+        history.record(timestamp, status_for(occupied), occupied)
+
+
+def test_downsampling():
+    """Coarser resolutions average the finer buckets that closed inside them"""
+    history = OccupancyHistory(4)
+    feed(history, 3 * 60 + 2)  # A minute closes once a second after it has closed
+
+    seconds = history.query('1s', START, START + 59, space_ids=[1, 2])
+    assert len(seconds['points']) == 60
+    assert seconds['spaces'][1] == [100] * 15 + [0] * 45
+    assert seconds['spaces'][2] == [0] * 60
+
+    minutes = history.query('1m', START, START + 3 * 60)
+    assert [point['timestamp'] for point in minutes['points']] == [START, START + 60, START + 120]
+    assert all(point['occupied_spaces'] == 0.25 for point in minutes['points'])
+    assert minutes['points'][0]['utilization_rate'] == 6.25
+    print("✅ 1s buckets fold into 1m buckets")
+
+
+def test_memory_stays_bounded():
+    """Only the newest `capacity` buckets are kept at each resolution"""
+    history = OccupancyHistory(2)
+    size = history.nbytes()
+    capacity = RESOLUTIONS['1s'][1]
+    feed(history, capacity + 600, fps=1)
+
+    assert history.nbytes() == size
+    last_closed = START + capacity + 600 - 2  # The final second is still open
+    seconds = history.query('1s', START, last_closed)
+    assert len(seconds['points']) == capacity
+    assert seconds['points'][0]['timestamp'] == last_closed - capacity + 1
+    print("✅ Ring buffers stay bounded")
+
+
+def test_out_of_range_times_are_rejected():
+    """nan, inf, negative or absurdly large start/end answer 400 instead of reaching the history queries"""
+    client = backend.app.test_client()
+    bad_queries = ('start=nan', 'end=inf', 'start=-inf&end=10', 'end=nan&points=5',
+                   'start=1e300&end=1e300', 'start=-5&end=10', 'end=1e20')
+    for query in bad_queries:
+        assert client.get(f'/api/occupancy-history?{query}').status_code == 400
+    assert client.get('/api/occupancy-history?start=0&end=60').status_code == 200
+
+    store = backend.occupancy_store
+    with tempfile.TemporaryDirectory() as tmp:
+        backend.occupancy_store = OccupancyStore(os.path.join(tmp, 'history.db'))  # Writer not started
+        try:
+            for query in ('start=nan', 'end=inf', 'start=-inf&events=1', 'start=1e300&end=1e300'):
+                assert client.get(f'/api/occupancy-trends?{query}').status_code == 400
+            assert client.get('/api/occupancy-trends?start=0&end=60').status_code == 200
+        finally:
+            backend.occupancy_store = store
+    print("✅ Out-of-range times are rejected")
+
+
+def test_end_zero_is_not_now():
+    """end=0 is a timestamp like any other, not a missing argument"""
+    client = backend.app.test_client()
+    history = backend.occupancy_history
+    backend.occupancy_history = OccupancyHistory(4)
+    try:
+        now = backend.time.time()
+        for offset in range(-5, 1):
+            backend.occupancy_history.record(now + offset, status_for(np.ones(4, bool)), np.ones(4, bool))
+        assert client.get('/api/occupancy-history?resolution=1s').get_json()['points']
+        assert client.get('/api/occupancy-history?resolution=1s&end=0').get_json()['points'] == []
+    finally:
+        backend.occupancy_history = history
+    print("✅ end=0 is not read as now")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing occupancy history")
+    test_downsampling()
+    test_memory_stays_bounded()
+    test_out_of_range_times_are_rejected()
+    test_end_zero_is_not_now()
+    print("\n✨ Occupancy history tests completed!")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the SQLite occupancy store
+"""
+
+import os
+import sqlite3
+import tempfile
+import time
+
+from occupancy_store import OccupancyStore
+
+
+def sample(occupied, total=10):
+    """Status totals with `occupied` spaces taken"""
+    return {
+        'available_spaces': total - occupied,
+        'occupied_spaces': occupied,
+        'reserved_spaces': 0,
+        'utilization_rate': occupied / total * 100
+    }
+
+
+def test_batched_writes_and_rollups():
+    """Samples and events are written in batches and rolled up per minute and hour"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'history.db')
+        store = OccupancyStore(path, batch_size=50, flush_interval=0.2).start()
+        start = 7200 * 240000  # Start of an hour
+
+        # Two minutes of one sample per second: 2 then 6 spaces occupied
+        for second in range(120):
+            store.record_sample(start + second, sample(2 if second < 60 else 6))
+        store.record_status_changes(start + 61, [(1, 'occupied'), (2, 'occupied')])
+        store.stop()
+
+        assert store.written == 122 and store.dropped == 0
+        assert store.batches >= 3  # 122 rows never go out in a single transaction
+
+        minutes = store.query_rollup('minute', start, start + 119)
+        assert [point['utilization_rate'] for point in minutes] == [20.0, 60.0]
+        assert [point['status_changes'] for point in minutes] == [0, 2]
+        hours = store.query_rollup('hour', start, start + 3599)
+        assert hours[0]['samples'] == 120 and hours[0]['utilization_rate'] == 40.0
+        assert hours[0]['peak_utilization_rate'] == 60.0
+        assert len(store.query_events(start, start + 120, space_id=2)) == 1
+
+        conn = sqlite3.connect(path)
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        conn.close()
+    print("✅ Batched writes with minute and hour rollups")
+
+
+def test_full_queue_never_blocks():
+    """When the writer is behind, new rows are dropped instead of blocking the caller"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = OccupancyStore(os.path.join(tmp, 'history.db'), queue_size=10)  # Writer not started
+        started = time.perf_counter()
+        for second in range(100):
+            store.record_sample(second, sample(1))
+        assert time.perf_counter() - started < 0.5
+        assert store.dropped == 90
+    print("✅ Full queue drops rows instead of blocking")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing the occupancy store")
+    test_batched_writes_and_rollups()
+    test_full_queue_never_blocks()
+    print("\n✨ Occupancy store tests completed!")
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the parking space endpoints
+"""
+
+import numpy as np
+
+import backend
+from benchmark import synthetic_color_frame, synthetic_layout
+from detection import SpaceScorer, preprocess_frame, SPACE_WIDTH, SPACE_HEIGHT
+
+
+def occupy(imgPro, space_id):
+    """Fill one space of a binary frame"""
+    x, y = backend.posList[space_id - 1]
+    imgPro[y:y + SPACE_HEIGHT, x:x + SPACE_WIDTH] = 255
+
+
+def test_delta_since_version():
+    """?since=<version> returns only the spaces that changed after that version"""
+    backend.set_parking_positions(synthetic_layout(20))
+    client = backend.app.test_client()
+    imgPro = np.zeros((720, 1280), np.uint8)
+    backend.check_parking_space(imgPro)
+
+    full = client.get('/api/parking-spaces').get_json()
+    assert full['full'] and len(full['spaces']) == 20
+    version = full['version']
+
+    unchanged = client.get(f'/api/parking-spaces?since={version}').get_json()
+    assert not unchanged['full'] and unchanged['spaces'] == []
+
+    occupy(imgPro, 4)
+    backend.check_parking_space(imgPro)
+    delta = client.get(f'/api/parking-spaces?since={version}').get_json()
+    assert not delta['full']
+    assert [space['id'] for space in delta['spaces']] == [4]
+    assert delta['spaces'][0]['status'] == 'occupied'
+    assert delta['version'] == backend.space_version_token(backend.parse_space_version(version) + 1)
+    print("✅ Delta since a version")
+
+
+def test_old_version_gets_full_snapshot():
+    """Versions from before a layout change, outside the change log or ahead of the server get a full snapshot"""
+    backend.set_parking_positions(synthetic_layout(5))
+    client = backend.app.test_client()
+    imgPro = np.zeros((720, 1280), np.uint8)
+    backend.check_parking_space(imgPro)
+
+    stale = client.get('/api/parking-spaces?since=0').get_json()
+    assert stale['full'] and len(stale['spaces']) == 5
+
+    # A client ahead of the server starts over too, as do malformed tokens
+    ahead = backend.space_version_token(backend.parse_space_version(stale['version']) + 100)
+    for since in (ahead, 'garbage', backend.SPACE_VERSION_EPOCH + ':'):
+        response = client.get(f'/api/parking-spaces?since={since}').get_json()
+        assert response['full'] and len(response['spaces']) == 5
+
+    version = stale['version']
+    for step in range(backend.SPACE_CHANGE_LOG_SIZE + 1):
+        imgPro[:] = 255 if step % 2 == 0 else 0
+        backend.check_parking_space(imgPro)
+    assert client.get(f'/api/parking-spaces?since={version}').get_json()['full']
+    assert len(backend.space_change_log) == backend.SPACE_CHANGE_LOG_SIZE
+    print("✅ Full snapshot for versions that are too old")
+
+
+def test_version_from_before_a_restart_gets_full_snapshot():
+    """A version the previous process handed out is never answered with a delta"""
+    backend.set_parking_positions(synthetic_layout(5))
+    client = backend.app.test_client()
+    imgPro = np.zeros((720, 1280), np.uint8)
+    backend.check_parking_space(imgPro)
+    version = client.get('/api/parking-spaces').get_json()['version']
+
+    # The previous process had handed out the same counter value under its own epoch
+    epoch = backend.SPACE_VERSION_EPOCH
+    old_version = f'{int(epoch, 16) - 1:x}:{version.partition(":")[2]}'
+    occupy(imgPro, 3)
+    backend.check_parking_space(imgPro)
+
+    assert not client.get(f'/api/parking-spaces?since={version}').get_json()['full']
+    restarted = client.get(f'/api/parking-spaces?since={old_version}').get_json()
+    assert restarted['full'] and len(restarted['spaces']) == 5
+    assert restarted['version'].startswith(epoch + ':')
+    print("✅ Versions from a previous process get a full snapshot")
+
+
+def test_snapshot_published_once_per_change():
+    """Endpoints serve the detector's pre-encoded snapshot, rebuilt only when something changes"""
+    backend.set_parking_positions(synthetic_layout(8))
+    client = backend.app.test_client()
+    imgPro = np.zeros((720, 1280), np.uint8)
+    backend.check_parking_space(imgPro)
+    snapshot = backend.status_snapshot
+
+    backend.check_parking_space(imgPro)
+    assert backend.status_snapshot is snapshot
+    assert client.get('/api/parking-spaces').data == snapshot.spaces_json
+    assert client.get('/api/parking-status').data == snapshot.status_json
+
+    occupy(imgPro, 2)
+    backend.check_parking_space(imgPro)
+    assert backend.status_snapshot is not snapshot
+    assert backend.status_snapshot.status['occupied_spaces'] == 1
+    assert snapshot.status['occupied_spaces'] == 0
+
+    try:
+        snapshot.spaces = []
+        raise AssertionError('snapshot was modified')
+    except AttributeError:
+        pass
+    print("✅ Pre-encoded snapshot published once per change")
+
+
+def test_space_state_updated_in_place():
+    """Per-space state lives in arrays allocated once per layout"""
+    backend.set_parking_positions(synthetic_layout(12))
+    state = backend.space_state
+    count_array, status_array = state.count, state.status
+    imgPro = np.zeros((720, 1280), np.uint8)
+
+    for space_id in (1, 5, 9):
+        occupy(imgPro, space_id)
+        assert backend.check_parking_space(imgPro) is state
+    assert state.count is count_array and state.status is status_array
+    assert [space['id'] for space in state.to_dicts() if space['status'] == 'occupied'] == [1, 5, 9]
+    assert backend.status_snapshot.status['occupied_spaces'] == 3
+    print("✅ Space state updated in place")
+
+
+def test_motion_gating_skips_unchanged_spaces():
+    """Frames where nothing moved skip every space, and a changed space gets the full-frame count"""
+    backend.set_parking_positions([(0, 0), (300, 300), (900, 500)])
+    img = synthetic_color_frame()
+    backend.process_frame(img)
+    assert backend.detection_stats['spaces_rescored'] == 3   # First frame: everything
+
+    skipped = backend.detection_stats['total_spaces_skipped']
+    backend.process_frame(img.copy())
+    assert backend.detection_stats['spaces_skipped'] == 3
+    assert backend.detection_stats['total_spaces_skipped'] == skipped + 3
+
+    imgMoved = img.copy()
+    imgMoved[300:300 + SPACE_HEIGHT, 300:300 + SPACE_WIDTH] = synthetic_color_frame(seed=7)[300:348, 300:407]
+    _, _, counts = backend.process_frame(imgMoved)
+    assert backend.detection_stats['spaces_rescored'] == 1
+    assert np.array_equal(counts, SpaceScorer(backend.posList).counts(preprocess_frame(imgMoved)))
+    print("✅ Motion gating skips unchanged spaces")
+
+
+def test_endpoints_after_main_block_startup():
+    """`python backend.py` binds the loaded space count to a module global; the endpoints still work"""
+    backend.total_spaces = backend.set_parking_positions(synthetic_layout(6))  # As the __main__ block does
+    client = backend.app.test_client()
+    imgPro = np.zeros((720, 1280), np.uint8)
+    backend.check_parking_space(imgPro)
+    backend.publish_frame(1, backend.time.time(), (np.zeros((720, 1280, 3), np.uint8),
+                                                   np.zeros(6, np.uint8), np.zeros(6, np.int32)))
+
+    version = client.get('/api/parking-spaces').get_json()['version']
+    delta = client.get(f'/api/parking-spaces?since={version}').get_json()
+    assert delta['total_spaces'] == 6
+    assert client.get('/api/parking-spaces/6/snapshot').status_code == 200
+    assert client.get('/api/parking-spaces/snapshots?ids=1,6').status_code == 200
+    assert client.post('/api/reservations', json={'space_id': 7, 'user_name': 'Ann'}).status_code == 400
+    assert client.post('/api/reservations', json={'space_id': 6, 'user_name': 'Ann'}).status_code == 201
+    assert client.delete('/api/reservations/6').status_code == 200
+    print("✅ Endpoints work after the main block's startup")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing parking space endpoints")
+    test_delta_since_version()
+    test_old_version_gets_full_snapshot()
+    test_version_from_before_a_restart_gets_full_snapshot()
+    test_snapshot_published_once_per_change()
+    test_space_state_updated_in_place()
+    test_motion_gating_skips_unchanged_spaces()
+    test_endpoints_after_main_block_startup()
+    print("\n✨ Parking space endpoint tests completed!")
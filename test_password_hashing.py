@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Offline tests for scrypt password hashing on the worker pool
+"""
+
+import hashlib
+import threading
+import time
+
+from password_hashing import PasswordHasher, HasherBusy, is_legacy_hash
+
+LOW_COST = 2 ** 10   # Keep tests fast
+
+
+def test_hash_and_verify():
+    """Hashes are salted and verify only the right password"""
+    hasher = PasswordHasher(n=LOW_COST, workers=2)
+    first, second = hasher.hash('secret'), hasher.hash('secret')
+    assert first != second and first.startswith(f'scrypt${LOW_COST}$8$1$')
+    assert hasher.verify('secret', first) == (True, False)
+    assert hasher.verify('wrong', first) == (False, False)
+    assert hasher.verify('secret', 'garbage') == (False, False)
+    hasher.shutdown()
+    print("✅ Salted scrypt hashes verify")
+
+
+def test_legacy_and_low_cost_hashes_need_rehash():
+    """Old SHA-256 hashes and hashes made at another cost are flagged for upgrade"""
+    hasher = PasswordHasher(n=LOW_COST)
+    legacy = hashlib.sha256(b'admin123').hexdigest()
+    assert is_legacy_hash(legacy)
+    assert hasher.verify('admin123', legacy) == (True, True)
+    assert hasher.verify('nope', legacy) == (False, True)
+
+    stronger = PasswordHasher(n=LOW_COST * 2)
+    assert stronger.verify('secret', hasher.hash('secret')) == (True, True)
+    hasher.shutdown()
+    stronger.shutdown()
+    print("✅ Legacy and low-cost hashes are flagged for upgrade")
+
+
+def test_full_queue_fails_fast():
+    """Callers beyond max_pending get HasherBusy instead of waiting indefinitely"""
+    hasher = PasswordHasher(n=2 ** 15, workers=1, max_pending=1, queue_timeout=0.01)
+    worker = threading.Thread(target=hasher.hash, args=('secret',))
+    worker.start()
+    while hasher.hashed == 0:   # Counted once the hash holds the only slot
+        time.sleep(0.001)
+    try:
+        hasher.hash('other')
+        busy = False
+    except HasherBusy:
+        busy = True
+    worker.join()
+    assert busy and hasher.rejected == 1
+    hasher.shutdown()
+    print("✅ A full queue fails fast")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing password hashing")
+    test_hash_and_verify()
+    test_legacy_and_low_cost_hashes_need_rehash()
+    test_full_queue_fails_fast()
+    print("\n✨ Password hashing tests completed!")
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the capture -> process -> publish frame pipeline
+"""
+
+import os
+import tempfile
+import time
+
+from pipeline import FramePipeline, DROP_OLDEST, BLOCK
+from test_detection_supervisor import write_test_video, wait_for
+
+
+def run_pipeline(video, drop_policy, process_delay, frames=20):
+    """Run a pipeline with a deliberately slow process stage until `frames` are published"""
+    published = []
+
+    def process(img):
+        time.sleep(process_delay)
+        return img
+
+    pipeline = FramePipeline(video, process, lambda seq, at, img: published.append(seq),
+                             queue_size=2, drop_policy=drop_policy, pace_to_source=False).start()
+    try:
+        assert wait_for(lambda: len(published) >= frames)
+    finally:
+        pipeline.stop()
+    return pipeline, published
+
+
+def test_slow_stage_drops_stale_frames():
+    """With DROP_OLDEST a slow process stage skips frames instead of building a backlog"""
+    with tempfile.TemporaryDirectory() as tmp:
+        video = os.path.join(tmp, 'feed.avi')
+        write_test_video(video, frames=30)
+        pipeline, published = run_pipeline(video, DROP_OLDEST, process_delay=0.01)
+
+    stats = pipeline.snapshot()['stages']
+    assert stats['process']['dropped'] > 0
+    assert stats['process']['queue_depth'] <= stats['process']['queue_size']
+    assert published == sorted(published)
+    print(f"✅ Dropped {stats['process']['dropped']} stale frames, published in order")
+
+
+def test_block_policy_keeps_every_frame():
+    """With BLOCK the decoder waits, so no frame is dropped"""
+    with tempfile.TemporaryDirectory() as tmp:
+        video = os.path.join(tmp, 'feed.avi')
+        write_test_video(video, frames=30)
+        pipeline, published = run_pipeline(video, BLOCK, process_delay=0.005)
+
+    assert pipeline.snapshot()['stages']['process']['dropped'] == 0
+    assert published[:20] == list(range(1, 21))
+    print("✅ Blocking policy processed every frame")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing frame pipeline")
+    test_slow_stage_drops_stale_frames()
+    test_block_policy_keeps_every_frame()
+    print("\n✨ Pipeline tests completed!")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the in-process and SQLite shared state stores
+"""
+
+import multiprocessing
+import os
+import tempfile
+
+from state_store import MemoryStateStore, SQLiteStateStore
+from status_snapshot import StatusSnapshot, encode_json
+
+
+def stores(tmp):
+    """One store of each kind"""
+    return [MemoryStateStore(), SQLiteStateStore(os.path.join(tmp, 'state.db'))]
+
+
+def test_namespaces_behave_alike():
+    """Both backends store, expire, add-if-absent, replace, count and pop the same way"""
+    with tempfile.TemporaryDirectory() as tmp:
+        for store in stores(tmp):
+            otps = store.namespace('otp', ttl=600, maxsize=2)
+            reservations = store.namespace('reservations')
+
+            otps.set('a@example.com', {'otp': '123456'})
+            assert otps.get('a@example.com') == {'otp': '123456'}
+            assert otps.get('b@example.com') is None
+            assert otps.hits == 1 and otps.misses == 1
+            otps.set('b@example.com', {'otp': '1'})
+            assert otps.set('c@example.com', {'otp': '2'}) is None   # Full: new keys are refused
+            assert len(otps) == 2 and otps.rejected == 1 and 'c@example.com' not in otps
+
+            expires_at = otps.expires_at('b@example.com')
+            assert otps.replace('b@example.com', {'otp': '1', 'verified': True})
+            assert otps.get('b@example.com') == {'otp': '1', 'verified': True}
+            assert otps.expires_at('b@example.com') == expires_at   # Replacing keeps the expiry
+            assert not otps.replace('c@example.com', {'otp': '0'})
+            otps.pop('a@example.com')
+
+            otps.set('short@example.com', {'otp': '3'}, ttl=-1)   # Already expired
+            assert otps.expires_at('short@example.com') is None
+            assert not otps.replace('short@example.com', {'otp': '4'})
+            assert otps.get('short@example.com') is None
+
+            requests = store.namespace('otp_requests', ttl=600, maxsize=1)
+            assert [requests.increment('10.0.0.1') for _ in range(3)] == [1, 2, 3]
+            assert requests.increment('10.0.0.2') is None   # Full: new counters are refused
+            assert requests.get('10.0.0.1') == 3
+
+            version = reservations.version
+            assert reservations.add(7, {'user_name': 'Ann'})
+            assert not reservations.add(7, {'user_name': 'Bob'})
+            assert reservations.items() == {7: {'user_name': 'Ann'}}
+            assert reservations.version != version
+            assert reservations.pop(7) == {'user_name': 'Ann'} and reservations.pop(7) is None
+            assert len(reservations) == 0
+            print(f"✅ {type(store).__name__} namespaces behave alike")
+
+
+def reserve(path, space_id, results):
+    """Child process: try to reserve one space"""
+    store = SQLiteStateStore(path)
+    results.put(store.namespace('reservations').add(space_id, {'pid': os.getpid()}))
+
+
+def test_sqlite_is_shared_between_processes():
+    """Only one of several processes racing for a space gets it, and everyone sees it"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'state.db')
+        store = SQLiteStateStore(path)
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=reserve, args=(path, 3, results)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        assert sorted(results.get() for _ in workers) == [False, False, False, True]
+        assert list(store.namespace('reservations').items()) == [3]
+    print("✅ SQLite state is shared between processes")
+
+
+def test_published_snapshot_round_trip():
+    """A worker rebuilds the detector's snapshot once per published version"""
+    with tempfile.TemporaryDirectory() as tmp:
+        publisher = SQLiteStateStore(os.path.join(tmp, 'state.db'))
+        reader = SQLiteStateStore(os.path.join(tmp, 'state.db'))
+        status = {'total_spaces': 2, 'available_spaces': 1, 'occupied_spaces': 1,
+                  'reserved_spaces': 0, 'utilization_rate': 50.0}
+        spaces = [{'id': 1, 'status': 'available'}, {'id': 2, 'status': 'occupied'}]
+        publisher.publish_snapshot('a1:5', 1000.0, encode_json(status),
+                                   encode_json({'spaces': spaces, 'version': 'a1:5', 'full': True}))
+
+        snapshot = StatusSnapshot.from_json(*reader.load_snapshot('a1:0', 0.0))
+        assert snapshot.version == 'a1:5' and snapshot.status == status
+        assert snapshot.space_dicts([1]) == [spaces[1]]
+        assert reader.load_snapshot(snapshot.version, snapshot.timestamp) is None
+    print("✅ Published snapshots round-trip")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing the shared state stores")
+    test_namespaces_behave_alike()
+    test_sqlite_is_shared_between_processes()
+    test_published_snapshot_round_trip()
+    print("\n✨ Shared state tests completed!")
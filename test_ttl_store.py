@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the TTL store used for OTPs
+"""
+
+from ttl_store import TTLStore
+
+
+class FakeClock:
+    """A clock the test moves by hand"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire():
+    """Expired entries are never returned and are purged by later writes"""
+    clock = FakeClock()
+    store = TTLStore(ttl=600, clock=clock)
+    store.set('a@example.com', {'otp': '123456'})
+    assert store.get('a@example.com')['otp'] == '123456'
+    assert store.expires_at('a@example.com') == 1600.0
+
+    clock.now += 601
+    assert store.expires_at('a@example.com') is None   # Expired entries have no expiry to report
+    assert store.get('a@example.com') is None
+    assert store.hits == 1 and store.misses == 1 and store.expired == 1
+
+    # Abandoned codes are removed by the next write, without anyone reading them
+    for i in range(100):
+        store.set(f'user{i}@example.com', {'otp': '000000'})
+    clock.now += 601
+    store.set('late@example.com', {'otp': '111111'})
+    assert len(store) == 1 and store.expired == 101
+    print("✅ Entries expire and are purged on write")
+
+
+def test_reset_restarts_ttl():
+    """Setting a key again restarts its TTL; the stale expiry row is ignored"""
+    clock = FakeClock()
+    store = TTLStore(ttl=600, clock=clock)
+    store.set('a@example.com', {'otp': '1'})
+    clock.now += 500
+    store.set('a@example.com', {'otp': '2'})
+    clock.now += 200
+    store.purge()
+    assert store.get('a@example.com')['otp'] == '2'
+    assert store.expired == 0
+    print("✅ Re-setting a key restarts its TTL")
+
+
+def test_size_is_capped():
+    """A full store refuses new keys instead of pushing out the ones it holds"""
+    clock = FakeClock()
+    store = TTLStore(ttl=600, maxsize=3, clock=clock)
+    for i in range(5):
+        expires_at = store.set(i, {'otp': str(i)})
+        assert (expires_at is None) == (i >= 3)
+        clock.now += 1
+    assert len(store) == 3 and store.rejected == 2
+    assert store.get(0)['otp'] == '0' and store.get(4) is None
+    assert not store.add(5, {'otp': '5'})
+    assert store.set(2, {'otp': 'again'}) is not None   # Existing keys can still be replaced
+
+    # Room again once entries expire
+    clock.now += 600
+    assert store.set(4, {'otp': '4'}) is not None
+
+    # Churning one key keeps the heap bounded
+    for _ in range(1000):
+        store.set(4, {'otp': '4'})
+    assert len(store._heap) <= 2 * len(store) + 64
+    print("✅ Size and heap stay bounded")
+
+
+def test_increment_counts_in_a_fixed_window():
+    """Counters start at 1 and keep the expiry of their first increment"""
+    clock = FakeClock()
+    store = TTLStore(ttl=10, maxsize=1, clock=clock)
+    assert store.increment('10.0.0.1') == 1
+    clock.now += 6
+    assert store.increment('10.0.0.1') == 2
+    assert store.increment('10.0.0.2') is None   # Full
+    clock.now += 6
+    assert store.increment('10.0.0.1') == 1      # The first window ended
+    print("✅ Counters cover a fixed window")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing the TTL store")
+    test_entries_expire()
+    test_reset_restarts_ttl()
+    test_size_is_capped()
+    test_increment_counts_in_a_fixed_window()
+    print("\n✨ TTL store tests completed!")
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the frame endpoints (no video or running server needed)
+"""
+
+import os
+
+import cv2
+import numpy as np
+
+import backend
+from benchmark import synthetic_color_frame, synthetic_layout
+from frame_shm import SharedFrameBuffer, frame_intact
+
+
+def publish_test_frame(sequence, seed=0):
+    """Publish a synthetic frame as if it came out of the pipeline"""
+    n = len(backend.posList)
+    result = (synthetic_color_frame(seed=seed), np.zeros(n, np.uint8), np.zeros(n, np.int32))
+    backend.publish_frame(sequence, backend.time.time(), result)
+
+
+def test_video_frame_etag():
+    """A client that already has the latest frame gets a 304 and nothing is re-encoded"""
+    backend.set_parking_positions(synthetic_layout(10))
+    client = backend.app.test_client()
+    publish_test_frame(1)
+
+    first = client.get('/api/video-frame')
+    assert first.status_code == 200
+    assert first.get_json()['sequence'] == 1
+    etag = first.headers['ETag']
+
+    encodes = []
+    original = backend.encode_frame
+    backend.encode_frame = lambda *args: encodes.append(args) or original(*args)
+    try:
+        cached = client.get('/api/video-frame', headers={'If-None-Match': etag})
+        assert cached.status_code == 304 and not cached.data
+        assert not encodes
+    finally:
+        backend.encode_frame = original
+
+    publish_test_frame(2, seed=1)
+    fresh = client.get('/api/video-frame', headers={'If-None-Match': etag})
+    assert fresh.status_code == 200
+    assert fresh.get_json()['sequence'] == 2
+    assert fresh.headers['ETag'] != etag
+    assert fresh.get_json()['frame'] != first.get_json()['frame']
+    print("✅ ETag / 304 on /api/video-frame")
+
+
+def test_tiers_encoded_once_per_frame():
+    """Each preview tier is scaled to its width and encoded at most once per frame"""
+    backend.set_parking_positions(synthetic_layout(10))
+    publish_test_frame(3)
+
+    for tier, (max_width, _) in backend.FRAME_TIERS.items():
+        jpeg = backend.get_frame_jpeg(tier)
+        assert backend.get_frame_jpeg(tier) is jpeg
+        decoded = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+        assert decoded.shape[1] == (max_width or 1280), tier
+
+    thumb = backend.get_frame_jpeg('thumb')
+    assert len(thumb) < len(backend.get_frame_jpeg('full'))
+
+    publish_test_frame(4, seed=1)
+    encodes = []
+    original = backend.encode_frame
+    backend.encode_frame = lambda *args: encodes.append(args[1]) or original(*args)
+    try:
+        fresh = backend.get_frame_jpeg('thumb')
+        assert fresh != thumb
+        assert backend.get_frame_jpeg('thumb') is fresh
+        assert encodes == ['thumb']   # Re-encoded once for the new frame, then served from the cache
+    finally:
+        backend.encode_frame = original
+
+    response = backend.app.test_client().get('/api/video-frame?tier=huge')
+    assert response.status_code == 400
+    print("✅ Preview tiers encoded once per frame")
+
+
+def test_space_snapshots():
+    """Space crops are encoded once per frame, served singly or in batches, and bounded by the LRU"""
+    backend.set_parking_positions(synthetic_layout(10))
+    client = backend.app.test_client()
+    publish_test_frame(5)
+
+    single = client.get('/api/parking-spaces/3/snapshot')
+    assert single.status_code == 200 and single.mimetype == 'image/jpeg'
+    crop = cv2.imdecode(np.frombuffer(single.data, np.uint8), cv2.IMREAD_COLOR)
+    assert crop.shape[0] <= backend.height + 2 * backend.SPACE_CROP_PADDING
+    assert client.get('/api/parking-spaces/3/snapshot',
+                      headers={'If-None-Match': single.headers['ETag']}).status_code == 304
+
+    hits = backend.space_crop_cache.hits
+    batch = client.get('/api/parking-spaces/snapshots?ids=3,4').get_json()
+    assert set(batch['snapshots']) == {'3', '4'} and batch['sequence'] == 5
+    assert backend.space_crop_cache.hits == hits + 1
+
+    assert client.get('/api/parking-spaces/99/snapshot').status_code == 404
+    assert client.get('/api/parking-spaces/snapshots?ids=a').status_code == 400
+
+    img = backend.current_frame[1]
+    for sequence in range(6, 6 + backend.SPACE_CROP_CACHE_SIZE):
+        backend.get_space_crop(1, (sequence, img))
+    assert len(backend.space_crop_cache) == backend.SPACE_CROP_CACHE_SIZE
+    print("✅ Space snapshots cached per frame and bounded")
+
+
+def test_torn_shared_frames_are_re_read():
+    """A shared-memory frame the detector overwrote is never encoded; the newest frame is used instead"""
+    backend.set_parking_positions(synthetic_layout(10))
+    n = len(backend.posList)
+    name = f'smartpark_test_video_{os.getpid()}'
+    shape = synthetic_color_frame().shape
+    writer = SharedFrameBuffer.create(name, shape, n)
+
+    def write(sequence):
+        writer.write(sequence, backend.time.time(), synthetic_color_frame(seed=sequence),
+                     np.zeros(n, np.uint8), np.zeros(n, np.int32))
+
+    saved = backend.current_frame, backend.SHARED_FRAMES, backend.FRAME_SHM_NAME, backend.shared_frames
+    backend.current_frame, backend.SHARED_FRAMES, backend.FRAME_SHM_NAME, backend.shared_frames = None, True, name, None
+    try:
+        write(101)
+        stale = backend.latest_frame()
+        write(102)
+        write(103)   # Refills the slot `stale` points into
+        assert not frame_intact(stale)
+
+        sequence, jpeg = backend.get_sequenced_frame_jpeg('thumb', stale)
+        assert sequence == 103 and backend.frame_jpeg_cache['thumb'] == (103, jpeg)
+        frame, crops = backend.get_space_crops([1, 2], stale)
+        assert frame[0] == 103 and set(crops) == {1, 2}
+        assert backend.space_crop_cache.get((1, 101)) is None
+
+        # A segment replaced by the detector is closed before the new one is attached
+        attached = backend.shared_frames
+        writer.close()
+        writer = SharedFrameBuffer.create(name, shape, n)
+        write(104)
+        assert backend.latest_frame()[0] == 104
+        assert attached.header is None and backend.shared_frames is not attached
+        assert not frame_intact(frame)   # Frames from a closed buffer are never trusted
+    finally:
+        if backend.shared_frames is not None:
+            backend.shared_frames.close()
+        writer.close()
+        backend.current_frame, backend.SHARED_FRAMES, backend.FRAME_SHM_NAME, backend.shared_frames = saved
+    print("✅ Torn shared-memory frames are re-read, replaced segments closed")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing frame endpoints")
+    test_video_frame_etag()
+    test_tiers_encoded_once_per_frame()
+    test_space_snapshots()
+    test_torn_shared_frames_are_re_read()
+    print("\n✨ Frame endpoint tests completed!")
@@ -0,0 +1,154 @@
+"""
+SmartPark TTL store
+A bounded key/value store whose entries expire, used for one-time passwords.
+Lookups are a single dict access. A min-heap of expiry times lets every write
+remove whatever has expired in O(log n) per entry, so abandoned codes do not
+pile up. When the store is full new keys are refused, so a flood of throwaway
+keys cannot push out the entries that are already there.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+
+class TTLStore:
+    """Dict-like store of entries that expire `ttl` seconds after they are set (never if None)"""
+
+    def __init__(self, ttl, maxsize=10000, clock=time.time):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0          # Entries removed because their time ran out
+        self.rejected = 0         # New keys refused because the store was full
+        self.version = 0          # Bumped on every write, so readers can cache items()
+        self._entries = {}        # {key: (expires_at, value)}
+        self._heap = []           # (expires_at, tiebreak, key); stale rows are skipped when popped
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self.get(key, count=False) is not None
+
+    def get(self, key, default=None, count=True):
+        """The live value for `key`, or `default` if it is missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self.clock():
+                del self._entries[key]
+                self.expired += 1
+                self.version += 1
+                entry = None
+            if count:
+                if entry is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+        return default if entry is None else entry[1]
+
+    def expires_at(self, key):
+        """When `key` expires (inf if never), or None if it is not stored or has expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry[0] <= self.clock():
+            return None
+        return entry[0]
+
+    def items(self):
+        """{key: value} of every live entry"""
+        now = self.clock()
+        with self._lock:
+            return {key: value for key, (expires_at, value) in self._entries.items() if expires_at > now}
+
+    def set(self, key, value, ttl=None):
+        """Store `value`, replacing any entry for `key` and restarting its TTL
+
+        Returns when it expires, or None if `key` is new and the store is full.
+        """
+        with self._lock:
+            return self._set(key, value, ttl)
+
+    def add(self, key, value, ttl=None):
+        """Store `value` only if `key` has no live entry and there is room; returns whether it was stored"""
+        with self._lock:
+            self._purge()
+            if key in self._entries:
+                return False
+            return self._set(key, value, ttl) is not None
+
+    def replace(self, key, value):
+        """Change the value of a live entry without touching its expiry; returns whether it was stored"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self.clock():
+                return False
+            self._entries[key] = (entry[0], value)
+            self.version += 1
+            return True
+
+    def increment(self, key, ttl=None):
+        """Add 1 to the counter at `key`, starting it at 1 (with a fresh TTL) if it is missing
+
+        Later increments keep the expiry, so the counter covers a fixed window.
+        Returns the new count, or None if `key` is new and the store is full.
+        """
+        with self._lock:
+            self._purge()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None if self._set(key, 1, ttl) is None else 1
+            self._entries[key] = (entry[0], entry[1] + 1)
+            self.version += 1
+            return entry[1] + 1
+
+    def pop(self, key, default=None):
+        """Remove `key` and return its value"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.version += 1
+        return default if entry is None else entry[1]
+
+    def _set(self, key, value, ttl):
+        """Insert or replace an entry; the caller holds the lock"""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = float('inf') if ttl is None else self.clock() + ttl
+        self._purge()
+        if key not in self._entries and len(self._entries) >= self.maxsize:
+            self.rejected += 1
+            return None
+        self._entries[key] = (expires_at, value)
+        self.version += 1
+        heapq.heappush(self._heap, (expires_at, next(self._counter), key))
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._compact()
+        return expires_at
+
+    def purge(self):
+        """Remove every expired entry"""
+        with self._lock:
+            self._purge()
+
+    def _purge(self):
+        """Pop expired heap rows, dropping the entries they still describe"""
+        now = self.clock()
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            expires_at, _, key = heapq.heappop(heap)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == expires_at:
+                del self._entries[key]
+                self.expired += 1
+                self.version += 1
+
+    def _compact(self):
+        """Rebuild the heap from live entries once stale rows outnumber them"""
+        self._heap = [(expires_at, next(self._counter), key)
+                      for key, (expires_at, _) in self._entries.items()]
+        heapq.heapify(self._heap)
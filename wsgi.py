@@ -0,0 +1,27 @@
+"""
+SmartPark API workers
+WSGI entry point for extra API processes running next to the detector. Start
+the detector with the shared state backend, then any number of workers:
+
+    SMARTPARK_STATE_BACKEND=sqlite python backend.py          # detection + API on :5000
+    gunicorn --workers 4 --bind 0.0.0.0:5002 wsgi:app         # API-only workers on :5002
+
+Workers read reservations, OTPs and the published parking status from
+smartpark_state.db and frames from shared memory, so they need the same
+working directory as the detector. Detection, the live video stream and the
+event stream stay in the detector process.
+"""
+
+import atexit
+import os
+
+os.environ.setdefault('SMARTPARK_STATE_BACKEND', 'sqlite')
+
+import backend
+
+if not backend.state_store.shared:
+    raise RuntimeError("API workers need SMARTPARK_STATE_BACKEND=sqlite to share state with the detector")
+
+atexit.register(backend.close_shared_frames)
+
+app = backend.app